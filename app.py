@@ -5,14 +5,27 @@
 import os
 import logging
 import time
-from flask import Flask, request, jsonify, send_from_directory
+import json
+import queue
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
-from modules.ppt_text_extraction import extract_text_from_ppt, extract_metadata, extract_text_from_ppt_legacy, extract_metadata_from_ppt_legacy
-from modules.image_extraction_p import extract_images_from_ppt_paddleocr, extract_images_from_ppt_legacy
-from modules.ai_optimizer import optimize_text_with_ai
+from modules.ai_optimizer import load_models, optimize_deck_record, transition_memo, TRANSITION_BACKEND, TIERS, OPTIMIZER_TIER, SPACY_MODE
+from modules.optimizer_cache import OptimizedTextCache
+from modules.result_cache import ResultCache, SingleFlight, UploadTooLarge, save_upload
+from modules.slide_cache import SlideCache
+from modules.admission import AdmissionController, Overloaded, SharedAdmissionController
+from modules.transition_backends import MODEL_ID
+from modules.pipeline import extract_deck_record
+from modules.job_store import DONE, FAILED, QUEUED, JobStore
+from modules.jobs import JobRunner
+from modules.ocr_cache import OCRResultCache
+from modules.ocr_pool import OCRProcessPool
+from modules.image_prefilter import TextPrefilter
+from modules.image_triage import ImageTriage
+from modules.ocr_manager import ocr_manager
+from modules.deadline import Deadline, expired, wait_for
 from modules.utils import setup_logger, validate_file_type
 from modules.config import OUTPUT_DIR_2
-import re
 import warnings
 import socket
 from dotenv import load_dotenv
@@ -32,9 +45,28 @@ logger = setup_logger()
 USE_GPU = os.getenv("USE_GPU", "False").lower() in ("true", "1", "yes")
 logger.info(f"GPU enabled: {USE_GPU}")
 
+# OCR 工作进程数，0 表示在处理线程内直接识别
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", 0))
+logger.info(f"OCR workers: {OCR_WORKERS}")
+
+# OCR 模型空闲多久后卸载（秒），<= 0 表示常驻
+OCR_IDLE_TIMEOUT = float(os.getenv("OCR_IDLE_TIMEOUT", 600))
+ocr_manager.configure(idle_timeout=OCR_IDLE_TIMEOUT)
+
 app = Flask(__name__, static_folder='static', static_url_path='')
 CORS(app, resources={r"/api/*": {"origins": "*"}})
-executor = ThreadPoolExecutor(max_workers=1)
+# 同步接口 /api/process_ppt 的处理线程数
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", 1))
+executor = ThreadPoolExecutor(max_workers=PROCESS_WORKERS)
+
+# 准入控制：排队和处理中的请求上限、单个客户端的并发上限（<= 0 不限）和上传文件大小上限（MB）
+MAX_PENDING = int(os.getenv("MAX_PENDING", 8))
+MAX_PER_CLIENT = int(os.getenv("MAX_PER_CLIENT", 2))
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", 100))
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+# 请求体超出上限时 Flask 在读取过程中即返回 413；留出 1 MB 给表单的其他字段
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 1024 * 1024
+admission = AdmissionController(MAX_PENDING, MAX_PER_CLIENT)
 
 PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 OUTPUT_DIR = os.path.abspath(os.getenv("OUTPUT_DIR", OUTPUT_DIR_2))
@@ -42,22 +74,67 @@ if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     logger.info(f"Created output directory: {OUTPUT_DIR}")
 
-SUPPORTED_FORMATS = ['.ppt', '.pptx', '.pot', '.potx', '.pps', '.ppsx', '.pptm', '.pdf']
+# serve.py 多进程部署时各工作进程共享的准入记录
+ADMISSION_STORE_PATH = os.getenv("ADMISSION_STORE_PATH", os.path.join(OUTPUT_DIR, ".cache", "admission.sqlite3"))
+
+# 跨图片批量 OCR 的每批文本行数，0 表示逐张识别
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", 0))
+
+# OCR 前的文本预判，跳过明显无文字的图片
+OCR_PREFILTER = os.getenv("OCR_PREFILTER", "False").lower() in ("true", "1", "yes")
+PREFILTER_EDGE_RATIO = float(os.getenv("PREFILTER_EDGE_RATIO", 0.005))
+PREFILTER_AREA_RATIO = float(os.getenv("PREFILTER_AREA_RATIO", 0.01))
+prefilter = TextPrefilter(PREFILTER_EDGE_RATIO, PREFILTER_AREA_RATIO) if OCR_PREFILTER else None
+
+# 是否按 slide_N/image/ 目录结构导出图片和识别文本（后台写盘）
+EXPORT_ARTIFACTS = os.getenv("EXPORT_ARTIFACTS", "False").lower() in ("true", "1", "yes")
+
+# 基于文件头的分诊：长边小于 OCR_MIN_SIDE 的图标跳过，长边超过 OCR_MAX_SIDE 的图片缩小后识别
+OCR_TRIAGE = os.getenv("OCR_TRIAGE", "True").lower() in ("true", "1", "yes")
+OCR_MIN_SIDE = int(os.getenv("OCR_MIN_SIDE", 32))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", 2048))
+triage = ImageTriage(OCR_MIN_SIDE, OCR_MAX_SIDE) if OCR_TRIAGE else None
+
+# OCR 结果缓存（按图片内容哈希），OCR_CACHE_PATH 设为空字符串可关闭
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(OUTPUT_DIR, ".cache", "ocr_cache.sqlite3"))
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", 512))
+ocr_cache = OCRResultCache(OCR_CACHE_PATH, OCR_CACHE_MAX_MB * 1024 * 1024, max_side=OCR_MAX_SIDE if OCR_TRIAGE else None) if OCR_CACHE_PATH else None
+
+# 优化结果缓存（按合并文本哈希），OPTIMIZER_CACHE_PATH 设为空字符串可关闭
+OPTIMIZER_CACHE_PATH = os.getenv("OPTIMIZER_CACHE_PATH", os.path.join(OUTPUT_DIR, ".cache", "optimizer_cache.sqlite3"))
+OPTIMIZER_CACHE_MAX_MB = int(os.getenv("OPTIMIZER_CACHE_MAX_MB", 64))
+optimizer_cache = OptimizedTextCache(OPTIMIZER_CACHE_PATH, MODEL_ID, TRANSITION_BACKEND, SPACY_MODE, OPTIMIZER_CACHE_MAX_MB * 1024 * 1024) if OPTIMIZER_CACHE_PATH else None
+
+# 措辞选择和生成采样的随机种子，设置后优化结果可复现
+OPTIMIZER_SEED = int(os.getenv("OPTIMIZER_SEED")) if os.getenv("OPTIMIZER_SEED") else None
+
+# 同步和流式接口的截止时间（秒）：基础时长按幻灯片数和图片数放宽，且不超过 REQUEST_TIMEOUT_MAX（0 表示不设上限）；
+# 到期后停止处理并返回已完成的部分（partial 为 true）
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", 120))
+REQUEST_TIMEOUT_PER_SLIDE = float(os.getenv("REQUEST_TIMEOUT_PER_SLIDE", 1))
+REQUEST_TIMEOUT_PER_IMAGE = float(os.getenv("REQUEST_TIMEOUT_PER_IMAGE", 0.5))
+REQUEST_TIMEOUT_MAX = float(os.getenv("REQUEST_TIMEOUT_MAX", 600))
+
+# 整份文稿的处理结果缓存（按上传文件内容哈希和处理配置），RESULT_CACHE_PATH 设为空字符串可关闭
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", os.path.join(OUTPUT_DIR, ".cache", "result_cache.sqlite3"))
+RESULT_CACHE_MAX_MB = int(os.getenv("RESULT_CACHE_MAX_MB", 256))
+RESULT_CONFIG = (f"model={MODEL_ID};backend={TRANSITION_BACKEND};spacy={SPACY_MODE};"
+                 f"seed={'none' if OPTIMIZER_SEED is None else OPTIMIZER_SEED};"
+                 f"triage=icon{OCR_MIN_SIDE}-{OCR_MAX_SIDE if OCR_TRIAGE else 'off'};"
+                 f"prefilter={f'{PREFILTER_EDGE_RATIO}-{PREFILTER_AREA_RATIO}' if OCR_PREFILTER else 'off'};"
+                 f"images=media-parts")
+result_cache = ResultCache(RESULT_CACHE_PATH, RESULT_CONFIG, RESULT_CACHE_MAX_MB * 1024 * 1024) if RESULT_CACHE_PATH else None
+# 并发的相同上传共用一次处理
+inflight = SingleFlight()
+
+# 单页缓存（按幻灯片内容指纹）：修改后重新上传的 PPTX 只对改动过的幻灯片重新 OCR 和讲解，SLIDE_CACHE_PATH 设为空字符串可关闭
+SLIDE_CACHE_PATH = os.getenv("SLIDE_CACHE_PATH", os.path.join(OUTPUT_DIR, ".cache", "slide_cache.sqlite3"))
+SLIDE_CACHE_MAX_MB = int(os.getenv("SLIDE_CACHE_MAX_MB", 256))
+slide_cache = SlideCache(SLIDE_CACHE_PATH, RESULT_CONFIG, SLIDE_CACHE_MAX_MB * 1024 * 1024) if SLIDE_CACHE_PATH else None
+
+ocr_pool = OCRProcessPool(OCR_WORKERS, lang='ch', use_gpu=USE_GPU, batch_size=OCR_BATCH_SIZE) if OCR_WORKERS > 0 else None
 
-def clean_text_output(text_list):
-    try:
-        cleaned_output = []
-        watermark_pattern = re.compile(r'stablediffusionweb\.com')
-        for slide in text_list:
-            if not slide or not slide.strip():
-                continue
-            cleaned_slide = watermark_pattern.sub('', slide)
-            cleaned_slide = re.sub(r'\n\s*\n', '\n', cleaned_slide.strip())
-            cleaned_output.append(cleaned_slide)
-        return cleaned_output
-    except Exception as e:
-        logger.error(f"Error cleaning text output: {str(e)}", exc_info=True)
-        return []
+SUPPORTED_FORMATS = ['.ppt', '.pptx', '.pot', '.potx', '.pps', '.ppsx', '.pptm', '.pdf']
 
 @app.route('/')
 def serve_index():
@@ -73,76 +150,245 @@ def serve_static(path):
         return send_from_directory(app.static_folder, path)
     return jsonify({"error": "File not found"}), 404
 
+def read_options():
+    """
+    读取请求表单中可选的优化档位和耗时预算（秒），未提供时使用 OPTIMIZER_TIER / OPTIMIZER_BUDGET。
+
+    Returns:
+        tuple: ((tier, budget), None)，或参数非法时 (None, 错误响应)。
+    """
+    tier = request.form.get('tier') or None
+    if tier is not None and tier.lower() not in TIERS:
+        return None, (jsonify({"error": f"Invalid tier: {tier}. Supported tiers: {', '.join(TIERS)}"}), 400)
+    try:
+        budget = float(request.form['budget']) if request.form.get('budget') else None
+    except ValueError:
+        return None, (jsonify({"error": f"Invalid budget: {request.form.get('budget')}"}), 400)
+    return (tier, budget), None
+
+def new_deadline():
+    """按 REQUEST_TIMEOUT* 创建请求的截止时间，应在请求到达时调用"""
+    return Deadline(REQUEST_TIMEOUT, REQUEST_TIMEOUT_PER_SLIDE, REQUEST_TIMEOUT_PER_IMAGE, REQUEST_TIMEOUT_MAX or None)
+
+def process_deck(file_path, filename, tier=None, budget=None, progress=None, on_text=None, on_slide=None, deadline=None):
+    """
+    处理一份演示文稿：提取、优化并保存结果。
+
+    Args:
+        file_path (str): 上传文件的保存路径。
+        filename (str): 原始文件名，用于命名输出文件。
+        tier (str, optional): 优化档位。
+        budget (float, optional): 模型档耗时预算（秒）。
+        progress (callable, optional): progress(**fields)，上报处理阶段和进度。
+        on_text (callable, optional): on_text(record)，正文提取完成、OCR 开始前调用。
+        on_slide (callable, optional): on_slide(幻灯片序号, 讲解文本, 档位)，每张幻灯片讲解完成时调用。
+        deadline (Deadline, optional): 截止时间，到期后只返回已完成的部分。
+
+    Returns:
+        dict: output_file、optimized_text、tiers、partial（是否因截止时间只处理了一部分）和 record。
+    """
+    warnings.filterwarnings("ignore", category=UserWarning, module="PIL.Image")
+
+    def report(**fields):
+        if progress is not None:
+            progress(**fields)
+
+    # 提取元数据、幻灯片文本和图片文本到 DeckRecord（PPTX 只解析一次）
+    report(stage="extracting")
+    record = extract_deck_record(file_path, OUTPUT_DIR, use_gpu=USE_GPU, ocr_cache=ocr_cache, export_artifacts=EXPORT_ARTIFACTS, batch_size=OCR_BATCH_SIZE, ocr_pool=ocr_pool, prefilter=prefilter, triage=triage, progress=report, on_text=on_text, deadline=deadline, slide_cache=slide_cache)
+    if not record.content_slides:
+        logger.warning("No text extracted from PPT slides or images")
+
+    report(stage="optimizing", slides_done=0, slides_total=len(record.content_slides))
+    optimized_text, slide_tiers = optimize_deck_record(
+        record, tier=tier, budget=budget, cache=optimizer_cache, seed=OPTIMIZER_SEED,
+        progress=lambda done, total: report(slides_done=done, slides_total=total), on_slide=on_slide,
+        deadline=deadline, slide_cache=slide_cache
+    )
+    partial = record.partial or expired(deadline)
+    if partial:
+        logger.warning(f"Deadline reached, returning partial result for {filename}")
+    optimized_text = optimized_text or record.render()
+    output_file = os.path.abspath(os.path.join(OUTPUT_DIR, f"optimized_output_{filename}.txt"))
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(optimized_text)
+    logger.info(f"Optimized text saved to {output_file}")
+    report(stage="done", slides_done=len(record.content_slides))
+
+    return {"output_file": output_file, "optimized_text": optimized_text, "tiers": slide_tiers, "partial": partial, "record": record}
+
+def cache_tier(tier=None):
+    # "auto" 只有在全部幻灯片走模型档时才写缓存，因此与 "model" 共用缓存条目
+    return "fast" if (tier or OPTIMIZER_TIER).lower() == "fast" else "model"
+
+def lookup_result(digest, tier=None):
+    """按上传文件哈希查询结果缓存，命中时返回带 cached 标记的结果"""
+    if result_cache is None:
+        return None
+    cached = result_cache.get(result_cache.key(digest, cache_tier(tier)))
+    if cached is None:
+        return None
+    logger.info(f"Result served from cache for upload {digest[:12]} (hit rate {result_cache.stats()['hit_rate']:.2%})")
+    return {**cached, "cached": True}
+
+def store_result(digest, tier, result):
+    """全部幻灯片都按请求的档位处理完成时写入结果缓存；优化出错、按预算降级或因截止时间不完整的结果不缓存"""
+    tiers = result["tiers"]
+    if result.get("partial"):
+        return
+    if result_cache is not None and tiers and (cache_tier(tier) == "fast" or not tiers.get("fast")):
+        result_cache.put(result_cache.key(digest, cache_tier(tier)), {k: v for k, v in result.items() if k != "record"})
+
+def process_upload(file_path, filename, digest, tier=None, budget=None, progress=None, deadline=None,
+                   on_text=None, on_slide=None, with_record=False):
+    """
+    处理一份已保存的上传文件；内容相同且参数相同的并发请求只处理一次，共用第一个请求的截止时间。
+    在处理线程中排队等到第一个请求已经结束的请求，开始处理前再查一次结果缓存。
+    on_text、on_slide 只在实际处理时调用，复用其他请求的结果时不会调用。
+
+    Returns:
+        dict: output_file、optimized_text、tiers、partial 和 cached（是否复用了缓存或其他请求的结果）；
+        with_record 为 True 且实际处理过时另含 record。
+    """
+    def run():
+        cached = lookup_result(digest, tier)
+        if cached is not None:
+            return cached
+        result = process_deck(file_path, filename, tier, budget, progress, on_text=on_text, on_slide=on_slide, deadline=deadline)
+        store_result(digest, tier, result)
+        return result
+
+    result, shared = inflight.do(f"{digest}:{cache_tier(tier)}:{budget}", run)
+    cached = shared or result.get("cached", False)
+    if cached and progress is not None:
+        progress(stage="done", deduplicated=True)
+    return {**{k: v for k, v in result.items() if with_record or k != "record"}, "cached": cached}
+
+def run_job(file_path, params, progress):
+    """JobRunner 的处理函数"""
+    filename = params.get("filename", os.path.basename(file_path))
+    digest = params.get("digest")
+    if digest is None:
+        result = process_deck(file_path, filename, params.get("tier"), params.get("budget"), progress)
+        result.pop("record")
+        return result
+    return lookup_result(digest, params.get("tier")) or process_upload(file_path, filename, digest, params.get("tier"), params.get("budget"), progress)
+
+# 异步任务：状态保存在 JOB_STORE_PATH，上传文件保存在 JOB_DIR，服务重启后可恢复
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_DIR = os.path.abspath(os.getenv("JOB_DIR", os.path.join(OUTPUT_DIR, ".jobs")))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(JOB_DIR, "jobs.sqlite3"))
+os.makedirs(JOB_DIR, exist_ok=True)
+# 结束的任务及其结果保留的小时数，0 表示永久保留
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", 168))
+job_runner = JobRunner(JobStore(JOB_STORE_PATH), run_job, workers=JOB_WORKERS, retention=JOB_RETENTION_HOURS * 3600)
+
+# 流式接口的处理线程数
+STREAM_WORKERS = int(os.getenv("STREAM_WORKERS", 2))
+stream_executor = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix="stream")
+
+def sse_event(event, data):
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def admit_request():
+    """
+    准入检查，应在读取上传文件之前调用，过载时不再接收文件。
+
+    Returns:
+        tuple: (Ticket, None)，或被拒绝时 (None, 带 Retry-After 的 429 响应)。
+    """
+    try:
+        return admission.admit(request.remote_addr or "unknown"), None
+    except Overloaded as e:
+        logger.warning(f"Rejected request from {request.remote_addr}: {e.reason}")
+        response = jsonify({"error": e.reason, "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return None, (response, 429)
+
+def share_admission():
+    """
+    改用保存在 ADMISSION_STORE_PATH 中的共享准入记录，使 MAX_PENDING 和 MAX_PER_CLIENT 对所有工作进程整体生效。
+    由 serve.py 的主进程在 fork 工作进程之前调用；单进程运行时使用进程内的计数即可。
+    """
+    global admission
+    admission = SharedAdmissionController(ADMISSION_STORE_PATH, MAX_PENDING, MAX_PER_CLIENT)
+    admission.reset()
+
+def upload_too_large():
+    return jsonify({"error": f"File too large. Maximum upload size is {MAX_UPLOAD_MB} MB"}), 413
+
+def receive_upload(directory, prefix):
+    """
+    校验请求中的文件和参数，把上传文件边写盘边计算哈希。
+
+    Returns:
+        tuple: ((文件名, tier, budget, 保存路径, 内容哈希), None)，或出错时 (None, 错误响应)。
+    """
+    if 'file' not in request.files:
+        logger.error("No file part in the request")
+        return None, (jsonify({"error": "No file uploaded"}), 400)
+
+    file = request.files['file']
+    if file.filename == '':
+        logger.error("No file selected")
+        return None, (jsonify({"error": "No file selected"}), 400)
+
+    options, error = read_options()
+    if error:
+        return None, error
+    tier, budget = options
+
+    file_path = os.path.join(directory, f"{prefix}_{os.urandom(8).hex()}_{file.filename}")
+    try:
+        digest = save_upload(file.stream, file_path, max_bytes=MAX_UPLOAD_BYTES)
+    except UploadTooLarge:
+        logger.error(f"Upload exceeds {MAX_UPLOAD_MB} MB: {file.filename}")
+        return None, upload_too_large()
+    if not validate_file_type(file_path, SUPPORTED_FORMATS):
+        os.remove(file_path)
+        logger.error(f"Invalid file type: {file.filename}. Supported formats: {SUPPORTED_FORMATS}")
+        return None, (jsonify({"error": f"Invalid file type: {file.filename}. Supported formats: {', '.join(SUPPORTED_FORMATS)}"}), 400)
+    return (file.filename, tier, budget, file_path, digest), None
+
+@app.errorhandler(413)
+def request_entity_too_large(e):
+    logger.error("Upload rejected: request body exceeds MAX_UPLOAD_MB")
+    return upload_too_large()
+
 @app.route('/api/process_ppt', methods=['POST'])
 def process_ppt():
     logger.info("Received POST request to /api/process_ppt")
-    file_path = None
+    # 截止时间从请求到达时开始计算，包含排队和上传的时间
+    deadline = new_deadline()
+    ticket, error = admit_request()
+    if error:
+        return error
+    status = None
+    try:
+        response, status = _process_ppt(deadline)
+        return response, status
+    finally:
+        ticket.release(completed=status == 200)
+
+def _process_ppt(deadline):
+    # 在 try 之外读取上传文件：请求体超过 MAX_CONTENT_LENGTH 时抛出的 413 交给 @app.errorhandler(413) 处理
+    upload, error = receive_upload(tempfile.gettempdir(), "temp")
+    if error:
+        return error
+    filename, tier, budget, file_path, digest = upload
     try:
-        if 'file' not in request.files:
-            logger.error("No file part in the request")
-            return jsonify({"error": "No file uploaded"}), 400
-        
-        file = request.files['file']
-        if file.filename == '':
-            logger.error("No file selected")
-            return jsonify({"error": "No file selected"}), 400
-
-        # 使用临时文件避免覆盖和权限问题
-        temp_dir = tempfile.gettempdir()
-        file_path = os.path.join(temp_dir, f"temp_{os.urandom(8).hex()}_{file.filename}")
-        logger.info(f"Saving file to temporary path: {file_path}")
-        file.save(file_path)
-
-        if not validate_file_type(file_path, SUPPORTED_FORMATS):
-            os.remove(file_path)
-            logger.error(f"Invalid file type: {file.filename}. Supported formats: {SUPPORTED_FORMATS}")
-            return jsonify({"error": f"Invalid file type: {file.filename}. Supported formats: {', '.join(SUPPORTED_FORMATS)}"}), 400
-
         if not os.path.exists(file_path):
             logger.error(f"File does not exist after saving: {file_path}")
             return jsonify({"error": "File save failed"}), 500
 
-        logger.info(f"Starting processing for file: {file_path}")
-        warnings.filterwarnings("ignore", category=UserWarning, module="PIL.Image")
-
-        def process_file(file_path):
-            ext = os.path.splitext(file_path.lower())[1]
-            is_pptx = ext == '.pptx'
-
-            metadata = extract_metadata(file_path) if is_pptx else extract_metadata_from_ppt_legacy(file_path)
-            if "Error" in metadata:
-                logger.error(f"Metadata extraction failed: {metadata['Error']}")
-                metadata_output = "Metadata extraction failed\n"
-            else:
-                metadata_output = "\n".join([f"{key}: {value}" for key, value in metadata.items()])
-            logger.info("Metadata processed")
-
-            text_output = extract_text_from_ppt(file_path) if is_pptx else extract_text_from_ppt_legacy(file_path)
-            if not text_output:
-                logger.warning("No text extracted from PPT slides")
-                text_output = []
-
-            image_output = extract_images_from_ppt_paddleocr(file_path, OUTPUT_DIR, use_gpu=USE_GPU) if is_pptx else extract_images_from_ppt_legacy(file_path, OUTPUT_DIR, use_gpu=USE_GPU)
-            if not image_output:
-                logger.warning("No image text extracted")
-                image_output = []
-
-            cleaned_text_output = clean_text_output(text_output + image_output)
-            combined_output = "\n".join([metadata_output] + cleaned_text_output)
-            if not combined_output.strip():
-                logger.warning("No combined output generated")
-                combined_output = "No content extracted"
-
-            optimized_text = optimize_text_with_ai(combined_output) or combined_output
-            output_file = os.path.abspath(os.path.join(OUTPUT_DIR, f"optimized_output_{file.filename}.txt"))
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(optimized_text)
-            logger.info(f"Optimized text saved to {output_file}")
-
-            return optimized_text, output_file
-
-        future = executor.submit(process_file, file_path)
-        optimized_text, output_file = future.result(timeout=120)
+        # 相同内容的文件已处理过时直接返回缓存结果
+        result = lookup_result(digest, tier)
+        if result is None:
+            logger.info(f"Starting processing for file: {file_path}")
+            future = executor.submit(process_upload, file_path, filename, digest, tier, budget, deadline=deadline)
+            result = wait_for(future, deadline)
+        optimized_text, output_file, slide_tiers = result["optimized_text"], result["output_file"], result["tiers"]
 
         # 重试删除文件
         for _ in range(3):  # 尝试 3 次
@@ -158,7 +404,10 @@ def process_ppt():
         return jsonify({
             "message": "File processed successfully",
             "output_file": output_file,
-            "optimized_text": optimized_text
+            "optimized_text": optimized_text,
+            "tiers": slide_tiers,
+            "partial": result.get("partial", False),
+            "cached": result["cached"]
         }), 200
 
     except PermissionError as e:
@@ -192,11 +441,183 @@ def process_ppt():
                     time.sleep(1)
         return jsonify({"error": "Processing failed", "details": str(e)}), 500
 
+@app.route('/api/process_ppt/stream', methods=['POST'])
+def process_ppt_stream():
+    """
+    以 Server-Sent Events 流式返回处理结果，参数与 /api/process_ppt 相同。
+
+    事件依次为：metadata（元数据）、slide（各幻灯片正文，OCR 之前发送）、progress（OCR 和优化进度）、
+    ocr（各幻灯片的图片文本）、narration（每张幻灯片讲解完成时发送）、summary（完整结果）；
+    出错时发送 error。优化结果命中缓存时没有 narration 事件，完整文本见 summary。
+    """
+    logger.info("Received POST request to /api/process_ppt/stream")
+    deadline = new_deadline()
+    ticket, error = admit_request()
+    if error:
+        return error
+    upload, error = receive_upload(tempfile.gettempdir(), "temp")
+    if error:
+        ticket.release(completed=False)
+        return error
+    filename, tier, budget, file_path, digest = upload
+
+    # 相同内容的文件已处理过时只发送 summary
+    cached = lookup_result(digest, tier)
+    if cached is not None:
+        os.remove(file_path)
+        ticket.release()
+        return Response(sse_event("summary", {"message": "File processed successfully", **cached, "partial": False, "elapsed": 0.0}),
+                        mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    events = queue.Queue()
+
+    def on_text(record):
+        events.put(sse_event("metadata", {"metadata": record.metadata, "metadata_error": record.metadata_error}))
+        for slide in record.slides:
+            if slide.lines or slide.tables or slide.notes:
+                events.put(sse_event("slide", slide.to_dict()))
+
+    def work():
+        start = time.perf_counter()
+        try:
+            # 与同步接口和异步任务共用 process_upload，相同文件的并发请求只处理一次
+            result = process_upload(
+                file_path, filename, digest, tier, budget,
+                progress=lambda **fields: events.put(sse_event("progress", fields)),
+                deadline=deadline,
+                on_text=on_text,
+                on_slide=lambda number, text, slide_tier: events.put(sse_event("narration", {"slide": number, "text": text, "tier": slide_tier})),
+                with_record=True
+            )
+            record = result.pop("record", None)
+            for slide in record.slides if record is not None else []:
+                if slide.ocr:
+                    events.put(sse_event("ocr", {"slide": slide.number, "ocr": slide.to_dict()["ocr"]}))
+            events.put(sse_event("summary", {
+                "message": "File processed successfully",
+                "output_file": result["output_file"],
+                "optimized_text": result["optimized_text"],
+                "tiers": result["tiers"],
+                "partial": result.get("partial", False),
+                "cached": result["cached"],
+                "elapsed": round(time.perf_counter() - start, 3)
+            }))
+        except Exception as e:
+            logger.error(f"Error streaming file: {str(e)}", exc_info=True)
+            events.put(sse_event("error", {"error": "Processing failed", "details": str(e)}))
+        finally:
+            ticket.release()
+            if os.path.exists(file_path):
+                try:
+                    os.remove(file_path)
+                except OSError as e:
+                    logger.warning(f"Failed to remove temporary file {file_path}: {e}")
+            events.put(None)
+
+    stream_executor.submit(work)
+
+    def generate():
+        finished = False
+        try:
+            while True:
+                event = events.get()
+                if event is None:
+                    finished = True
+                    break
+                yield event
+        finally:
+            # 客户端断开时停止处理，释放处理线程
+            if not finished:
+                logger.info(f"Client disconnected, cancelling stream for {filename}")
+                deadline.cancel()
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """提交异步处理任务，立即返回任务 id 及状态、结果地址"""
+    logger.info("Received POST request to /api/jobs")
+    ticket, error = admit_request()
+    if error:
+        return error
+    # 上传文件保存在 JOB_DIR 而非临时目录，服务重启后仍可继续处理
+    upload, error = receive_upload(JOB_DIR, "upload")
+    if error:
+        ticket.release(completed=False)
+        return error
+    filename, tier, budget, file_path, digest = upload
+
+    # 任务结束时才释放准入名额，排队中的任务同样计入上限
+    job_id = job_runner.submit(filename, file_path, {"filename": filename, "tier": tier, "budget": budget, "digest": digest},
+                               on_done=lambda succeeded: ticket.release(completed=succeeded))
+    return jsonify({
+        "job_id": job_id,
+        "status": QUEUED,
+        "status_url": f"/api/jobs/{job_id}",
+        "result_url": f"/api/jobs/{job_id}/result"
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """查询任务状态和进度（阶段、已完成的幻灯片数和图片数）"""
+    status = job_runner.status(job_id)
+    if status is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(status), 200
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """获取任务结果：完成时返回 200，未完成时返回 202 和当前状态，失败时返回 500"""
+    job = job_runner.store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    if job["status"] == FAILED:
+        return jsonify({"error": "Processing failed", "details": job["error"]}), 500
+    if job["status"] != DONE:
+        return jsonify(job_runner.status(job_id)), 202
+    return jsonify({"message": "File processed successfully", **job["result"]}), 200
+
 @app.route('/health', methods=['GET'])
 def health_check():
     logger.info("Health check requested")
     return jsonify({"status": "healthy", "message": "PPT Processor server is running"}), 200
 
+@app.route('/api/stats', methods=['GET'])
+def cache_stats():
+    """返回各级缓存的命中统计及图片分诊、预判计数"""
+    return jsonify({
+        "ocr_cache": ocr_cache.stats() if ocr_cache is not None else None,
+        "optimizer_cache": optimizer_cache.stats() if optimizer_cache is not None else None,
+        "slide_cache": slide_cache.stats() if slide_cache is not None else None,
+        "result_cache": dict(result_cache.stats(), inflight=len(inflight), shared=inflight.shared) if result_cache is not None else None,
+        "transition_memo": transition_memo.stats(),
+        "admission": admission.stats(),
+        "triage": triage.stats() if triage is not None else None,
+        "prefilter": prefilter.stats() if prefilter is not None else None,
+    }), 200
+
+def warmup_models(ocr=True):
+    """
+    服务启动时预先加载模型，避免首个请求承担模型加载时间。
+
+    Args:
+        ocr (bool): 是否同时加载 OCR 模型；为 False 时只加载 spaCy 和生成模型。
+    """
+    try:
+        load_models()
+    except Exception as e:
+        logger.error(f"NLP model warmup failed: {str(e)}", exc_info=True)
+    if not ocr:
+        return
+    try:
+        if ocr_pool is not None:
+            ocr_pool.warmup()
+        else:
+            ocr_manager.warmup(lang='ch', use_gpu=USE_GPU, use_angle_cls=True)
+    except Exception as e:
+        logger.error(f"OCR model warmup failed: {str(e)}", exc_info=True)
+
 def check_port(host, port):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.settimeout(1)
@@ -221,11 +642,14 @@ if __name__ == "__main__":
     if not os.path.exists(os.path.join(static_dir, 'index.html')):
         logger.warning("index.html not found in static folder. Please place it there.")
 
+    warmup_models()
+    job_runner.recover()
+
     try:
         for attempt in range(MAX_PORT_ATTEMPTS):
             if check_port(HOST, PORT):
                 logger.info(f"Starting Flask server on {HOST}:{PORT}")
-                app.run(host=HOST, port=PORT, debug=False, threaded=False)
+                app.run(host=HOST, port=PORT, debug=False, threaded=True)
                 break
             else:
                 PORT += 1
@@ -0,0 +1,149 @@
+# bench_server.py
+# 测量 serve.py 在不同工作进程数下的吞吐量（请求/秒）和内存占用
+#
+# 用法：
+#   python -m benchmarks.bench_server [--workers 1 2 4] [--deck 演示文稿.pptx] [--concurrency 8] [--duration 30]
+#
+# 每种进程数各启动一次 serve.py，等待 /health 可用后用 concurrency 个并发客户端持续请求 duration 秒。
+# 指定 --deck 时请求 POST /api/process_ppt（建议设置 RESULT_CACHE_PATH= 关闭结果缓存，以测量实际处理），
+# 否则请求 GET /health，只测服务框架本身的开销。
+# RSS 为主进程和全部工作进程常驻内存之和，写时复制共享的页面会被重复计算；
+# PSS 按共享进程数分摊共享页面，更接近实际占用（仅 Linux）。
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def child_pids(pid):
+    """递归列出 pid 的全部子进程"""
+    children = []
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            direct = [int(child) for child in f.read().split()]
+    except OSError:
+        return children
+    for child in direct:
+        children.append(child)
+        children.extend(child_pids(child))
+    return children
+
+
+def memory_mb(pids):
+    """返回 (RSS 之和, PSS 之和)，单位 MB"""
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                rss += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                pss += next(int(line.split()[1]) for line in f if line.startswith("Pss:"))
+        except (OSError, StopIteration):
+            continue
+    return rss / 1024, pss / 1024
+
+
+def multipart_request(url, deck_path):
+    boundary = uuid.uuid4().hex
+    with open(deck_path, "rb") as f:
+        data = f.read()
+    body = (
+        f"--{boundary}\r\n"
+        f"Content-Disposition: form-data; name=\"file\"; filename=\"{os.path.basename(deck_path)}\"\r\n"
+        f"Content-Type: application/octet-stream\r\n\r\n"
+    ).encode("utf-8") + data + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return lambda: urllib.request.Request(url, data=body, method="POST",
+                                          headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+
+def wait_ready(base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/health", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(1)
+    return False
+
+
+def load(make_request, concurrency, duration):
+    """并发请求 duration 秒，返回 (成功数, 失败数, 各请求耗时)"""
+    deadline = time.monotonic() + duration
+
+    def client():
+        ok = failed = 0
+        latencies = []
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(make_request(), timeout=600) as response:
+                    response.read()
+                ok += 1
+                latencies.append(time.perf_counter() - start)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                failed += 1
+        return ok, failed, latencies
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: client(), range(concurrency)))
+    return (sum(r[0] for r in results), sum(r[1] for r in results),
+            sorted(latency for r in results for latency in r[2]))
+
+
+def run(workers, port, args):
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        start = time.perf_counter()
+        if not wait_ready(base_url, args.startup_timeout):
+            raise SystemExit(f"serve.py with {workers} workers did not become ready in {args.startup_timeout}s")
+        startup = time.perf_counter() - start
+
+        if args.deck:
+            make_request = multipart_request(f"{base_url}/api/process_ppt", args.deck)
+        else:
+            make_request = lambda: urllib.request.Request(f"{base_url}/health")
+        ok, failed, latencies = load(make_request, args.concurrency, args.duration)
+        rss, pss = memory_mb([server.pid] + child_pids(server.pid))
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else float("nan")
+        return startup, ok / args.duration, failed, p95, rss, pss
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=args.startup_timeout)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serve.py throughput and memory by worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--deck", help="deck to POST to /api/process_ppt; GET /health when omitted")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--port", type=int, default=5901)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    args = parser.parse_args()
+    if args.deck:
+        args.deck = os.path.abspath(args.deck)
+
+    print(f"{'workers':>8} {'startup s':>10} {'req/s':>8} {'failed':>7} {'p95 s':>8} {'RSS MB':>9} {'PSS MB':>9}")
+    for index, workers in enumerate(args.workers):
+        startup, rps, failed, p95, rss, pss = run(workers, args.port + index, args)
+        print(f"{workers:>8} {startup:>10.1f} {rps:>8.2f} {failed:>7} {p95:>8.3f} {rss:>9.0f} {pss:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
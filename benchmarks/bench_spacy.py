@@ -0,0 +1,101 @@
+# bench_spacy.py
+# 对比 spaCy 分句模式（full / lean / sentencizer）的加载时间、内存占用和吞吐量
+#
+# 用法：
+#   python -m benchmarks.bench_spacy [演示文稿.pptx] [--repeat 20] [--batch-size 64] [--n-process 1]
+#
+# 每种模式在独立的子进程中运行，内存为该进程的峰值常驻内存。
+# "per-call" 为原先每张幻灯片调用一次 nlp() 的方式，"pipe" 为一次 nlp.pipe 处理全部幻灯片；
+# 分句一致率以完整模型的结果为基准。
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+
+from modules.nlp_pipeline import SPACY_MODES, load_nlp, split_sentences
+
+
+def slide_texts(pptx_path):
+    """按优化器的方式把每张幻灯片的文本行拼成一段"""
+    from modules.deck import load_deck
+
+    texts = []
+    for slide in load_deck(pptx_path).slides:
+        lines = []
+        for block in slide.blocks:
+            if block.kind == "text":
+                lines.extend("".join(paragraph.runs) for paragraph in block.paragraphs)
+            elif block.kind == "table":
+                lines.extend(" | ".join(row) for row in block.rows)
+        lines = [line.strip() for line in lines if line.strip()]
+        if lines:
+            texts.append(" ".join(lines))
+    return texts
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_mode(mode, texts, repeat, batch_size, n_process, queue):
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+    nlp = load_nlp(mode)
+    load_time = time.perf_counter() - start
+    load_rss = peak_rss_mb() - baseline_rss
+
+    corpus = texts * repeat
+    start = time.perf_counter()
+    for text in corpus:
+        [sent.text.strip() for sent in nlp(text).sents]
+    per_call = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sentences = split_sentences(nlp, corpus, batch_size=batch_size, n_process=n_process)
+    pipe = time.perf_counter() - start
+
+    queue.put((mode, load_time, load_rss, peak_rss_mb() - baseline_rss,
+               len(corpus) / per_call, len(corpus) / pipe, sentences[:len(texts)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark spaCy sentence segmentation modes")
+    parser.add_argument("pptx", nargs="?", default="DeepLearning.pptx")
+    parser.add_argument("--modes", default=",".join(SPACY_MODES))
+    parser.add_argument("--repeat", type=int, default=20, help="repeat the deck's slides to enlarge the corpus")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, default=1)
+    args = parser.parse_args()
+
+    texts = slide_texts(args.pptx)
+    print(f"{len(texts)} slides x {args.repeat} repeats from {args.pptx}")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        queue = ctx.Queue()
+        process = ctx.Process(target=run_mode, args=(mode, texts, args.repeat, args.batch_size, args.n_process, queue))
+        process.start()
+        try:
+            result = queue.get(timeout=600)
+            results[result[0]] = result[1:]
+        except Exception as e:
+            print(f"{mode}: failed to run ({e})")
+        process.join()
+
+    baseline = results.get("full")
+    print(f"\n{'mode':<12} {'load s':>7} {'load MB':>8} {'peak MB':>8} {'per-call/s':>11} {'pipe/s':>8} {'same sents':>11}")
+    for mode, (load_time, load_rss, peak_rss, per_call_rate, pipe_rate, sentences) in results.items():
+        agreement = (
+            sum(a == b for a, b in zip(sentences, baseline[-1])) / len(sentences)
+            if baseline and sentences else float("nan")
+        )
+        print(f"{mode:<12} {load_time:>7.2f} {load_rss:>8.1f} {peak_rss:>8.1f} "
+              f"{per_call_rate:>11.1f} {pipe_rate:>8.1f} {agreement:>11.2%}")
+
+
+if __name__ == "__main__":
+    main()
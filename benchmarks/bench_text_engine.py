@@ -0,0 +1,115 @@
+# bench_text_engine.py
+# 对比两种 PPTX 文本引擎（python-pptx 对象模型 / 流式 XML 解析）在大型演示文稿上的耗时和峰值内存
+#
+# 用法：
+#   python -m benchmarks.bench_text_engine [演示文稿.pptx] [--slides 1000] [--repeat 3]
+#
+# 不指定演示文稿时生成一份合成演示文稿：每张幻灯片含标题、多级项目符号、表格、组合形状和注释。
+# 每种引擎在独立的子进程中运行，内存为该进程解析期间峰值常驻内存的增量；
+# 两种引擎的输出逐张比较，"same output" 以 python-pptx 引擎为基准。
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+ENGINES = ("pptx", "xml")
+
+
+def build_synthetic_deck(path, slides):
+    """生成合成演示文稿，覆盖段落层级、表格、组合形状和注释"""
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    prs = Presentation()
+    layout = prs.slide_layouts[1]
+    for number in range(1, slides + 1):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {number}: gradient descent"
+        body = slide.placeholders[1].text_frame
+        body.text = f"Topic {number} overview"
+        for level in (1, 2, 1):
+            paragraph = body.add_paragraph()
+            paragraph.text = f"Point at level {level} for slide {number}"
+            paragraph.level = level
+
+        table = slide.shapes.add_table(3, 3, Inches(1), Inches(4.5), Inches(6), Inches(1.2)).table
+        for r in range(3):
+            for c in range(3):
+                table.cell(r, c).text = f"r{r}c{c}-{number}"
+
+        group = slide.shapes.add_group_shape()
+        for index in range(2):
+            box = group.shapes.add_textbox(Inches(7), Inches(1 + index), Inches(2), Inches(0.5))
+            box.text_frame.text = f"Grouped note {index} on slide {number}"
+
+        slide.notes_slide.notes_text_frame.text = f"Speaker notes for slide {number}"
+    prs.save(path)
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_engine(engine, pptx_path, repeat, queue):
+    import logging
+    logging.disable(logging.INFO)
+    from modules.text_extraction import extract_text_from_ppt
+
+    baseline_rss = peak_rss_mb()
+    times = []
+    output = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = extract_text_from_ppt(pptx_path, engine=engine)
+        times.append(time.perf_counter() - start)
+    queue.put((engine, min(times), peak_rss_mb() - baseline_rss, output))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the python-pptx and streaming XML text engines")
+    parser.add_argument("pptx", nargs="?", help="deck to parse; a synthetic deck is generated when omitted")
+    parser.add_argument("--slides", type=int, default=1000, help="slides in the synthetic deck")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per engine, the fastest is reported")
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pptx_path = args.pptx
+        if pptx_path is None:
+            pptx_path = os.path.join(tmp, f"synthetic_{args.slides}.pptx")
+            start = time.perf_counter()
+            build_synthetic_deck(pptx_path, args.slides)
+            print(f"Generated {args.slides} slides in {time.perf_counter() - start:.1f}s "
+                  f"({os.path.getsize(pptx_path) / 1024 / 1024:.1f} MB)")
+
+        ctx = multiprocessing.get_context("spawn")
+        results = {}
+        for engine in [e.strip() for e in args.engines.split(",") if e.strip()]:
+            queue = ctx.Queue()
+            process = ctx.Process(target=run_engine, args=(engine, pptx_path, args.repeat, queue))
+            process.start()
+            try:
+                result = queue.get(timeout=1800)
+                results[result[0]] = result[1:]
+            except Exception as e:
+                print(f"{engine}: failed to run ({e})")
+            process.join()
+
+    baseline = results.get("pptx")
+    print(f"\n{'engine':<8} {'seconds':>8} {'slides/s':>9} {'peak MB':>8} {'same output':>12}")
+    for engine, (elapsed, peak_rss, output) in results.items():
+        slides = len(output)
+        agreement = (
+            sum(a == b for a, b in zip(output, baseline[-1])) / max(len(baseline[-1]), 1)
+            if baseline else float("nan")
+        )
+        print(f"{engine:<8} {elapsed:>8.2f} {slides / elapsed:>9.1f} {peak_rss:>8.1f} {agreement:>12.2%}")
+
+
+if __name__ == "__main__":
+    main()
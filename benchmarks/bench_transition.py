@@ -0,0 +1,85 @@
+# bench_transition.py
+# 对比过渡语生成后端（pipeline / quantized / onnx）的加载时间、单次延迟和输出质量
+#
+# 用法：
+#   python -m benchmarks.bench_transition [--backends pipeline,quantized,onnx] [--repeat 3]
+#
+# 质量以全精度 pipeline 的输出为基准：统计过渡语完全一致的比例和平均字符相似度。
+import argparse
+import difflib
+import statistics
+import time
+
+from modules.transition_backends import MODEL_ID, extract_transition, load_generator
+
+PROMPTS = [
+    ("深度学习基础", "本课程将深入讲解深度学习的基本原理"),
+    ("神经网络的基本概念", "神经网络的三大要素"),
+    ("加权求和", "非线性激活引入非线性并解决梯度消失问题"),
+    ("卷积神经网络", "局部感受野和池化操作构成了经典架构"),
+    ("生成对抗网络", "博弈论框架下的生成器与判别器"),
+    ("注意力机制", "Self-Attention 是 Transformer 架构的核心"),
+    ("强化学习基础", "马尔可夫决策过程与 Q-Learning"),
+    ("损失函数", "均方误差衡量真实值与预测值之间的差距"),
+]
+
+
+def run_backend(backend, repeat):
+    start = time.perf_counter()
+    generator = load_generator(backend, MODEL_ID, max_length=50)
+    load_time = time.perf_counter() - start
+
+    # 预热一次，排除首次调用的图构建开销
+    generator("预热", num_return_sequences=1, max_new_tokens=10)
+
+    latencies = []
+    outputs = []
+    for _ in range(repeat):
+        outputs = []
+        for prev_context, sentence in PROMPTS:
+            prompt = f"{prev_context}，接下来是{sentence}"
+            t0 = time.perf_counter()
+            generated = generator(prompt, num_return_sequences=1, max_new_tokens=10)[0]['generated_text']
+            latencies.append(time.perf_counter() - t0)
+            outputs.append(extract_transition(generated))
+    return load_time, latencies, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transition generator backends")
+    parser.add_argument("--backends", default="pipeline,quantized,onnx")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    if "pipeline" not in backends:
+        backends.insert(0, "pipeline")
+
+    results = {}
+    for backend in backends:
+        try:
+            results[backend] = run_backend(backend, args.repeat)
+        except Exception as e:
+            print(f"{backend}: failed to run ({e})")
+
+    baseline = results.get("pipeline")
+    print(f"\n{'backend':<10} {'load s':>8} {'mean ms':>8} {'p95 ms':>8} {'speedup':>8} {'exact':>6} {'similar':>8}")
+    for backend, (load_time, latencies, outputs) in results.items():
+        mean = statistics.mean(latencies)
+        p95 = sorted(latencies)[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+        speedup = statistics.mean(baseline[1]) / mean if baseline else float('nan')
+        exact = sum(a == b for a, b in zip(outputs, baseline[2])) / len(outputs) if baseline else float('nan')
+        similar = statistics.mean(
+            difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(outputs, baseline[2])
+        ) if baseline else float('nan')
+        print(f"{backend:<10} {load_time:>8.2f} {mean * 1000:>8.1f} {p95 * 1000:>8.1f} {speedup:>8.2f} {exact:>6.2f} {similar:>8.2f}")
+
+    if baseline:
+        print("\nSample transitions:")
+        for i, (prev_context, sentence) in enumerate(PROMPTS[:4]):
+            row = " | ".join(f"{backend}: {outputs[i]}" for backend, (_, _, outputs) in results.items())
+            print(f"  {prev_context} -> {sentence}\n    {row}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# calibrate_prefilter.py
+# 在带标注的样本集上衡量 OCR 预判的召回率与跳过比例，用于选择阈值
+#
+# 用法：
+#   python -m benchmarks.calibrate_prefilter <样本目录> [--labels labels.csv] [--use-gpu]
+#
+# labels.csv 每行 "文件名,是否含文本(0/1)"；未提供时以完整 PaddleOCR 的结果作为标注。
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+from modules.image_prefilter import (DEFAULT_AREA_RATIO, DEFAULT_EDGE_RATIO, DEFAULT_MAX_SIDE,
+                                     load_gray_thumbnail, text_scores)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff')
+
+
+def load_samples(sample_dir):
+    names = sorted(n for n in os.listdir(sample_dir) if n.lower().endswith(IMAGE_EXTENSIONS))
+    blobs = []
+    for name in names:
+        with open(os.path.join(sample_dir, name), "rb") as f:
+            blobs.append(f.read())
+    return names, blobs
+
+
+def load_labels(path):
+    labels = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if row and not row[0].startswith('#'):
+                labels[row[0].strip()] = row[1].strip() in ("1", "true", "True", "yes")
+    return labels
+
+
+def ocr_labels(blobs, use_gpu):
+    """以完整 OCR 是否识别出文本作为标注"""
+    from modules.ocr_engine import decode_image, run_ocr, OCRResult
+    from modules.ocr_manager import ocr_manager
+
+    labels = []
+    start = time.perf_counter()
+    with ocr_manager.acquire(lang='ch', use_gpu=use_gpu, use_angle_cls=True) as ocr:
+        for blob in blobs:
+            image = decode_image(blob)
+            labels.append((run_ocr(image, ocr) if image is not None else OCRResult()).has_text)
+    elapsed = time.perf_counter() - start
+    print(f"Full OCR: {len(blobs)} images in {elapsed:.2f}s ({elapsed / max(len(blobs), 1) * 1000:.1f} ms/image)")
+    return np.array(labels, dtype=bool)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the OCR text-presence prefilter")
+    parser.add_argument("sample_dir")
+    parser.add_argument("--labels", help="CSV file: filename,has_text")
+    parser.add_argument("--use-gpu", action="store_true")
+    parser.add_argument("--max-side", type=int, default=DEFAULT_MAX_SIDE)
+    parser.add_argument("--edge", default="0.001,0.0025,0.005,0.01,0.02")
+    parser.add_argument("--area", default="0.005,0.01,0.05")
+    args = parser.parse_args()
+
+    names, blobs = load_samples(args.sample_dir)
+    if not blobs:
+        raise SystemExit(f"No images found in {args.sample_dir}")
+
+    if args.labels:
+        label_map = load_labels(args.labels)
+        keep = [i for i, name in enumerate(names) if name in label_map]
+        names = [names[i] for i in keep]
+        blobs = [blobs[i] for i in keep]
+        truth = np.array([label_map[name] for name in names], dtype=bool)
+    else:
+        truth = ocr_labels(blobs, args.use_gpu)
+
+    start = time.perf_counter()
+    thumbnails = [load_gray_thumbnail(blob, args.max_side) for blob in blobs]
+    decodable = np.array([t is not None for t in thumbnails])
+    edge_ratio = np.full(len(blobs), np.inf)
+    area_ratio = np.full(len(blobs), np.inf)
+    if decodable.any():
+        edges, areas = text_scores([t for t in thumbnails if t is not None])
+        edge_ratio[decodable] = edges
+        area_ratio[decodable] = areas
+    elapsed = time.perf_counter() - start
+    print(f"Prefilter: {len(blobs)} images in {elapsed:.2f}s ({elapsed / len(blobs) * 1000:.2f} ms/image)")
+    print(f"Samples: {len(blobs)}, with text: {int(truth.sum())}, undecodable: {int((~decodable).sum())}\n")
+
+    print(f"{'edge':>8} {'area':>8} {'recall':>8} {'skipped':>8} {'missed':>7}")
+    for edge in (float(v) for v in args.edge.split(',')):
+        for area in (float(v) for v in args.area.split(',')):
+            passed = (edge_ratio > edge) & (area_ratio > area)
+            positives = max(int(truth.sum()), 1)
+            recall = (passed & truth).sum() / positives
+            skipped = (~passed).mean()
+            missed = int((~passed & truth).sum())
+            marker = "  <- default" if (edge, area) == (DEFAULT_EDGE_RATIO, DEFAULT_AREA_RATIO) else ""
+            print(f"{edge:>8g} {area:>8g} {recall:>8.3f} {skipped:>8.3f} {missed:>7d}{marker}")
+
+    passed = (edge_ratio > DEFAULT_EDGE_RATIO) & (area_ratio > DEFAULT_AREA_RATIO)
+    missed_names = [name for name, p, t in zip(names, passed, truth) if t and not p]
+    if missed_names:
+        print("\nImages with text skipped at default thresholds:")
+        for name in missed_names:
+            print(f"  {name}")
+
+
+if __name__ == "__main__":
+    main()
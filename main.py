@@ -1,13 +1,24 @@
 # main.py
-from modules.ppt_text_extraction import extract_text_from_ppt, extract_metadata, extract_text_from_ppt_legacy, extract_metadata_from_ppt_legacy
 from modules.image_extraction_t import extract_images_from_ppt_tesseract
-from modules.image_extraction_p import extract_images_from_ppt_paddleocr, extract_images_from_ppt_legacy
-from modules.ai_optimizer import optimize_text_with_ai
+from modules.ai_optimizer import load_models, optimize_deck_record, SPACY_MODE, TRANSITION_BACKEND
+from modules.optimizer_cache import OptimizedTextCache
+from modules.transition_backends import MODEL_ID
+from modules.pipeline import extract_deck_record
+from modules.ocr_cache import OCRResultCache
+from modules.slide_cache import SlideCache
+from modules.ocr_pool import OCRProcessPool
+from modules.image_prefilter import TextPrefilter
+from modules.image_triage import ImageTriage
 from modules.utils import setup_logger, validate_file_type
+from modules.deadline import Deadline, wait_for
+from modules.batch import Manifest, discover_decks, output_path, run_batch
+from modules.ocr_manager import ocr_manager
 from modules.config import PPTX_FILE, OUTPUT_DIR, PPTX_FILE_2, OUTPUT_DIR_2
 import warnings
-import re
+import argparse
 import os
+import sys
+import time
 from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
@@ -20,92 +31,185 @@ logger = setup_logger()
 USE_GPU = os.getenv("USE_GPU", "False").lower() in ("true", "1", "yes")
 logger.info(f"GPU enabled: {USE_GPU}")
 
+# Number of OCR worker processes, 0 runs OCR inside the processing thread
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", 0))
+logger.info(f"OCR workers: {OCR_WORKERS}")
+
+# Text lines per batch for cross-image OCR, 0 keeps per-image OCR
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", 0))
+
+# Cheap text-presence prefilter that skips images without visible text
+OCR_PREFILTER = os.getenv("OCR_PREFILTER", "False").lower() in ("true", "1", "yes")
+PREFILTER_EDGE_RATIO = float(os.getenv("PREFILTER_EDGE_RATIO", 0.005))
+PREFILTER_AREA_RATIO = float(os.getenv("PREFILTER_AREA_RATIO", 0.01))
+prefilter = TextPrefilter(PREFILTER_EDGE_RATIO, PREFILTER_AREA_RATIO) if OCR_PREFILTER else None
+
+# Export images and OCR text in the slide_N/image/ layout (written in the background)
+EXPORT_ARTIFACTS = os.getenv("EXPORT_ARTIFACTS", "False").lower() in ("true", "1", "yes")
+
+# Header-based triage: skip icons whose long side is below OCR_MIN_SIDE and downscale rasters above OCR_MAX_SIDE
+OCR_TRIAGE = os.getenv("OCR_TRIAGE", "True").lower() in ("true", "1", "yes")
+OCR_MIN_SIDE = int(os.getenv("OCR_MIN_SIDE", 32))
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", 2048))
+triage = ImageTriage(OCR_MIN_SIDE, OCR_MAX_SIDE) if OCR_TRIAGE else None
+
+# OCR result cache keyed by image content, set OCR_CACHE_PATH to an empty string to disable
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(OUTPUT_DIR_2, ".cache", "ocr_cache.sqlite3"))
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", 512))
+ocr_cache = OCRResultCache(OCR_CACHE_PATH, OCR_CACHE_MAX_MB * 1024 * 1024, max_side=OCR_MAX_SIDE if OCR_TRIAGE else None) if OCR_CACHE_PATH else None
+
+# Cache of optimized text keyed by the combined deck text, set OPTIMIZER_CACHE_PATH to an empty string to disable
+OPTIMIZER_CACHE_PATH = os.getenv("OPTIMIZER_CACHE_PATH", os.path.join(OUTPUT_DIR_2, ".cache", "optimizer_cache.sqlite3"))
+OPTIMIZER_CACHE_MAX_MB = int(os.getenv("OPTIMIZER_CACHE_MAX_MB", 64))
+optimizer_cache = OptimizedTextCache(OPTIMIZER_CACHE_PATH, MODEL_ID, TRANSITION_BACKEND, SPACY_MODE, OPTIMIZER_CACHE_MAX_MB * 1024 * 1024) if OPTIMIZER_CACHE_PATH else None
+
+# Seed for phrase choices and sampling, set it to make optimized text reproducible
+OPTIMIZER_SEED = int(os.getenv("OPTIMIZER_SEED")) if os.getenv("OPTIMIZER_SEED") else None
+
+# Processing deadline in seconds, extended per slide and per image up to REQUEST_TIMEOUT_MAX (0 means no cap);
+# when it is reached the slides finished so far are saved as a partial result
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", 120))
+REQUEST_TIMEOUT_PER_SLIDE = float(os.getenv("REQUEST_TIMEOUT_PER_SLIDE", 1))
+REQUEST_TIMEOUT_PER_IMAGE = float(os.getenv("REQUEST_TIMEOUT_PER_IMAGE", 0.5))
+REQUEST_TIMEOUT_MAX = float(os.getenv("REQUEST_TIMEOUT_MAX", 600))
+
+# Per-slide cache keyed by slide content fingerprints, so an edited deck only re-OCRs and re-narrates
+# the slides that changed; set SLIDE_CACHE_PATH to an empty string to disable
+SLIDE_CACHE_PATH = os.getenv("SLIDE_CACHE_PATH", os.path.join(OUTPUT_DIR_2, ".cache", "slide_cache.sqlite3"))
+SLIDE_CACHE_MAX_MB = int(os.getenv("SLIDE_CACHE_MAX_MB", 256))
+SLIDE_CONFIG = (f"model={MODEL_ID};backend={TRANSITION_BACKEND};spacy={SPACY_MODE};"
+                f"seed={'none' if OPTIMIZER_SEED is None else OPTIMIZER_SEED};"
+                f"triage=icon{OCR_MIN_SIDE}-{OCR_MAX_SIDE if OCR_TRIAGE else 'off'};"
+                f"prefilter={f'{PREFILTER_EDGE_RATIO}-{PREFILTER_AREA_RATIO}' if OCR_PREFILTER else 'off'};"
+                f"images=media-parts")
+slide_cache = SlideCache(SLIDE_CACHE_PATH, SLIDE_CONFIG, SLIDE_CACHE_MAX_MB * 1024 * 1024) if SLIDE_CACHE_PATH else None
+
+ocr_pool = OCRProcessPool(OCR_WORKERS, lang='ch', use_gpu=USE_GPU, batch_size=OCR_BATCH_SIZE) if OCR_WORKERS > 0 else None
+
 # Thread pool for async processing
 executor = ThreadPoolExecutor(max_workers=2)
 
+SUPPORTED_FORMATS = ['.ppt', '.pptx', '.pot', '.potx', '.pps', '.ppsx', '.pptm', '.pdf']
+
+# Batch mode: number of deck worker processes, each loads its own OCR model
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 2))
+# Batch mode: per-deck deadline in seconds, 0 means no deadline. Separate from REQUEST_TIMEOUT so
+# large decks in unattended runs are not cut off and redone as partial on every run
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", 0))
+
+def new_deadline():
+    return Deadline(REQUEST_TIMEOUT, REQUEST_TIMEOUT_PER_SLIDE, REQUEST_TIMEOUT_PER_IMAGE, REQUEST_TIMEOUT_MAX or None)
+
+def new_batch_deadline():
+    """Per-deck deadline for batch runs, None when BATCH_TIMEOUT is 0"""
+    return Deadline(BATCH_TIMEOUT) if BATCH_TIMEOUT > 0 else None
+
+def process_deck(file_path, output_file, artifact_dir=OUTPUT_DIR_2, deadline=None):
+    """Extract, optimize and save one deck, returns (optimized_text, record)"""
+    # Extract metadata, slide text and image text into a DeckRecord (the PPTX is parsed once)
+    record = extract_deck_record(file_path, artifact_dir, use_gpu=USE_GPU, ocr_cache=ocr_cache, export_artifacts=EXPORT_ARTIFACTS, batch_size=OCR_BATCH_SIZE, ocr_pool=ocr_pool, prefilter=prefilter, triage=triage, deadline=deadline, slide_cache=slide_cache)
+    if record.metadata_error:
+        raise Exception(f"Metadata extraction failed: {record.metadata_error}")
+    if not record.content_slides:
+        logger.warning("No text extracted from PPT slides or images.")
+
+    # Optimize text with AI directly from the records
+    optimized_text, _ = optimize_deck_record(record, cache=optimizer_cache, seed=OPTIMIZER_SEED, deadline=deadline, slide_cache=slide_cache)
+    if not optimized_text:
+        logger.warning("Text optimization returned empty, using combined output as fallback")
+        optimized_text = record.render()
+
+    # Save result
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(optimized_text)
+    if record.partial or (deadline is not None and deadline.expired):
+        record.partial = True
+        logger.warning(f"Deadline reached, saved partial result: {output_file}")
+    else:
+        logger.info(f"File processed successfully: {output_file}")
+
+    return optimized_text, record
+
 def process_ppt_file(file_path):
     warnings.filterwarnings("ignore", category=UserWarning, module="PIL.Image")
-    if not validate_file_type(file_path, ['.ppt', '.pptx', '.pot', '.potx', '.pps', '.ppsx', '.pptm', '.pdf']):
+    if not validate_file_type(file_path, SUPPORTED_FORMATS):
         logger.error(f"Invalid file type: {file_path}. Skipping.")
         return
 
     logger.info(f"Processing file: {file_path}")
-    
+    deadline = new_deadline()
+    output_file = os.path.abspath(os.path.join(OUTPUT_DIR_2, "optimized_output.txt"))
+
     try:
-        # Asynchronous processing function
-        def process_file(file_path):
-            ext = os.path.splitext(file_path.lower())[1]
-            is_pptx = ext == '.pptx'
-
-            # Extract metadata
-            metadata = extract_metadata(file_path) if is_pptx else extract_metadata_from_ppt_legacy(file_path)
-            if "Error" in metadata:
-                logger.error(f"Metadata extraction failed: {metadata['Error']}")
-                raise Exception(f"Metadata extraction failed: {metadata['Error']}")
-            metadata_output = "\n".join([f"{key}: {value}" for key, value in metadata.items()])
-            logger.info("Metadata extracted successfully.")
-
-            # Extract slide text
-            text_output = extract_text_from_ppt(file_path) if is_pptx else extract_text_from_ppt_legacy(file_path)
-            if not text_output:
-                logger.warning("No text extracted from PPT slides.")
-                text_output = []
-
-            # Extract image text (using PaddleOCR with GPU option)
-            image_output = extract_images_from_ppt_paddleocr(file_path, OUTPUT_DIR_2, use_gpu=USE_GPU) if is_pptx else extract_images_from_ppt_legacy(file_path, OUTPUT_DIR_2, use_gpu=USE_GPU)
-            if not image_output:
-                logger.warning("No image text extracted.")
-                image_output = []
-
-            # Clean and combine text
-            cleaned_text_output = clean_text_output(text_output + image_output)
-            combined_output = "\n".join([metadata_output] + cleaned_text_output)
-            if not combined_output.strip():
-                logger.warning("No combined output generated")
-                combined_output = "No content extracted"
-
-            # Optimize text with AI
-            optimized_text = optimize_text_with_ai(combined_output)
-            if not optimized_text:
-                logger.warning("Text optimization returned empty, using combined output as fallback")
-                optimized_text = combined_output
-
-            # Save result
-            output_file = os.path.abspath(os.path.join(OUTPUT_DIR_2, "optimized_output.txt"))
-            os.makedirs(OUTPUT_DIR_2, exist_ok=True)
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(optimized_text)
-            logger.info(f"File processed successfully: {output_file}")
-
-            return optimized_text
-
-        # Run processing in a thread with timeout
-        future = executor.submit(process_file, file_path)
-        optimized_text = future.result(timeout=120)  # 2 分钟超时
+        # Run processing in a thread; the worker stops at the deadline and is cancelled if it overruns
+        future = executor.submit(process_deck, file_path, output_file, deadline=deadline)
+        optimized_text, _ = wait_for(future, deadline)
 
     except TimeoutError:
         logger.error(f"Processing timed out for file: {file_path}")
     except Exception as e:
         logger.error(f"Error processing file {file_path}: {str(e)}")
 
-def clean_text_output(text_list):
-    """清理提取的文本，去除冗余信息（如水印）并优化结构"""
-    cleaned_output = []
-    watermark_pattern = re.compile(r'stablediffusionweb\.com')  # 假设这是常见的水印
-    for slide in text_list:
-        # 跳过空幻灯片
-        if not slide.strip():
-            continue
-        # 去除水印
-        cleaned_slide = watermark_pattern.sub('', slide)
-        # 清理多余换行和空格
-        cleaned_slide = re.sub(r'\n\s*\n', '\n', cleaned_slide.strip())
-        cleaned_output.append(cleaned_slide)
-    return cleaned_output
+def init_batch_worker():
+    """Load the OCR model once per batch worker process"""
+    warnings.filterwarnings("ignore", category=UserWarning, module="PIL.Image")
+    try:
+        if ocr_pool is not None:
+            ocr_pool.warmup()
+        else:
+            ocr_manager.warmup(lang='ch', use_gpu=USE_GPU, use_angle_cls=True)
+    except Exception as e:
+        logger.error(f"OCR model warmup failed: {str(e)}")
+
+def process_batch_deck(file_path, output_file):
+    """Batch worker: process one deck under its own BATCH_TIMEOUT deadline, returns stats for the manifest"""
+    deadline = new_batch_deadline()
+    _, record = process_deck(file_path, output_file, artifact_dir=f"{os.path.splitext(output_file)[0]}_artifacts", deadline=deadline)
+    return {
+        "partial": record.partial,
+        "slides": len(record.slides),
+        "images": sum(len(slide.ocr) for slide in record.slides),
+    }
+
+def process_batch(inputs, output_dir, workers=BATCH_WORKERS, manifest_path=None, force=False):
+    """
+    Process every deck under the given files, directories or globs on a process pool.
+    Each deck gets its own output file that mirrors the input layout, and a JSON Lines
+    manifest records status, timing and input hash so an interrupted run resumes.
+    """
+    decks = discover_decks(inputs, SUPPORTED_FORMATS)
+    if not decks:
+        logger.error(f"No decks found in: {', '.join(inputs)}")
+        return {}
+    taken = set()
+    jobs = [(path, output_path(output_dir, relative, taken)) for path, relative in decks]
+    manifest = Manifest(manifest_path or os.path.join(output_dir, "manifest.jsonl"))
+    logger.info(f"Batch: {len(jobs)} decks, {workers} workers, manifest {manifest.path}")
+
+    start = time.perf_counter()
+    counts = run_batch(jobs, process_batch_deck, manifest, workers=workers, initializer=init_batch_worker, force=force)
+    logger.info(f"Batch finished in {time.perf_counter() - start:.1f}s: "
+                f"{counts['done']} done, {counts['partial']} partial, {counts['failed']} failed, {counts['skipped']} skipped")
+    return counts
 
 def main():
-    # process_ppt_file(PPTX_FILE)
-    process_ppt_file(PPTX_FILE_2)
+    parser = argparse.ArgumentParser(description="Extract and optimize PPT text, one deck or whole directories in batch")
+    parser.add_argument("inputs", nargs="*", help="deck files, directories (searched recursively) or globs such as 'courses/**/*.pptx'")
+    parser.add_argument("--output-dir", default=os.path.join(OUTPUT_DIR_2, "batch"), help="one output file per deck, mirroring the input layout")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="deck worker processes, 1 processes decks in this process")
+    parser.add_argument("--manifest", default=None, help="manifest path, defaults to <output-dir>/manifest.jsonl")
+    parser.add_argument("--force", action="store_true", help="reprocess decks the manifest marks as done")
+    args = parser.parse_args()
+
+    if not args.inputs:
+        # process_ppt_file(PPTX_FILE)
+        process_ppt_file(PPTX_FILE_2)
+        return 0
+    # Load spaCy and the generator before the batch pool forks so the workers share them
+    load_models()
+    counts = process_batch(args.inputs, os.path.abspath(args.output_dir), args.workers, args.manifest, args.force)
+    return 1 if not counts or counts["failed"] else 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
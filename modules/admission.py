@@ -0,0 +1,296 @@
+# admission.py
+# 上传接口的准入控制：限制排队中和处理中的请求总数及单个客户端的并发数，超出时立即拒绝并给出重试时间
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 尚无完成记录时假定的单个请求处理耗时（秒）
+DEFAULT_SERVICE_TIME = 30.0
+# 估算吞吐量时参考最近多少次完成记录
+THROUGHPUT_WINDOW = 32
+# Retry-After 的上下限（秒）
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 600
+
+
+class Overloaded(Exception):
+    """请求被准入控制拒绝；retry_after 为建议的重试等待秒数"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """一个已准入的请求，处理结束后调用 release()（可重复调用）"""
+    __slots__ = ("controller", "client", "admitted", "released", "key")
+
+    def __init__(self, controller: "AdmissionController", client: str, key: Optional[int] = None):
+        self.controller = controller
+        self.client = client
+        self.admitted = controller.clock()
+        self.released = False
+        # SharedAdmissionController 中对应的记录 id
+        self.key = key
+
+    def release(self, completed: bool = True):
+        """completed 为 False 时（如参数错误、上传失败）不计入吞吐量"""
+        self.controller._release(self, completed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release(completed=exc_type is None)
+
+
+class AdmissionController:
+    """
+    有界的请求队列。
+
+    max_pending 为同时排队和处理中的请求上限，max_per_client 为单个客户端的并发上限（<= 0 表示不限）。
+    拒绝时的 Retry-After 按当前积压数除以最近观测到的吞吐量（完成数/秒）估算。
+    """
+
+    def __init__(self, max_pending: int, max_per_client: int = 0, clock: Callable[[], float] = time.monotonic):
+        self.max_pending = max(1, max_pending)
+        self.max_per_client = max_per_client
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._clients: Dict[str, int] = {}
+        self._completions = deque(maxlen=THROUGHPUT_WINDOW)
+        self._service_times = deque(maxlen=THROUGHPUT_WINDOW)
+        self.admitted = 0
+        self.rejected = 0
+
+    def throughput(self) -> float:
+        """最近观测到的完成速率（请求/秒）"""
+        with self._lock:
+            return self._throughput()
+
+    def _throughput(self) -> float:
+        if len(self._completions) >= 2:
+            span = self._completions[-1] - self._completions[0]
+            if span > 0:
+                return (len(self._completions) - 1) / span
+        # 完成记录不足时按平均处理耗时估算
+        if self._service_times:
+            return 1.0 / max(sum(self._service_times) / len(self._service_times), 1e-3)
+        return 1.0 / DEFAULT_SERVICE_TIME
+
+    def _retry_after(self, backlog: int) -> int:
+        seconds = math.ceil(max(backlog, 1) / self._throughput())
+        return min(max(seconds, MIN_RETRY_AFTER), MAX_RETRY_AFTER)
+
+    def admit(self, client: str) -> Ticket:
+        """
+        准入一个请求。
+
+        Args:
+            client (str): 客户端标识，如来源 IP。
+
+        Returns:
+            Ticket: 处理结束后需要 release()。
+
+        Raises:
+            Overloaded: 队列已满或该客户端的并发数已达上限。
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                retry_after = self._retry_after(self._pending)
+                raise Overloaded(f"Server is busy: {self._pending} requests pending", retry_after)
+            if self.max_per_client > 0 and self._clients.get(client, 0) >= self.max_per_client:
+                self.rejected += 1
+                retry_after = self._retry_after(self._clients[client])
+                raise Overloaded(f"Too many concurrent requests from this client (limit {self.max_per_client})", retry_after)
+            self._pending += 1
+            self._clients[client] = self._clients.get(client, 0) + 1
+            self.admitted += 1
+        return Ticket(self, client)
+
+    def _release(self, ticket: Ticket, completed: bool):
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._pending -= 1
+            remaining = self._clients.get(ticket.client, 1) - 1
+            if remaining > 0:
+                self._clients[ticket.client] = remaining
+            else:
+                self._clients.pop(ticket.client, None)
+            if completed:
+                now = self.clock()
+                self._completions.append(now)
+                self._service_times.append(now - ticket.admitted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "clients": len(self._clients),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "throughput": round(self._throughput(), 4),
+            }
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedAdmissionController(AdmissionController):
+    """
+    多进程共享的准入控制，上限和 Retry-After 的含义与 AdmissionController 相同。
+
+    排队和处理中的请求及最近的完成记录保存在 SQLite 文件中，serve.py 的各工作进程共用同一组上限；
+    准入检查在 BEGIN IMMEDIATE 事务内完成，多个进程同时准入时不会超出上限。
+    进程异常退出后遗留的记录在即将拒绝请求时按进程号清理。admitted / rejected 为本进程的计数。
+    """
+
+    def __init__(self, path: str, max_pending: int, max_per_client: int = 0, clock: Callable[[], float] = time.time):
+        super().__init__(max_pending, max_per_client, clock)
+        self.path = os.path.abspath(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork 之后不能沿用父进程的连接
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tickets ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, client TEXT NOT NULL, pid INTEGER NOT NULL, admitted REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_client ON tickets(client)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, finished REAL NOT NULL, service_time REAL NOT NULL)"
+            )
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _counts(conn: sqlite3.Connection, client: str):
+        pending = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+        mine = conn.execute("SELECT COUNT(*) FROM tickets WHERE client = ?", (client,)).fetchone()[0]
+        return pending, mine
+
+    def _full(self, pending: int, mine: int) -> bool:
+        return pending >= self.max_pending or (self.max_per_client > 0 and mine >= self.max_per_client)
+
+    @staticmethod
+    def _purge_dead(conn: sqlite3.Connection):
+        dead = [pid for (pid,) in conn.execute("SELECT DISTINCT pid FROM tickets") if not _alive(pid)]
+        if dead:
+            conn.executemany("DELETE FROM tickets WHERE pid = ?", [(pid,) for pid in dead])
+            logger.warning(f"Released admission slots held by exited processes: {dead}")
+
+    def _load_completions(self, conn: sqlite3.Connection):
+        """把共享的完成记录载入本地窗口，供 _throughput() 估算"""
+        rows = conn.execute(
+            "SELECT finished, service_time FROM completions ORDER BY id DESC LIMIT ?", (THROUGHPUT_WINDOW,)
+        ).fetchall()
+        self._completions.clear()
+        self._service_times.clear()
+        for finished, service_time in reversed(rows):
+            self._completions.append(finished)
+            self._service_times.append(service_time)
+
+    def admit(self, client: str) -> Ticket:
+        rejection = None
+        with self._transaction() as conn:
+            pending, mine = self._counts(conn, client)
+            if self._full(pending, mine):
+                self._purge_dead(conn)
+                pending, mine = self._counts(conn, client)
+            if pending >= self.max_pending:
+                self._load_completions(conn)
+                rejection = Overloaded(f"Server is busy: {pending} requests pending", self._retry_after(pending))
+            elif self.max_per_client > 0 and mine >= self.max_per_client:
+                self._load_completions(conn)
+                rejection = Overloaded(f"Too many concurrent requests from this client (limit {self.max_per_client})",
+                                       self._retry_after(mine))
+            else:
+                key = conn.execute(
+                    "INSERT INTO tickets (client, pid, admitted) VALUES (?, ?, ?)", (client, os.getpid(), self.clock())
+                ).lastrowid
+            if rejection is not None:
+                self.rejected += 1
+            else:
+                self.admitted += 1
+        if rejection is not None:
+            raise rejection
+        return Ticket(self, client, key)
+
+    def _release(self, ticket: Ticket, completed: bool):
+        with self._transaction() as conn:
+            if ticket.released:
+                return
+            ticket.released = True
+            conn.execute("DELETE FROM tickets WHERE id = ?", (ticket.key,))
+            if completed:
+                now = self.clock()
+                conn.execute("INSERT INTO completions (finished, service_time) VALUES (?, ?)", (now, now - ticket.admitted))
+                conn.execute("DELETE FROM completions WHERE id <= (SELECT MAX(id) FROM completions) - ?", (THROUGHPUT_WINDOW,))
+
+    def reset(self):
+        """清空记录，由 serve.py 的主进程在启动工作进程前调用，丢弃上次运行遗留的记录"""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tickets")
+            conn.execute("DELETE FROM completions")
+
+    def throughput(self) -> float:
+        with self._lock:
+            self._load_completions(self._connect())
+            return self._throughput()
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connect()
+            self._load_completions(conn)
+            pending, clients = conn.execute("SELECT COUNT(*), COUNT(DISTINCT client) FROM tickets").fetchone()
+            return {
+                "pending": pending,
+                "max_pending": self.max_pending,
+                "clients": clients,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "throughput": round(self._throughput(), 4),
+            }
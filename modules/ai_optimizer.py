@@ -151,89 +151,362 @@
 ##########################################
 
 import re
+import os
 import logging
 import random
-from transformers import pipeline
-import spacy
-
-# 加载 Spacy 模型
-nlp = spacy.load("zh_core_web_sm")
-
-# 加载 Transformers 模型（文本生成）
-generator = pipeline("text-generation", model="uer/gpt2-chinese-cluecorpussmall", max_length=50)
+import threading
+import time
+from dotenv import load_dotenv
+from modules.nlp_pipeline import load_nlp, split_sentences
+from modules.rule_narrator import narrate_slide
+from modules.deadline import expired
+from modules.transition_backends import MODEL_ID, TransitionMemo, generate_transitions, load_generator
+
+# 载入环境变量
+load_dotenv()
+
+# 过渡语生成后端：pipeline（全精度）、quantized（动态 int8 量化）或 onnx（ONNX Runtime）
+TRANSITION_BACKEND = os.getenv("TRANSITION_BACKEND", "pipeline").lower()
+# 整份文稿的过渡语按该批大小一次性生成
+TRANSITION_BATCH_SIZE = int(os.getenv("TRANSITION_BATCH_SIZE", "16"))
+# 过渡语记忆表：按 prompt 缓存生成结果，条目数上限及过期秒数（<= 0 表示不过期）
+TRANSITION_MEMO_SIZE = int(os.getenv("TRANSITION_MEMO_SIZE", "4096"))
+TRANSITION_MEMO_TTL = float(os.getenv("TRANSITION_MEMO_TTL", "3600"))
+
+# spaCy 分句模式：full（完整模型）、lean（只加载分句所需组件）或 sentencizer（规则分句）
+SPACY_MODE = os.getenv("SPACY_MODE", "full").lower()
+# 所有幻灯片在一次 nlp.pipe 调用中分句的批大小和工作进程数
+SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", "64"))
+SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", "1"))
+
+# 优化档位：auto（在耗时预算内用模型，超出后其余幻灯片用规则）、model（全部用模型）或 fast（全部用规则）
+TIERS = ("auto", "model", "fast")
+OPTIMIZER_TIER = os.getenv("OPTIMIZER_TIER", "auto").lower()
+# auto 档的耗时预算（秒），<= 0 表示不限
+OPTIMIZER_BUDGET = float(os.getenv("OPTIMIZER_BUDGET", "60"))
+# auto 档每批用模型处理的幻灯片数，每批结束后重新估算剩余预算
+BUDGET_CHUNK_SLIDES = 8
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-def optimize_text_with_ai(text):
+# spaCy 和生成模型在首次使用或调用 load_models() 时加载；
+# 只导入本模块的进程（如按 spawn 启动、会重新导入主模块的 OCR 工作进程）不会加载模型
+_nlp = None
+_generator = None
+_models_lock = threading.Lock()
+
+def load_models():
+    """
+    加载 spaCy 分句模型和过渡语生成模型，进程内只加载一次。
+
+    服务启动或 fork 工作进程之前调用，可避免首个请求承担加载时间，并让子进程按写时复制共享模型。
+
+    Returns:
+        tuple: (spaCy 模型, 文本生成 pipeline)。
+    """
+    global _nlp, _generator
+    with _models_lock:
+        if _nlp is None:
+            _nlp = load_nlp(SPACY_MODE)
+        if _generator is None:
+            _generator = load_generator(TRANSITION_BACKEND, MODEL_ID, max_length=50, onnx_dir=os.getenv("ONNX_MODEL_DIR") or None)
+    return _nlp, _generator
+
+transition_memo = TransitionMemo(TRANSITION_MEMO_SIZE, TRANSITION_MEMO_TTL)
+
+class _PendingTransitions:
+    """
+    延迟生成的过渡语。
+
+    处理幻灯片时只记录 prompt 并写入占位符；resolve() 按批生成尚未生成的过渡语，
+    render() 在整份文稿处理完后按顺序替换回正文。
+    """
+    _PLACEHOLDER = re.compile(r'\x00(\d+)\x00')
+
+    def __init__(self, rng, seed=None, deadline=None):
+        self.prompts = []
+        self.resolved = []
+        self.rng = rng
+        self.seed = seed
+        self.deadline = deadline
+
+    def request(self, prev_context, current_line):
+        if not prev_context:
+            return "我们先来看看，"
+        self.prompts.append(f"{prev_context}，接下来是{current_line}")
+        return f"\x00{len(self.prompts) - 1}\x00"
+
+    def resolve(self):
+        pending = self.prompts[len(self.resolved):]
+        if not pending:
+            return
+        # 指定种子时按 prompt 派生采样种子逐条生成，使同一输入的生成结果可复现
+        self.resolved.extend(generate_transitions(load_models()[1], pending, TRANSITION_BATCH_SIZE, rng=self.rng,
+                                                  memo=transition_memo, deadline=self.deadline, seed=self.seed))
+
+    def render(self, text):
+        if not self.prompts:
+            return text
+        self.resolve()
+        return self._PLACEHOLDER.sub(lambda m: self.resolved[int(m.group(1))], text)
+
+def _clean_line(line):
+    """去掉列表符号、水印和多余空白，供模型档分句"""
+    return re.sub(r'[▪•\-\t]|stablediffusionweb\.com|WHATEV-VEER\.|\s{2,}', ' ', line).strip()
+
+# 多样化表达库
+METADATA_ENDS = ["课程资料齐全，我们马上开讲！", "文本就位，接下来直入主题！"]
+SLIDE_INTROS = ["我们先从这里入手，聊聊", "接下来带大家走进", "现在一起探讨", "那就让我们开始"]
+SECTION_ENDS = ["这部分先告一段落，接下来有新亮点", "聊到这里，我们转向新内容", "先到这儿，后续更精彩"]
+FINAL_CLOSINGS = ["今天的课程到此结束，大家收获如何？下次见！", 
+                  "好了，这节内容就先画个句号，咱们下次再续！"]
+
+def optimize_text_with_ai(text, cache=None, seed=None, tier=None, budget=None):
     """
     使用 Transformers 和 Spacy 优化 PPT 文本，生成自然、复杂的讲解内容。
+
+    Args:
+        text (str): 合并后的演示文稿文本。
+        cache (OptimizedTextCache, optional): 优化结果缓存，命中时直接返回。
+        seed (int, optional): 随机种子；指定后措辞选择和生成采样都可复现。
+        tier (str, optional): 优化档位，见 optimize_text_tiered。
+        budget (float, optional): 模型档的耗时预算（秒），见 optimize_text_tiered。
+
+    Returns:
+        str: 优化后的文本，出错时返回原文本。
     """
-    try:
+    return optimize_text_tiered(text, tier=tier, budget=budget, cache=cache, seed=seed)[0]
+
+def optimize_text_tiered(text, tier=None, budget=None, cache=None, seed=None):
+    """
+    分级优化以 "@@@Slide_N@@@" 分隔的合并文本。
+
+    文本先解析为元数据行和各幻灯片的文本行，再交给 _optimize；
+    已有 DeckRecord 时应直接调用 optimize_deck_record，省去字符串的拼接和解析。
+
+    - "model"：所有幻灯片都由 spaCy 分句加生成模型过渡语处理；
+    - "fast"：所有幻灯片都由 rule_narrator 按规则处理，不调用模型；
+    - "auto"：按顺序逐批用模型档处理，预计超出耗时预算时，其余幻灯片改用快速档。
+
+    Args:
+        text (str): 合并后的演示文稿文本。
+        tier (str, optional): "auto"、"model" 或 "fast"，默认取 OPTIMIZER_TIER。
+        budget (float, optional): "auto" 档的耗时预算（秒），默认取 OPTIMIZER_BUDGET，<= 0 表示不限。
+        cache (OptimizedTextCache, optional): 优化结果缓存。
+        seed (int, optional): 随机种子。
+
+    Returns:
+        tuple: (优化后的文本, {"model": [幻灯片序号], "fast": [幻灯片序号]})；出错时返回原文本和空字典。
+    """
+    def parse():
         # 预处理文本
         lines = [line.strip() for line in text.split('\n') if line.strip()]
-        optimized_lines = []
-        slide_count = 0
+        metadata_lines = []
+        has_revision = False
+        slides = []
+        orphan_lines = []
         current_section = "metadata"
-        slide_buffer = []
-        prev_context = None
 
-        # 多样化表达库
-        metadata_ends = ["课程资料齐全，我们马上开讲！", "文本就位，接下来直入主题！"]
-        slide_intros = ["我们先从这里入手，聊聊", "接下来带大家走进", "现在一起探讨", "那就让我们开始"]
-        section_ends = ["这部分先告一段落，接下来有新亮点", "聊到这里，我们转向新内容", "先到这儿，后续更精彩"]
-        final_closings = ["今天的课程到此结束，大家收获如何？下次见！", 
-                          "好了，这节内容就先画个句号，咱们下次再续！"]
-
-        for i, line in enumerate(lines):
+        for line in lines:
             # 元数据处理
             if current_section == "metadata" and ':' in line:
                 key, value = line.split(':', 1)
-                optimized_lines.append(f"{key.strip()}: {value.strip()}")
+                metadata_lines.append(f"{key.strip()}: {value.strip()}")
                 if "Revision" in key:
-                    optimized_lines.append(f"\n{random.choice(metadata_ends)}")
+                    has_revision = True
                     current_section = "slides"
                 continue
 
             # 幻灯片分隔符
             slide_match = re.match(r'(?:接下来聊聊|让我们进入|现在我们来看)第 (\d+) 张幻灯片：', line)
             if slide_match or re.match(r'@@@Slide_\d+@@@', line):
-                slide_count += 1
-                if slide_buffer:
-                    optimized_lines.append(_process_slide(slide_buffer, prev_context, slide_count - 1))
-                    slide_buffer = []
-                if slide_count > 1:
-                    optimized_lines.append(f"\n{random.choice(section_ends)}")
-                optimized_lines.append(f"\n{random.choice(slide_intros)}第 {slide_count} 张幻灯片：")
+                slides.append((len(slides) + 1, []))
                 continue
 
-            # 清理无用内容
-            cleaned_line = re.sub(r'[▪•\-\t]|stablediffusionweb\.com|WHATEV-VEER\.|\s{2,}', ' ', line).strip()
-            if not cleaned_line:
+            # 清理后为空的行直接跳过；保留原始行，快速档需要列表符号
+            if not _clean_line(line):
                 continue
+            if slides:
+                slides[-1][1].append(line)
+            else:
+                orphan_lines.append(line)
 
-            # 添加到幻灯片缓冲区
-            slide_buffer.append(cleaned_line)
+        # 第一个分隔符之前的非元数据行归入第一张幻灯片
+        if orphan_lines:
+            if slides:
+                slides[0] = (slides[0][0], orphan_lines + slides[0][1])
+            else:
+                slides.append((1, orphan_lines))
+        return metadata_lines, has_revision, slides
 
-        # 处理最后一个幻灯片
-        if slide_buffer:
-            final_text = _process_final_slide(slide_buffer, prev_context, slide_count)
-            optimized_lines.append(final_text)
-        optimized_lines.append(f"\n{random.choice(final_closings)}")
+    return _optimize(text, parse, text, tier, budget, cache, seed)
 
-        optimized_text = "\n".join(optimized_lines)
-        logger.info("Text optimization completed successfully.")
-        return optimized_text
+def optimize_deck_record(record, tier=None, budget=None, cache=None, seed=None, progress=None, on_slide=None, deadline=None,
+                         slide_cache=None):
+    """
+    直接从 DeckRecord 分级优化，不经过 "@@@Slide_N@@@" 字符串。
+
+    元数据来自 record.metadata，幻灯片按实际序号编号，图片文本归入各自的幻灯片。
+
+    Args:
+        record (DeckRecord): 提取结果。
+        tier (str, optional): 优化档位，见 optimize_text_tiered。
+        budget (float, optional): 耗时预算（秒），见 optimize_text_tiered。
+        cache (OptimizedTextCache, optional): 优化结果缓存，以 record.digest() 为键。
+        seed (int, optional): 随机种子。
+        progress (callable, optional): progress(已处理幻灯片数, 幻灯片总数)，每处理完一批幻灯片时调用。
+        on_slide (callable, optional): on_slide(幻灯片序号, 讲解文本, 档位)，每张幻灯片讲解完成时调用；
+            命中缓存时不调用。
+        deadline (Deadline, optional): 请求截止时间；到期后不再调用模型，其余幻灯片按规则讲解（毫秒级）。
+        slide_cache (SlideCache, optional): 单页缓存；带内容指纹且指纹命中的幻灯片直接使用缓存的模型档讲解，
+            其余幻灯片照常处理后写回。启用时每张幻灯片的措辞由种子和指纹决定，与其他幻灯片是否命中无关。
+
+    Returns:
+        tuple: (优化后的文本, {"model": [幻灯片序号], "fast": [幻灯片序号]})；出错时返回 record.render() 和空字典。
+    """
+    def parse():
+        slides = [(slide.number, slide.narration_lines()) for slide in record.content_slides]
+        return record.metadata_lines(), bool(record.metadata), slides
+
+    fingerprints = {slide.number: slide.fingerprint for slide in record.content_slides if slide.fingerprint}
+    return _optimize(record, parse, None, tier, budget, cache, seed, progress, on_slide, deadline,
+                     slide_cache if fingerprints else None, fingerprints)
+
+def _optimize(source, parse, fallback_text, tier, budget, cache, seed, progress=None, on_slide=None, deadline=None,
+              slide_cache=None, fingerprints=None):
+    """分级优化的公共流程：缓存查询、单页缓存、逐张讲解、按预算分档、写回缓存"""
+    start = time.perf_counter()
+    tier = (tier or OPTIMIZER_TIER).lower()
+    if tier not in TIERS:
+        logger.warning(f"Unknown optimizer tier '{tier}', using 'auto'")
+        tier = "auto"
+    budget = OPTIMIZER_BUDGET if budget is None else budget
+    # "auto" 只有在全部幻灯片走模型档时才写缓存，因此与 "model" 共用缓存条目
+    cache_tier = "fast" if tier == "fast" else "model"
+
+    if cache is not None:
+        cached = cache.get(source, seed, tier=cache_tier)
+        if cached is not None:
+            logger.info(f"Optimized text served from cache (hit rate {cache.stats()['hit_rate']:.2%})")
+            return cached["text"], cached["tiers"]
+
+    try:
+        rng = random.Random(seed)
+        metadata_lines, metadata_complete, slides = parse()
+        optimized_lines = list(metadata_lines)
+        if metadata_complete:
+            optimized_lines.append(f"\n{rng.choice(METADATA_ENDS)}")
+        # 待处理的幻灯片：(原始文本行, 幻灯片序号, 在 optimized_lines 中的位置, 是否为最后一张)
+        pending_slides = []
+        prev_context = None
+        transitions = _PendingTransitions(rng, seed, deadline)
+
+        for index, (slide_num, slide_lines) in enumerate(slides):
+            if index > 0:
+                optimized_lines.append(f"\n{rng.choice(SECTION_ENDS)}")
+            optimized_lines.append(f"\n{rng.choice(SLIDE_INTROS)}第 {slide_num} 张幻灯片：")
+            if slide_lines:
+                pending_slides.append((slide_lines, slide_num, len(optimized_lines), index == len(slides) - 1))
+                optimized_lines.append(None)
+        optimized_lines.append(f"\n{rng.choice(FINAL_CLOSINGS)}")
+
+        slide_tiers = {"model": [], "fast": []}
+        total = len(pending_slides)
+        if slide_cache is not None and tier != "fast":
+            pending_slides = _reuse_narrations(pending_slides, optimized_lines, slide_tiers, slide_cache,
+                                               fingerprints, seed, on_slide)
+        reused = total - len(pending_slides)
+        budget_end = start + budget if tier == "auto" and budget and budget > 0 else None
+        done = 0
+        slide_cost = None
+        while tier != "fast" and done < len(pending_slides):
+            # 无预算和截止时间时一次处理全部幻灯片；否则按上一批的单张耗时估计本批能处理几张
+            limits = [] if budget_end is None else [budget_end - time.perf_counter()]
+            if deadline is not None and deadline.remaining() is not None:
+                limits.append(deadline.remaining())
+            chunk = BUDGET_CHUNK_SLIDES if limits else len(pending_slides)
+            if limits:
+                remaining = min(limits)
+                if slide_cost:
+                    chunk = min(chunk, int(remaining / slide_cost))
+                if remaining <= 0 or chunk <= 0:
+                    break
+            batch = pending_slides[done:done + chunk]
+            chunk_start = time.perf_counter()
+            slide_sentences = split_sentences(
+                load_models()[0], [" ".join(_clean_line(line) for line in buffer) for buffer, _, _, _ in batch],
+                batch_size=SPACY_BATCH_SIZE, n_process=SPACY_N_PROCESS
+            )
+            for (_, slide_num, position, is_final), sentences in zip(batch, slide_sentences):
+                if is_final:
+                    optimized_lines[position] = _process_final_slide(sentences, prev_context, slide_num)
+                else:
+                    # 启用单页缓存时按指纹派生随机数源，讲解不受其他幻灯片是否命中的影响
+                    slide_rng = rng
+                    if slide_cache is not None and seed is not None and slide_num in fingerprints:
+                        slide_rng = random.Random(f"{seed}:{fingerprints[slide_num]}")
+                    optimized_lines[position] = _process_slide(sentences, prev_context, slide_num, transitions, slide_rng)
+                slide_tiers["model"].append(slide_num)
+            transitions.resolve()
+            # 截止时间到期后过渡语可能是回退措辞，不写入单页缓存
+            store = slide_cache is not None and not expired(deadline)
+            if on_slide is not None or store:
+                for _, slide_num, position, is_final in batch:
+                    text = transitions.render(optimized_lines[position])
+                    if on_slide is not None:
+                        on_slide(slide_num, text, "model")
+                    if store and slide_num in fingerprints:
+                        slide_cache.put_narration(fingerprints[slide_num], text, seed, slide_num if is_final else None)
+            slide_cost = (time.perf_counter() - chunk_start) / len(batch)
+            done += len(batch)
+            if progress is not None:
+                progress(reused + done, total)
+
+        # 预算用完或指定快速档时，其余幻灯片按规则处理
+        for buffer, slide_num, position, _ in pending_slides[done:]:
+            optimized_lines[position] = narrate_slide(buffer, rng)
+            slide_tiers["fast"].append(slide_num)
+            if on_slide is not None:
+                on_slide(slide_num, optimized_lines[position], "fast")
+        if progress is not None:
+            progress(total, total)
+        slide_tiers["model"].sort()
+
+        optimized_text = transitions.render("\n".join(optimized_lines))
+        logger.info(f"Text optimization completed in {time.perf_counter() - start:.2f}s "
+                    f"(tier {tier}: {len(slide_tiers['model'])} model slides, {len(slide_tiers['fast'])} fast slides)")
+        # 截止时间到期后的结果可能含回退过渡语，与单页缓存一样不写入
+        if cache is not None and (tier == "fast" or not slide_tiers["fast"]) and not expired(deadline):
+            cache.put(source, {"text": optimized_text, "tiers": slide_tiers}, seed, tier=cache_tier)
+        memo_stats = transition_memo.stats()
+        logger.info(f"Transition memo: {memo_stats['entries']} entries, hit rate {memo_stats['hit_rate']:.2%}")
+        return optimized_text, slide_tiers
 
     except Exception as e:
         logger.error(f"Error optimizing text: {e}", exc_info=True)
-        return text
-
-def _process_slide(slide_lines, prev_context, slide_num):
-    """处理单个幻灯片的文本"""
-    doc = nlp(" ".join(slide_lines))
-    sentences = [sent.text.strip() for sent in doc.sents]
+        return (fallback_text if fallback_text is not None else source.render()), {}
+
+def _reuse_narrations(pending_slides, optimized_lines, slide_tiers, slide_cache, fingerprints, seed, on_slide=None):
+    """用单页缓存中的讲解填充命中的幻灯片，返回仍需处理的幻灯片"""
+    fresh = []
+    for item in pending_slides:
+        _, slide_num, position, is_final = item
+        fingerprint = fingerprints.get(slide_num)
+        text = slide_cache.get_narration(fingerprint, seed, slide_num if is_final else None) if fingerprint else None
+        if text is None:
+            fresh.append(item)
+            continue
+        optimized_lines[position] = text
+        slide_tiers["model"].append(slide_num)
+        if on_slide is not None:
+            on_slide(slide_num, text, "model")
+    logger.info(f"Slide cache: reused narration for {len(pending_slides) - len(fresh)} of {len(pending_slides)} slides")
+    return fresh
+
+def _process_slide(sentences, prev_context, slide_num, transitions, rng=random):
+    """处理单个幻灯片的文本，sentences 为该幻灯片分句后的结果"""
     narrative = []
     list_items = []
 
@@ -255,21 +528,19 @@ def _process_slide(slide_lines, prev_context, slide_num):
             list_items.append(sent.strip('：，'))
         else:
             if list_items:
-                narrative.append(_format_list(list_items, prev_context))
+                narrative.append(_format_list(list_items, prev_context, rng))
                 list_items = []
-            transition = _generate_transition(prev_context, sent)
+            transition = transitions.request(prev_context, sent)
             narrative.append(f"{transition}{sent}。")
             prev_context = sent
 
     if list_items:
-        narrative.append(_format_list(list_items, prev_context))
+        narrative.append(_format_list(list_items, prev_context, rng))
 
     return " ".join(narrative)
 
-def _process_final_slide(slide_lines, prev_context, slide_num):
-    """将最后一个幻灯片处理为完整段落"""
-    doc = nlp(" ".join(slide_lines))
-    sentences = [sent.text.strip() for sent in doc.sents]
+def _process_final_slide(sentences, prev_context, slide_num):
+    """将最后一个幻灯片处理为完整段落，sentences 为该幻灯片分句后的结果"""
     narrative = [f"\n在第 {slide_num} 张幻灯片中，我们深入剖析了知识点的细节。"]
 
     for i, sent in enumerate(sentences):
@@ -289,19 +560,7 @@ def _process_final_slide(slide_lines, prev_context, slide_num):
 
     return " ".join(narrative).rstrip('，') + "。"
 
-def _generate_transition(prev_context, current_line):
-    """使用 Transformers 生成自然过渡语"""
-    if not prev_context:
-        return "我们先来看看，"
-    prompt = f"{prev_context}，接下来是{current_line}"
-    try:
-        generated = generator(prompt, num_return_sequences=1, max_new_tokens=10)[0]['generated_text']
-        transition = generated.split('，')[-2] + "，" if len(generated.split('，')) > 1 else "接着是，"
-    except Exception:
-        transition = random.choice(["顺着这个思路，", "再来看看，", "基于此，"])
-    return transition
-
-def _format_list(items, prev_context):
+def _format_list(items, prev_context, rng=random):
     """格式化列表为自然叙述"""
     if not items:
         return ""
@@ -309,6 +568,6 @@ def _format_list(items, prev_context):
     connectors = ["接着是", "然后聊到", "再看看", "另外还有"]
     sentences = [intro]
     for i, item in enumerate(items):
-        connector = "" if i == 0 else random.choice(connectors)
+        connector = "" if i == 0 else rng.choice(connectors)
         sentences.append(f"{connector}{item}{'，这点很关键' if i % 2 == 0 else '，也很重要'}")
     return " ".join(sentences) + "。"
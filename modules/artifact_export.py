@@ -0,0 +1,81 @@
+# artifact_export.py
+# 可选的图片与识别文本导出：在后台线程写盘，不阻塞 OCR 主流程
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class ArtifactExporter:
+    """
+    按原有目录结构导出图片及其识别文本：
+    <output_dir>/slide_N/image/image_K.<ext> 和 slide_N_image_K_text.txt。
+
+    写盘任务交给单个后台线程顺序执行，调用方无需等待；需要确认写完时调用 flush()。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: List[Future] = []
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            # 延迟创建线程池，保证 fork 出的子进程各自拥有写盘线程
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-export")
+            self._pending = [f for f in self._pending if not f.done()]
+            future = self._executor.submit(fn, *args)
+            self._pending.append(future)
+            return future
+
+    def export_image(self, output_dir: str, slide_number: int, image_index: int,
+                     image_bytes: bytes, ext: str = "jpg") -> Future:
+        """异步写出图片文件"""
+        return self._submit(_write_image, output_dir, slide_number, image_index, image_bytes, ext)
+
+    def export_text(self, output_dir: str, slide_number: int, image_index: int, text: str) -> Future:
+        """异步写出图片识别文本"""
+        return self._submit(_write_text, output_dir, slide_number, image_index, text)
+
+    def flush(self, timeout: Optional[float] = None):
+        """等待所有已提交的写盘任务完成"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result(timeout=timeout)
+
+
+def slide_image_dir(output_dir: str, slide_number: int) -> str:
+    return os.path.join(output_dir, f"slide_{slide_number}", "image")
+
+
+def _write_image(output_dir, slide_number, image_index, image_bytes, ext):
+    try:
+        folder = slide_image_dir(output_dir, slide_number)
+        os.makedirs(folder, exist_ok=True)
+        image_path = os.path.join(folder, f"image_{image_index}.{ext}")
+        with open(image_path, "wb") as f:
+            f.write(image_bytes)
+        logger.debug(f"Saved image: {image_path}")
+    except Exception as e:
+        logger.error(f"Failed to export image {slide_number}/{image_index}: {e}")
+
+
+def _write_text(output_dir, slide_number, image_index, text):
+    try:
+        folder = slide_image_dir(output_dir, slide_number)
+        os.makedirs(folder, exist_ok=True)
+        text_file_path = os.path.join(folder, f"slide_{slide_number}_image_{image_index}_text.txt")
+        with open(text_file_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    except Exception as e:
+        logger.error(f"Failed to export text {slide_number}/{image_index}: {e}")
+
+
+# 进程级共享实例
+artifact_exporter = ArtifactExporter()
@@ -0,0 +1,255 @@
+# batch.py
+# 批量处理整个目录的演示文稿：展开目录和通配符，按进程池并行处理，每份文稿单独输出，
+# 处理状态写入清单文件，中断后重新运行时跳过已完成的文稿
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 清单中的处理状态
+DONE = "done"
+PARTIAL = "partial"
+FAILED = "failed"
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """文件内容的 SHA-256 十六进制摘要"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _glob_root(pattern: str) -> str:
+    """通配符中第一个含通配字符的路径段之前的目录，用于计算输出的相对路径"""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or "."
+
+
+def discover_decks(inputs: Iterable[str], formats: List[str]) -> List[Tuple[str, str]]:
+    """
+    把命令行给出的文件、目录（递归）和通配符展开为演示文稿列表。
+
+    PowerPoint 打开文件时留下的 "~$" 锁文件会被忽略，同一文件只出现一次。
+
+    Args:
+        inputs (Iterable[str]): 文件、目录或通配符（支持 "**"）。
+        formats (List[str]): 允许的扩展名，如 [".pptx", ".ppt"]。
+
+    Returns:
+        List[Tuple[str, str]]: (文件绝对路径, 相对于所在输入根目录的路径)，按输入顺序和路径排序。
+    """
+    formats = {ext.lower() for ext in formats}
+
+    def accepted(path):
+        name = os.path.basename(path)
+        return os.path.isfile(path) and not name.startswith("~$") and os.path.splitext(name)[1].lower() in formats
+
+    decks = []
+    seen = set()
+    for item in inputs:
+        if glob.has_magic(item):
+            root = _glob_root(item)
+            paths = sorted(glob.glob(item, recursive=True))
+        elif os.path.isdir(item):
+            root = item
+            paths = sorted(os.path.join(dirpath, name)
+                           for dirpath, _, names in os.walk(item) for name in names)
+        else:
+            root = os.path.dirname(item) or "."
+            paths = [item]
+            if not os.path.isfile(item):
+                logger.warning(f"Input not found: {item}")
+        for path in paths:
+            if not accepted(path):
+                continue
+            absolute = os.path.abspath(path)
+            if absolute in seen:
+                continue
+            seen.add(absolute)
+            decks.append((absolute, os.path.relpath(absolute, os.path.abspath(root))))
+    return decks
+
+
+def output_path(output_dir: str, relative: str, taken: Optional[set] = None) -> str:
+    """
+    每份文稿的输出文件路径：在 output_dir 下保留输入的相对目录结构，文件名追加 ".txt"。
+
+    不同输入根目录下的同名文件会映射到同一路径，此时依次追加 "_2"、"_3" 区分；taken 记录已分配的路径。
+    """
+    base = os.path.abspath(os.path.join(output_dir, relative))
+    path = f"{base}.txt"
+    if taken is not None:
+        index = 2
+        while path in taken:
+            path = f"{base}_{index}.txt"
+            index += 1
+        taken.add(path)
+    return path
+
+
+class Manifest:
+    """
+    批处理清单：JSON Lines 文件，每处理完一份文稿追加一行，同一文件以最后一行为准。
+
+    每行记录输入路径、内容哈希、大小和修改时间、状态（done/partial/failed）、输出文件、耗时和错误信息。
+    追加写入在中断时最多丢失最后一行，重新运行时据此跳过已完成的文稿。
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self.entries: Dict[str, dict] = {}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if os.path.exists(self.path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 中断时写了一半的行
+                    logger.warning(f"Ignoring malformed manifest line {number} in {self.path}")
+                    continue
+                self.entries[entry["path"]] = entry
+        logger.info(f"Loaded {len(self.entries)} manifest entries from {self.path}")
+
+    def record(self, entry: dict):
+        """追加一条记录并立即落盘"""
+        with self._lock:
+            self.entries[entry["path"]] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def is_done(self, path: str) -> bool:
+        """
+        文稿是否已处理完成且之后没有变化：状态为 done、输出文件仍存在、内容哈希一致。
+
+        大小和修改时间都未变时直接认为一致，不再计算哈希。
+        """
+        entry = self.entries.get(path)
+        if entry is None or entry.get("status") != DONE:
+            return False
+        if not entry.get("output_file") or not os.path.exists(entry["output_file"]):
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size == entry.get("size") and stat.st_mtime == entry.get("mtime"):
+            return True
+        return file_digest(path) == entry.get("sha256")
+
+
+def _timed(process: Callable, path: str, output_file: str) -> Tuple[dict, float]:
+    """在工作进程中计时，耗时不含排队时间"""
+    start = time.perf_counter()
+    result = process(path, output_file) or {}
+    return result, time.perf_counter() - start
+
+
+def run_batch(jobs: List[Tuple[str, str]], process: Callable, manifest: Manifest, workers: int = 1,
+              initializer: Optional[Callable] = None, force: bool = False) -> Dict[str, int]:
+    """
+    并行处理一批文稿，并把每份文稿的结果写入清单。
+
+    Args:
+        jobs (List[Tuple[str, str]]): (输入路径, 输出文件路径)。
+        process (callable): process(输入路径, 输出文件路径) -> dict，可含 "partial" 和其他可 JSON 序列化的统计字段；
+            workers > 1 时在子进程中执行，必须是模块级函数。
+        manifest (Manifest): 批处理清单。
+        workers (int): 进程数，<= 1 时在当前进程中依次处理。
+        initializer (callable, optional): 每个子进程启动时调用一次，如加载模型。
+        force (bool): 为 True 时忽略清单，全部重新处理。
+
+    Returns:
+        Dict[str, int]: 本次运行各状态的文稿数，另含 skipped（按清单跳过）。
+    """
+    counts = {DONE: 0, PARTIAL: 0, FAILED: 0, "skipped": 0}
+    pending = []
+    for path, output_file in jobs:
+        if not force and manifest.is_done(path):
+            counts["skipped"] += 1
+        else:
+            pending.append((path, output_file))
+    logger.info(f"Batch: {len(pending)} decks to process, {counts['skipped']} already done")
+
+    def finish(path, output_file, stat, digest, elapsed, result=None, error=None):
+        if error is not None:
+            status = FAILED
+            logger.error(f"Failed to process {path}: {error}")
+        else:
+            status = PARTIAL if result.get("partial") else DONE
+        entry = {
+            "path": path, "sha256": digest, "size": stat.st_size, "mtime": stat.st_mtime,
+            "status": status, "output_file": output_file if error is None else None,
+            "elapsed": round(elapsed, 3), "finished": time.time(), "error": error,
+        }
+        if result:
+            entry.update({k: v for k, v in result.items() if k not in entry})
+        manifest.record(entry)
+        counts[status] += 1
+        done = counts[DONE] + counts[PARTIAL] + counts[FAILED]
+        logger.info(f"[{done}/{len(pending)}] {status}: {path} ({entry['elapsed']:.1f}s)")
+
+    # 哈希在提交前计算，记录的是实际处理的内容
+    def prepare(path):
+        return os.stat(path), file_digest(path)
+
+    if workers <= 1:
+        if initializer is not None:
+            initializer()
+        for path, output_file in pending:
+            stat, digest = prepare(path)
+            start = time.perf_counter()
+            try:
+                result, elapsed = _timed(process, path, output_file)
+                finish(path, output_file, stat, digest, elapsed, result=result)
+            except Exception as e:
+                finish(path, output_file, stat, digest, time.perf_counter() - start, error=str(e))
+        return counts
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as pool:
+        futures = {}
+        for path, output_file in pending:
+            stat, digest = prepare(path)
+            futures[pool.submit(_timed, process, path, output_file)] = (path, output_file, stat, digest)
+        try:
+            for future in as_completed(futures):
+                path, output_file, stat, digest = futures[future]
+                try:
+                    result, elapsed = future.result()
+                    finish(path, output_file, stat, digest, elapsed, result=result)
+                except Exception as e:
+                    # 工作进程内的失败没有耗时
+                    finish(path, output_file, stat, digest, 0.0, error=str(e))
+        except KeyboardInterrupt:
+            # 已完成的文稿已写入清单，下次运行从剩余文稿继续
+            logger.warning("Interrupted, cancelling decks that have not started")
+            for future in futures:
+                future.cancel()
+            raise
+    return counts
@@ -0,0 +1,164 @@
+# cache.py
+# 基于 SQLite 的本地持久化缓存，按总字节数限制大小并按 LRU 淘汰
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 默认缓存上限 512 MB
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# 超出上限时每次最多查看的条目数，淘汰不需要读出全部键
+EVICT_BATCH = 256
+
+
+class PersistentCache:
+    """
+    键值对持久化缓存。
+
+    值以 BLOB 存储在单个 SQLite 文件中；每次命中都会刷新访问时间，
+    写入后若总大小超过 max_bytes，则按最久未访问的顺序淘汰。
+    同一文件可被多个线程和进程共享（WAL 模式）。
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork 之后不能沿用父进程的连接
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)")
+            # 总字节数由触发器随写入和删除维护，多个进程共享同一个计数，写入时无需对全表求和
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries BEGIN "
+                "UPDATE meta SET value = value + NEW.size WHERE name = 'bytes'; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries BEGIN "
+                "UPDATE meta SET value = value - OLD.size WHERE name = 'bytes'; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size ON entries BEGIN "
+                "UPDATE meta SET value = value + NEW.size - OLD.size WHERE name = 'bytes'; END"
+            )
+            # 计数只在首次打开（含旧版本创建的缓存文件）时按现有条目求和一次
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (name, value) SELECT 'bytes', COALESCE(SUM(size), 0) FROM entries"
+            )
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存值，未命中返回 None"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: bytes):
+        """写入缓存值，必要时淘汰最久未访问的条目"""
+        with self._lock:
+            conn = self._connect()
+            # 用 upsert 而非 INSERT OR REPLACE：REPLACE 删除旧行时不触发删除触发器
+            conn.execute(
+                "INSERT INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, last_access = excluded.last_access",
+                (key, sqlite3.Binary(value), len(value), time.time())
+            )
+            self._evict(conn)
+            conn.commit()
+
+    def get_json(self, key: str):
+        value = self.get(key)
+        return None if value is None else json.loads(value.decode("utf-8"))
+
+    def set_json(self, key: str, value):
+        self.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def delete(self, key: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.commit()
+
+    @staticmethod
+    def _total(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection):
+        total = self._total(conn)
+        evicted = 0
+        while total > self.max_bytes:
+            # 按访问时间从旧到新分批查看，只删除降到上限以内所需的条目
+            count = 0
+            for (size,) in conn.execute("SELECT size FROM entries ORDER BY last_access, key LIMIT ?", (EVICT_BATCH,)):
+                if total <= self.max_bytes:
+                    break
+                total -= size
+                count += 1
+            if count == 0:
+                break
+            conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access, key LIMIT ?)", (count,)
+            )
+            evicted += count
+            total = self._total(conn)
+        if evicted:
+            logger.info(f"Evicted {evicted} entries from cache {self.path}")
+
+    def stats(self) -> dict:
+        """返回命中统计和当前占用"""
+        with self._lock:
+            conn = self._connect()
+            entries = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            size = self._total(conn)
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
@@ -0,0 +1,95 @@
+# deadline.py
+# 请求级截止时间：在提取器和优化器之间传递，各阶段在幻灯片、图片和批次之间检查，到期或被取消后停止工作并返回已完成的部分
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Callable, Optional
+
+# 截止时间到后继续等待工作线程返回部分结果的秒数
+DEFAULT_GRACE = 5.0
+
+
+class Deadline:
+    """
+    协作式的截止时间。
+
+    timeout 为基础时长（秒），None 表示不限；解析出幻灯片数和图片数后可调用 scale()
+    按 per_slide、per_image 放宽，且不超过 max_timeout。计时从创建时开始，排队等待的时间也计算在内。
+    cancel() 可在任意线程中调用，例如调用方不再等待结果或客户端已断开。
+    """
+
+    def __init__(self, timeout: Optional[float] = None, per_slide: float = 0.0, per_image: float = 0.0,
+                 max_timeout: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.base = timeout
+        self.timeout = timeout
+        self.per_slide = per_slide
+        self.per_image = per_image
+        self.max_timeout = max_timeout
+        self.clock = clock
+        self.start = clock()
+        self._cancelled = threading.Event()
+
+    def scale(self, slides: int = 0, images: int = 0) -> Optional[float]:
+        """按幻灯片数和图片数重新计算时长，返回新的时长（秒）"""
+        if self.base is None:
+            return None
+        timeout = self.base + self.per_slide * slides + self.per_image * images
+        if self.max_timeout is not None:
+            timeout = min(timeout, self.max_timeout)
+        self.timeout = timeout
+        return timeout
+
+    def remaining(self) -> Optional[float]:
+        """剩余秒数，不限时返回 None，已取消或已到期返回 0"""
+        if self._cancelled.is_set():
+            return 0.0
+        if self.timeout is None:
+            return None
+        return max(self.start + self.timeout - self.clock(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+def expired(deadline: Optional[Deadline]) -> bool:
+    """deadline 可为 None 的便捷检查"""
+    return deadline is not None and deadline.expired
+
+
+def wait_for(future: Future, deadline: Deadline, grace: float = DEFAULT_GRACE):
+    """
+    按截止时间等待 future 的结果。
+
+    截止时间到期后工作线程会在下一次检查时返回已完成的部分，因此额外等待 grace 秒；
+    处理中途 scale() 放宽了截止时间时继续等待。
+
+    Args:
+        future (Future): 工作线程的 future。
+        deadline (Deadline): 传给工作线程的同一个截止时间。
+        grace (float): 到期后额外等待的秒数。
+
+    Returns:
+        future 的结果。
+
+    Raises:
+        TimeoutError: 宽限期后仍未完成；此时已取消 deadline 和尚未开始的 future，工作线程不再继续处理。
+    """
+    while True:
+        remaining = deadline.remaining()
+        try:
+            return future.result(timeout=None if remaining is None else remaining + grace)
+        except FutureTimeout:
+            if not deadline.expired:
+                continue
+            deadline.cancel()
+            future.cancel()
+            raise TimeoutError(f"Deadline of {deadline.timeout}s exceeded")
@@ -0,0 +1,215 @@
+# deck.py
+# 一次解析 PPTX，供元数据、文本和图片各阶段共享
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.shapes.picture import Picture
+import hashlib
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class Paragraph:
+    """文本框中的一个段落：层级及其各个 run 的原始文本。"""
+    __slots__ = ("level", "runs")
+
+    def __init__(self, level: int, runs: List[str]):
+        self.level = level
+        self.runs = runs
+
+
+class TextBlock:
+    """一个带文本框的形状。"""
+    __slots__ = ("paragraphs",)
+    kind = "text"
+
+    def __init__(self, paragraphs: List[Paragraph]):
+        self.paragraphs = paragraphs
+
+
+class TableBlock:
+    """一个表格形状，rows 为每行单元格文本。"""
+    __slots__ = ("rows",)
+    kind = "table"
+
+    def __init__(self, rows: List[List[str]]):
+        self.rows = rows
+
+
+class ChartBlock:
+    """一个图表形状，仅保留标题文本。"""
+    __slots__ = ("title",)
+    kind = "chart"
+
+    def __init__(self, title: Optional[str]):
+        self.title = title
+
+
+class PictureRef:
+    """
+    幻灯片中的一张图片，index 为该幻灯片内从 1 开始的图片序号。
+
+    part 为图片引用的媒体部件（ppt/media/ 下的文件）；同一媒体部件可被多张幻灯片、多个形状引用。
+    """
+    __slots__ = ("index", "shape", "part")
+
+    def __init__(self, index: int, shape, part):
+        self.index = index
+        self.shape = shape
+        self.part = part
+
+    @property
+    def image(self):
+        return self.shape.image
+
+    @property
+    def partname(self) -> str:
+        return str(self.part.partname)
+
+    @property
+    def blob(self) -> bytes:
+        return self.part.blob
+
+    @property
+    def content_type(self) -> str:
+        return self.part.content_type
+
+    @property
+    def ext(self) -> str:
+        return self.part.partname.ext
+
+
+class SlideContent:
+    """单张幻灯片一次遍历得到的全部内容，blocks 保持形状原有顺序。"""
+    __slots__ = ("number", "title", "blocks", "notes", "pictures")
+
+    def __init__(self, number: int):
+        self.number = number
+        self.title: Optional[str] = None
+        self.blocks: list = []
+        self.notes: Optional[str] = None
+        self.pictures: List[PictureRef] = []
+
+
+def _read_shapes(shapes, content: SlideContent, slide_part):
+    """
+    按顺序把形状中的文本框、表格、图表和图片加入 content，组合形状递归展开。
+
+    图片包括组合形状内的图片和已填入图片的占位符（PlaceholderPicture），序号按遍历顺序编号；
+    只引用外部链接、没有嵌入图片部件的图片会被跳过。
+    """
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            _read_shapes(shape.shapes, content, slide_part)
+        elif isinstance(shape, Picture):
+            rId = shape._element.blip_rId
+            if rId is not None:
+                content.pictures.append(PictureRef(len(content.pictures) + 1, shape, slide_part.related_part(rId)))
+        elif shape.has_text_frame:
+            paragraphs = [
+                Paragraph(getattr(paragraph, 'level', 0), [run.text for run in paragraph.runs])
+                for paragraph in shape.text_frame.paragraphs
+            ]
+            content.blocks.append(TextBlock(paragraphs))
+        elif shape.shape_type == MSO_SHAPE_TYPE.TABLE:
+            rows = [[cell.text for cell in row.cells] for row in shape.table.rows]
+            content.blocks.append(TableBlock(rows))
+        elif shape.has_chart:
+            chart_title = shape.chart.chart_title
+            content.blocks.append(ChartBlock(chart_title.text_frame.text if chart_title.has_text_frame else None))
+
+
+def _read_slide(slide_number, slide) -> SlideContent:
+    """遍历一次幻灯片形状，同时收集文本、表格、图表、注释和图片引用"""
+    content = SlideContent(slide_number)
+
+    title_shape = slide.shapes.title
+    if title_shape is not None:
+        content.title = title_shape.text
+
+    _read_shapes(slide.shapes, content, slide.part)
+
+    if slide.has_notes_slide and slide.notes_slide.notes_text_frame:
+        content.notes = slide.notes_slide.notes_text_frame.text
+
+    return content
+
+
+def media_references(slides) -> Dict[str, List[Tuple[int, PictureRef]]]:
+    """
+    按媒体部件归并图片引用：{部件名: [(幻灯片序号, 图片引用), ...]}，部件按首次出现的顺序排列。
+
+    模板 logo 等在多张幻灯片上重复出现的图片在包内只存一份，归并后每个部件只需解码和识别一次。
+    """
+    references: Dict[str, List[Tuple[int, PictureRef]]] = {}
+    for slide in slides:
+        for picture in slide.pictures:
+            references.setdefault(picture.partname, []).append((slide.number, picture))
+    return references
+
+
+def slide_fingerprint(slide) -> str:
+    """
+    幻灯片内容指纹：幻灯片 XML 部件，以及它引用的图片、图表、注释等部件内容的 SHA-256。
+
+    不含幻灯片序号，调整顺序后指纹不变；版式部件不参与计算（其中的文本不会被提取）。
+    """
+    h = hashlib.sha256(slide.part.blob)
+    for rel_id, rel in sorted(slide.part.rels.items()):
+        if rel.is_external or rel.reltype == RT.SLIDE_LAYOUT:
+            continue
+        h.update(f"\x00{rel_id}\x00{rel.reltype}\x00".encode("utf-8"))
+        h.update(hashlib.sha256(rel.target_part.blob).digest())
+    return h.hexdigest()
+
+
+class ParsedDeck:
+    """
+    一次任务内共享的已解析演示文稿。
+
+    PPTX 包只在构造时解压和解析一次；幻灯片内容在首次访问 slides 时遍历一次并缓存。
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.presentation = Presentation(file_path)
+        self._slides: Optional[List[SlideContent]] = None
+        self._fingerprints: Optional[List[str]] = None
+        logger.info(f"Parsed PPTX package: {file_path}")
+
+    @property
+    def core_properties(self):
+        return self.presentation.core_properties
+
+    @property
+    def slides(self) -> List[SlideContent]:
+        if self._slides is None:
+            self._slides = [
+                _read_slide(slide_number, slide)
+                for slide_number, slide in enumerate(self.presentation.slides, start=1)
+            ]
+            logger.debug(f"Traversed {len(self._slides)} slides of {self.file_path}")
+        return self._slides
+
+    @property
+    def fingerprints(self) -> List[str]:
+        """与 slides 一一对应的内容指纹，首次访问时计算"""
+        if self._fingerprints is None:
+            self._fingerprints = [slide_fingerprint(slide) for slide in self.presentation.slides]
+        return self._fingerprints
+
+
+def load_deck(file_path: str) -> ParsedDeck:
+    """
+    解析 PPTX 文件，返回可在各提取阶段之间共享的 ParsedDeck。
+
+    Args:
+        file_path (str): PPTX 文件路径。
+
+    Returns:
+        ParsedDeck: 已解析的演示文稿。
+    """
+    return ParsedDeck(file_path)
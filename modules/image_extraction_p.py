@@ -1,9 +1,12 @@
-from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
 import os
 import logging
-from paddleocr import PaddleOCR
 from modules.config import OUTPUT_DIR
+from modules.deck import load_deck, media_references
+from modules.ocr_manager import ocr_manager
+from modules.ocr_engine import ImageCandidate, OCRResult, decode_image, filter_ocr_lines, run_ocr
+from modules.ocr_batch import batch_ocr
+from modules.deadline import expired
+from modules.artifact_export import artifact_exporter
 import win32com.client
 import pythoncom
 
@@ -17,15 +20,175 @@ def ensure_dir(directory):
         os.makedirs(directory)
         logger.info(f"Created directory: {directory}")
 
-def extract_images_from_ppt_paddleocr(file_path, output_dir=OUTPUT_DIR, output_format="text", use_gpu=False):
+def recognize_image(image_bytes, ocr, cache=None, image=None):
+    """
+    识别单张图片：优先读取 OCR 结果缓存，未命中时执行一次推理并写回缓存。
+
+    Args:
+        image_bytes (bytes): 图片原始字节，用作缓存键；未提供 image 时直接在内存中解码。
+        ocr: PaddleOCR 实例。
+        cache (OCRResultCache, optional): OCR 结果缓存。
+        image (optional): 已有的图片路径或 NumPy 数组（如旧版格式导出的文件）。
+
+    Returns:
+        OCRResult: 识别结果。
+    """
+    if cache is not None and image_bytes is not None:
+        cached = cache.get(image_bytes)
+        if cached is not None:
+            return cached
+
+    return _infer(image_bytes, ocr, cache, image)
+
+def _infer(image_bytes, ocr, cache=None, image=None, max_side=None):
+    """缓存未命中时执行一次推理，成功后写回缓存"""
+    if image is None:
+        # 直接从内存字节解码，不经过磁盘
+        image = decode_image(image_bytes, max_side)
+        if image is None:
+            return OCRResult()
+    try:
+        result = filter_ocr_lines(ocr.ocr(image, cls=True))
+    except Exception as e:
+        # 识别失败不写入缓存，下次仍会重试
+        logger.error(f"OCR processing failed for {image if isinstance(image, str) else 'in-memory image'}: {e}")
+        return OCRResult()
+    if cache is not None and image_bytes is not None:
+        cache.put(image_bytes, result)
+    return result
+
+def recognize_candidates(candidates, ocr, cache=None, batch_size=None, pool=None, prefilter=None, triage=None, progress=None, deadline=None):
+    """
+    按顺序识别一组候选图片，返回与 candidates 一一对应的 OCRResult 列表。
+
+    缓存命中的图片不再推理；未命中的图片先经 triage 分诊（跳过图标和矢量图元文件，
+    超大图限定解码尺寸），再经 prefilter 预判，判定为无文本的直接返回空结果；提供 pool 时未命中的图片交给 OCR 进程池，
+    否则 batch_size 为正数时跨图片批量推理，再否则逐张推理。
+    识别失败的图片返回空结果且不写入缓存。
+    deadline 到期后不再识别剩余图片，这些位置为 None。
+
+    Args:
+        candidates (List[ImageCandidate]): 待识别图片。
+        ocr: PaddleOCR 实例；使用 pool 时可为 None。
+        cache (OCRResultCache, optional): OCR 结果缓存。
+        batch_size (int, optional): 每批识别的文本行数，None 或 0 表示逐张识别。
+        pool (OCRProcessPool, optional): OCR 进程池。
+        prefilter (TextPrefilter, optional): OCR 前的廉价文本预判。
+        triage (ImageTriage, optional): 基于文件头的分诊。
+        progress (callable, optional): progress(已完成数, 总数)，每得到一批结果时调用。
+        deadline (Deadline, optional): 截止时间，在图片和批次之间检查。
+
+    Returns:
+        List[Optional[OCRResult]]: 识别结果，因截止时间未识别的为 None。
+    """
+    results = [None] * len(candidates)
+
+    def report():
+        if progress is not None:
+            progress(sum(result is not None for result in results), len(candidates))
+
+    pending = []
+    for i, candidate in enumerate(candidates):
+        cached = cache.get(candidate.blob) if cache is not None else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+    report()
+
+    max_side = None
+    if triage is not None and pending:
+        max_side = triage.max_side
+        decisions = triage.triage([candidates[i].blob for i in pending], [candidates[i].content_type for i in pending])
+        for i, decision in zip(pending, decisions):
+            if decision.skip:
+                logger.debug(f"Triage skipped slide {candidates[i].slide_number} image {candidates[i].image_index}: {decision.skip}")
+                results[i] = OCRResult()
+        pending = [i for i, decision in zip(pending, decisions) if not decision.skip]
+
+    if prefilter is not None and pending:
+        keep = prefilter.filter([candidates[i].blob for i in pending])
+        for i, passed in zip(pending, keep):
+            if not passed:
+                results[i] = OCRResult()
+        pending = [i for i, passed in zip(pending, keep) if passed]
+    if triage is not None or prefilter is not None:
+        report()
+
+    if pool is not None:
+        pooled = pool.recognize([candidates[i].blob for i in pending], max_side, deadline=deadline)
+        for i, result in zip(pending, pooled):
+            if result is None:
+                # 因截止时间取消的保留 None，识别失败的视为无文本
+                results[i] = None if expired(deadline) else OCRResult()
+                continue
+            results[i] = result
+            if cache is not None:
+                cache.put(candidates[i].blob, result)
+        report()
+    elif batch_size and batch_size > 0:
+        # 按窗口解码并批量推理，限制同时驻留内存的图片数量
+        window = max(batch_size * 4, 32)
+        for start in range(0, len(pending), window):
+            if expired(deadline):
+                break
+            decoded = []
+            for i in pending[start:start + window]:
+                image = decode_image(candidates[i].blob, max_side)
+                if image is None:
+                    results[i] = OCRResult()
+                else:
+                    decoded.append((i, image))
+            try:
+                raw_results = batch_ocr([image for _, image in decoded], ocr, batch_size)
+            except Exception as e:
+                logger.error(f"Batched OCR failed, falling back to per-image OCR: {e}")
+                raw_results = None
+            for position, (i, image) in enumerate(decoded):
+                if raw_results is None:
+                    results[i] = _infer(candidates[i].blob, ocr, cache, image)
+                    continue
+                results[i] = filter_ocr_lines(raw_results[position])
+                if cache is not None:
+                    cache.put(candidates[i].blob, results[i])
+            report()
+    else:
+        for i in pending:
+            if expired(deadline):
+                break
+            results[i] = _infer(candidates[i].blob, ocr, cache, max_side=max_side)
+            report()
+
+    skipped = sum(result is None for result in results)
+    if skipped:
+        logger.warning(f"Deadline reached, skipped OCR for {skipped} of {len(candidates)} images")
+
+    return results
+
+def extract_images_from_ppt_paddleocr(file_path, output_dir=OUTPUT_DIR, output_format="text", use_gpu=False, deck=None, ocr_results=None, cache=None, export_artifacts=False, batch_size=None, ocr_pool=None, prefilter=None, triage=None, progress=None, deadline=None, slides=None):
     """
     从 PPT 文件中提取图片，并使用 PaddleOCR 识别图片中的文本。
 
+    图片按媒体部件归并后直接从内存解码识别，被多张幻灯片引用的同一部件（如模板 logo）只识别一次，
+    结果分发给每个引用位置；组合形状内的图片和图片占位符同样会被识别。
+    仅在 export_artifacts=True 时才由后台线程按 slide_N/image/ 目录结构写出图片和识别文本。
+
     Args:
         file_path (str): PPT 文件路径。
         output_dir (str): 输出目录路径，默认为 OUTPUT_DIR。
         output_format (str): 输出格式，可选 "text"（默认）或 "json"。
         use_gpu (bool): 是否使用 GPU 加速 OCR，默认 False。
+        deck (ParsedDeck, optional): 已解析的演示文稿，提供时不再重复解析文件。
+        ocr_results (OCRJobResult, optional): 若提供，记录每张图片的 OCR 结果供后续阶段复用。
+        cache (OCRResultCache, optional): OCR 结果缓存，已识别过的图片不再重复推理。
+        export_artifacts (bool): 是否导出图片和识别文本文件，默认 False。
+        batch_size (int, optional): 设置后先收集整份演示文稿的图片，再按该批大小跨图片批量识别。
+        ocr_pool (OCRProcessPool, optional): 提供时由多进程 OCR 后端识别，不占用本进程模型。
+        prefilter (TextPrefilter, optional): 提供时先用廉价的图像特征跳过明显无文字的图片。
+        triage (ImageTriage, optional): 提供时按文件头跳过小图标和矢量图元文件，并限定超大图的解码尺寸。
+        progress (callable, optional): progress(已识别图片数, 图片总数)，用于上报 OCR 进度，均按不同的媒体部件计数。
+        deadline (Deadline, optional): 截止时间，到期后剩余图片不再识别，也不写入 ocr_results。
+        slides (set, optional): 只识别这些序号的幻灯片中的图片（仅 PPTX），用于跳过结果已缓存的幻灯片。
 
     Returns:
         list: 包含每张图片识别文本的列表。
@@ -33,97 +196,96 @@ def extract_images_from_ppt_paddleocr(file_path, output_dir=OUTPUT_DIR, output_f
     try:
         # 判断文件格式
         ext = os.path.splitext(file_path.lower())[1]
-        if ext != '.pptx':
-            return extract_images_from_ppt_legacy(file_path, output_dir, output_format, use_gpu)
+        if deck is None and ext != '.pptx':
+            return extract_images_from_ppt_legacy(file_path, output_dir, output_format, use_gpu, ocr_results, cache, deadline=deadline)
 
         image_texts = []
-        presentation = Presentation(file_path)
+        if deck is None:
+            deck = load_deck(file_path)
         logger.info(f"Processing PPT file: {file_path}")
 
-        # 初始化 PaddleOCR
-        ocr = PaddleOCR(use_angle_cls=True, lang='ch', use_gpu=use_gpu)
-
-        for slide_number, slide in enumerate(presentation.slides, start=1):
-            slide_folder = os.path.join(output_dir, f"slide_{slide_number}", "image")
-            ensure_dir(slide_folder)
-            image_index = 1
-
-            for shape in slide.shapes:
-                if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-                    image = shape.image
-                    image_bytes = image.blob
-                    image_name = f"image_{image_index}.jpg"
-                    image_path = os.path.join(slide_folder, image_name)
-
-                    with open(image_path, "wb") as f:
-                        f.write(image_bytes)
-                    logger.debug(f"Saved image: {image_path}")
-
-                    if contains_text(image_path, ocr):
-                        text = process_image_for_ocr(image_path, ocr)
-                        if text:
-                            text_entry = {
-                                "slide": slide_number,
-                                "image": image_index,
-                                "text": text
-                            }
-                            if output_format == "json":
-                                image_texts.append(text_entry)
-                            else:
-                                image_texts.append(f"\nSlide {slide_number}, Image {image_index} Text:\n{text}")
-
-                            text_file_path = os.path.join(slide_folder, f"slide_{slide_number}_image_{image_index}_text.txt")
-                            with open(text_file_path, "w", encoding="utf-8") as f:
-                                f.write(text)
-                            logger.info(f"Extracted text from {image_name}: {text[:50]}...")
-                        else:
-                            logger.debug(f"No readable text in {image_name}")
+        # 先收集整份演示文稿的图片，按媒体部件归并：多处引用同一部件的图片只识别一次，
+        # 候选图片记为首次出现的 (幻灯片, 图片)
+        references = list(media_references(
+            slide for slide in deck.slides if slides is None or slide.number in slides
+        ).values())
+        candidates = [
+            ImageCandidate(refs[0][0], refs[0][1].index, refs[0][1].blob, refs[0][1].content_type, refs[0][1].ext)
+            for refs in references
+        ]
+        referenced = sum(len(refs) for refs in references)
+        if referenced > len(candidates):
+            logger.info(f"{referenced} image references share {len(candidates)} media parts")
+        if export_artifacts:
+            for candidate, refs in zip(candidates, references):
+                for slide_number, picture in refs:
+                    artifact_exporter.export_image(output_dir, slide_number, picture.index, candidate.blob, candidate.ext)
+
+        if ocr_pool is not None:
+            results = recognize_candidates(candidates, None, cache, pool=ocr_pool, prefilter=prefilter, triage=triage, progress=progress, deadline=deadline)
+        else:
+            # 从进程级模型管理器借用已加载的 PaddleOCR
+            with ocr_manager.acquire(lang='ch', use_gpu=use_gpu, use_angle_cls=True) as ocr:
+                results = recognize_candidates(candidates, ocr, cache, batch_size, prefilter=prefilter, triage=triage, progress=progress, deadline=deadline)
+
+        # 识别结果分发给引用该部件的每个 (幻灯片, 图片)，再按 (幻灯片, 图片) 顺序输出
+        fanned_out = sorted((
+            (slide_number, picture.index, candidate.ext, result)
+            for candidate, refs, result in zip(candidates, references, results)
+            if result is not None
+            for slide_number, picture in refs
+        ), key=lambda item: item[:2])
+        for slide_number, image_index, ext, result in fanned_out:
+            image_name = f"image_{image_index}.{ext}"
+            if ocr_results is not None:
+                ocr_results.add(slide_number, image_index, result)
+            if result.has_text:
+                text = result.text
+                if text:
+                    text_entry = {
+                        "slide": slide_number,
+                        "image": image_index,
+                        "text": text
+                    }
+                    if output_format == "json":
+                        image_texts.append(text_entry)
                     else:
-                        logger.debug(f"No text detected in {image_name}")
-                    image_index += 1
+                        image_texts.append(f"\nSlide {slide_number}, Image {image_index} Text:\n{text}")
+
+                    if export_artifacts:
+                        artifact_exporter.export_text(output_dir, slide_number, image_index, text)
+                    logger.info(f"Extracted text from slide {slide_number} {image_name}: {text[:50]}...")
+                else:
+                    logger.debug(f"No readable text in slide {slide_number} {image_name}")
+            else:
+                logger.debug(f"No text detected in slide {slide_number} {image_name}")
 
         logger.info(f"Completed processing {file_path}. Extracted {len(image_texts)} image texts.")
+        if cache is not None:
+            logger.info(f"OCR cache stats: {cache.stats()}")
+        if prefilter is not None:
+            logger.info(f"Prefilter stats: {prefilter.stats()}")
+        if triage is not None:
+            logger.info(f"Triage stats: {triage.stats()}")
         return image_texts
 
     except Exception as e:
         logger.error(f"Failed to process PPT file {file_path}: {e}")
         return []
 
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
 def process_image_for_ocr(image_path, ocr):
     """使用指定的 PaddleOCR 实例处理图片并提取文本"""
-    try:
-        result = ocr.ocr(image_path, cls=True)
-        if not result or not result[0]:
-            return ""
-
-        texts = []
-        for line in result[0]:
-            if line and len(line[1][0]) >= 2 and line[1][1] > 0.5:
-                texts.append(line[1][0])
-        full_text = '\n'.join(texts).strip()
-        return full_text if full_text else ""
-
-    except Exception as e:
-        logger.error(f"OCR processing failed for {image_path}: {e}")
-        return ""
+    return run_ocr(image_path, ocr).text
 
 def contains_text(image_path, ocr):
     """使用指定的 PaddleOCR 实例判断图片是否含有文本"""
-    try:
-        result = ocr.ocr(image_path, cls=True)
-        if result and result[0]:
-            valid_texts = [
-                line for line in result[0]
-                if line and len(line[1][0]) >= 2 and line[1][1] > 0.5
-            ]
-            return len(valid_texts) > 0
-        return False
-
-    except Exception as e:
-        logger.error(f"Text detection failed for {image_path}: {e}")
-        return False
+    return run_ocr(image_path, ocr).has_text
 
-def extract_images_from_ppt_legacy(file_path, output_dir=OUTPUT_DIR, output_format="text", use_gpu=False):
+def extract_images_from_ppt_legacy(file_path, output_dir=OUTPUT_DIR, output_format="text", use_gpu=False, ocr_results=None, cache=None, progress=None, deadline=None):
     """
     从非 PPTX 格式的文件（如 .ppt, .pot, .pps）中提取图片并识别文本。
 
@@ -132,6 +294,10 @@ def extract_images_from_ppt_legacy(file_path, output_dir=OUTPUT_DIR, output_form
         output_dir (str): 输出目录路径，默认为 OUTPUT_DIR。
         output_format (str): 输出格式，可选 "text"（默认）或 "json"。
         use_gpu (bool): 是否使用 GPU 加速 OCR，默认 False。
+        ocr_results (OCRJobResult, optional): 若提供，记录每张图片的 OCR 结果供后续阶段复用。
+        cache (OCRResultCache, optional): OCR 结果缓存，已识别过的图片不再重复推理。
+        progress (callable, optional): progress(已识别图片数, None)，旧版格式无法预知图片总数。
+        deadline (Deadline, optional): 截止时间，在幻灯片之间检查，到期后不再处理剩余幻灯片。
 
     Returns:
         list: 包含每张图片识别文本的列表，与 extract_images_from_ppt_paddleocr 输出格式一致。
@@ -142,72 +308,89 @@ def extract_images_from_ppt_legacy(file_path, output_dir=OUTPUT_DIR, output_form
         app = win32com.client.Dispatch("PowerPoint.Application")
         prs = app.Presentations.Open(file_path, WithWindow=False)
         logger.info(f"Processing legacy PPT file: {file_path}")
+        recognized = 0
+
+        # 从进程级模型管理器借用已加载的 PaddleOCR
+        with ocr_manager.acquire(lang='ch', use_gpu=use_gpu, use_angle_cls=True) as ocr:
+            for slide_number, slide in enumerate(prs.Slides, start=1):
+                if expired(deadline):
+                    logger.warning(f"Deadline reached, skipped OCR from slide {slide_number} on")
+                    break
+                slide_folder = os.path.join(output_dir, f"slide_{slide_number}", "image")
+                ensure_dir(slide_folder)
+                image_index = 1
+
+                for shape in slide.Shapes:
+                    if shape.Type == 13:
+                        image_name = f"image_{image_index}.jpg"
+                        image_path = os.path.join(slide_folder, image_name)
+                        shape.Export(image_path, 2)
+                        logger.debug(f"Saved image: {image_path}")
+
+                        # 一次推理同时决定是否含文本并给出文本
+                        result = recognize_image(_read_bytes(image_path) if cache is not None else None, ocr, cache, image=image_path)
+                        if ocr_results is not None:
+                            ocr_results.add(slide_number, image_index, result)
+                        recognized += 1
+                        if progress is not None:
+                            progress(recognized, None)
+                        if result.has_text:
+                            text = result.text
+                            if text:
+                                text_entry = {
+                                    "slide": slide_number,
+                                    "image": image_index,
+                                    "text": text
+                                }
+                                if output_format == "json":
+                                    image_texts.append(text_entry)
+                                else:
+                                    image_texts.append(f"\nSlide {slide_number}, Image {image_index} Text:\n{text}")
+
+                                text_file_path = os.path.join(slide_folder, f"slide_{slide_number}_image_{image_index}_text.txt")
+                                with open(text_file_path, "w", encoding="utf-8") as f:
+                                    f.write(text)
+                                logger.info(f"Extracted text from {image_name}: {text[:50]}...")
+                            else:
+                                logger.debug(f"No readable text in {image_name}")
+                        else:
+                            logger.debug(f"No text detected in {image_name}")
+                        image_index += 1
 
-        # 初始化 PaddleOCR
-        ocr = PaddleOCR(use_angle_cls=True, lang='ch', use_gpu=use_gpu)
-
-        for slide_number, slide in enumerate(prs.Slides, start=1):
-            slide_folder = os.path.join(output_dir, f"slide_{slide_number}", "image")
-            ensure_dir(slide_folder)
-            image_index = 1
-
-            for shape in slide.Shapes:
-                if shape.Type == 13:
-                    image_name = f"image_{image_index}.jpg"
+                if image_index == 1:
+                    image_name = f"image_1.jpg"
                     image_path = os.path.join(slide_folder, image_name)
-                    shape.Export(image_path, 2)
-                    logger.debug(f"Saved image: {image_path}")
-
-                    if contains_text(image_path, ocr):
-                        text = process_image_for_ocr(image_path, ocr)
+                    slide.Export(image_path, "JPG")
+                    logger.debug(f"Saved slide image: {image_path}")
+
+                    # 一次推理同时决定是否含文本并给出文本
+                    result = recognize_image(_read_bytes(image_path) if cache is not None else None, ocr, cache, image=image_path)
+                    if ocr_results is not None:
+                        ocr_results.add(slide_number, 1, result)
+                    recognized += 1
+                    if progress is not None:
+                        progress(recognized, None)
+                    if result.has_text:
+                        text = result.text
                         if text:
                             text_entry = {
                                 "slide": slide_number,
-                                "image": image_index,
+                                "image": 1,
                                 "text": text
                             }
                             if output_format == "json":
                                 image_texts.append(text_entry)
                             else:
-                                image_texts.append(f"\nSlide {slide_number}, Image {image_index} Text:\n{text}")
+                                image_texts.append(f"\nSlide {slide_number}, Image 1 Text:\n{text}")
 
-                            text_file_path = os.path.join(slide_folder, f"slide_{slide_number}_image_{image_index}_text.txt")
+                            text_file_path = os.path.join(slide_folder, f"slide_{slide_number}_image_1_text.txt")
                             with open(text_file_path, "w", encoding="utf-8") as f:
                                 f.write(text)
                             logger.info(f"Extracted text from {image_name}: {text[:50]}...")
                         else:
-                            logger.debug(f"No readable text in {image_name}")
-                    else:
-                        logger.debug(f"No text detected in {image_name}")
-                    image_index += 1
-
-            if image_index == 1:
-                image_name = f"image_1.jpg"
-                image_path = os.path.join(slide_folder, image_name)
-                slide.Export(image_path, "JPG")
-                logger.debug(f"Saved slide image: {image_path}")
-
-                if contains_text(image_path, ocr):
-                    text = process_image_for_ocr(image_path, ocr)
-                    if text:
-                        text_entry = {
-                            "slide": slide_number,
-                            "image": 1,
-                            "text": text
-                        }
-                        if output_format == "json":
-                            image_texts.append(text_entry)
-                        else:
-                            image_texts.append(f"\nSlide {slide_number}, Image 1 Text:\n{text}")
-
-                        text_file_path = os.path.join(slide_folder, f"slide_{slide_number}_image_1_text.txt")
-                        with open(text_file_path, "w", encoding="utf-8") as f:
-                            f.write(text)
-                        logger.info(f"Extracted text from {image_name}: {text[:50]}...")
+                            logger.debug(f"No readable text in slide {slide_number}")
                     else:
-                        logger.debug(f"No readable text in slide {slide_number}")
-                else:
-                    logger.debug(f"No text detected in slide {slide_number}")
+                        logger.debug(f"No text detected in slide {slide_number}")
 
         prs.Close()
         app.Quit()
@@ -6,6 +6,7 @@ import cv2
 import numpy as np
 import io
 import os
+from modules.image_prefilter import default_prefilter
 
 pytesseract.pytesseract.tesseract_cmd = r'C:\\Program Files\\Tesseract-OCR\\tesseract.exe'
 
@@ -59,20 +60,5 @@ def process_image_for_ocr(image_bytes):
         return f"OCR processing failed: {e}"
 
 def contains_text(image_bytes):
-    """判断图片是否含有文本"""
-    with Image.open(io.BytesIO(image_bytes)) as img:
-        img_cv = np.array(img.convert('L'))  # 转换为灰度
-        img_blur = cv2.GaussianBlur(img_cv, (5, 5), 0) # 应用高斯模糊，减少噪声
-        _, img_bin = cv2.threshold(img_blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU) # 使用 Otsu 二值化
-        edges = cv2.Canny(img_bin, 30, 150)  # 计算边缘像素比例
-        edge_ratio = np.sum(edges > 0) / edges.size
-        contours, _ = cv2.findContours(img_bin, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)  # 轮廓检测
-        text_area = sum(cv2.contourArea(cnt) for cnt in contours)
-        text_ratio = text_area / (img_cv.shape[0] * img_cv.shape[1])
-        # **文本判断标准**：
-        # - **边缘像素比例 > 0.005** (说明有文字结构)
-        # - **文本区域面积比 > 0.01** (大于1%图像面积)
-        if edge_ratio > 0.005 and text_ratio > 0.01:
-            print('word')
-            return True  # 说明图像含有文字
-    return False  # 图像无明显文字
\ No newline at end of file
+    """判断图片是否含有文本（共享的向量化预判：Otsu 二值化、边缘比例与前景面积比例）"""
+    return default_prefilter.contains_text(image_bytes)
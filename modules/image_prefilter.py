@@ -0,0 +1,159 @@
+# image_prefilter.py
+# OCR 前的廉价文本预判：在缩小的灰度图上批量计算 Otsu 二值化、边缘比例和前景面积比例
+import io
+import logging
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 默认阈值沿用 image_extraction_t.contains_text 的经验值
+DEFAULT_EDGE_RATIO = 0.005
+DEFAULT_AREA_RATIO = 0.01
+# 预判在长边不超过 DEFAULT_MAX_SIDE 的缩略图上进行
+DEFAULT_MAX_SIDE = 256
+DEFAULT_BATCH_SIZE = 64
+
+
+def load_gray_thumbnail(image_bytes: bytes, max_side: int = DEFAULT_MAX_SIDE) -> Optional[np.ndarray]:
+    """解码为长边不超过 max_side 的灰度图；JPEG 利用 draft 在解码阶段直接缩小"""
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img.draft('L', (max_side, max_side))
+            img = img.convert('L')
+            img.thumbnail((max_side, max_side))
+            return np.asarray(img, dtype=np.uint8)
+    except Exception as e:
+        logger.debug(f"Prefilter could not decode image: {e}")
+        return None
+
+
+def _stack(images: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """将尺寸不一的图片填充为 (N, H, W) 数组，并返回有效区域掩码"""
+    height = max(image.shape[0] for image in images)
+    width = max(image.shape[1] for image in images)
+    batch = np.zeros((len(images), height, width), dtype=np.uint8)
+    mask = np.zeros((len(images), height, width), dtype=bool)
+    for i, image in enumerate(images):
+        batch[i, :image.shape[0], :image.shape[1]] = image
+        mask[i, :image.shape[0], :image.shape[1]] = True
+    return batch, mask
+
+
+def _blur(batch: np.ndarray) -> np.ndarray:
+    """3x3 均值模糊，抑制噪声（对整批同时计算）"""
+    padded = np.pad(batch.astype(np.float32), ((0, 0), (1, 1), (1, 1)), mode='edge')
+    h, w = batch.shape[1:]
+    total = sum(padded[:, dy:dy + h, dx:dx + w] for dy in range(3) for dx in range(3))
+    return (total / 9.0).astype(np.uint8)
+
+
+def _otsu_thresholds(batch: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """对整批图片同时计算 Otsu 阈值"""
+    n = batch.shape[0]
+    offsets = (np.arange(n, dtype=np.int64) * 256)[:, None, None]
+    hist = np.bincount((batch.astype(np.int64) + offsets)[mask], minlength=256 * n).reshape(n, 256)
+    hist = hist.astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_bg = np.cumsum(hist, axis=1)
+    weight_fg = weight_bg[:, -1:] - weight_bg
+    cum_mean = np.cumsum(hist * levels, axis=1)
+    total_mean = cum_mean[:, -1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_bg = cum_mean / weight_bg
+        mean_fg = (total_mean - cum_mean) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    between = np.nan_to_num(between, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.argmax(between, axis=1)
+
+
+def text_scores(images: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    批量计算每张灰度图的边缘像素比例和前景面积比例。
+
+    Args:
+        images: 灰度图列表（尺寸可不同）。
+
+    Returns:
+        (edge_ratio, area_ratio): 两个长度为 N 的数组。
+    """
+    batch, mask = _stack(images)
+    blurred = _blur(batch)
+    thresholds = _otsu_thresholds(blurred, mask)
+    binary = (blurred > thresholds[:, None, None]) & mask
+
+    # 二值图上相邻像素取值不同即视为边缘（对应 Canny 在二值图上的响应）
+    edges = np.zeros_like(binary)
+    edges[:, :, 1:] |= (binary[:, :, 1:] != binary[:, :, :-1]) & mask[:, :, 1:] & mask[:, :, :-1]
+    edges[:, 1:, :] |= (binary[:, 1:, :] != binary[:, :-1, :]) & mask[:, 1:, :] & mask[:, :-1, :]
+
+    valid = mask.reshape(len(images), -1).sum(axis=1).astype(np.float64)
+    edge_ratio = edges.reshape(len(images), -1).sum(axis=1) / valid
+    area_ratio = binary.reshape(len(images), -1).sum(axis=1) / valid
+    return edge_ratio, area_ratio
+
+
+class TextPrefilter:
+    """
+    OCR 前的文本预判阶段，跳过照片、渐变和空白背景等明显无文字的图片。
+
+    判断标准与 image_extraction_t.contains_text 相同：边缘比例 > edge_ratio 且
+    前景面积比例 > area_ratio。无法解码的图片一律放行，交给 OCR 处理。
+    """
+
+    def __init__(self, edge_ratio: float = DEFAULT_EDGE_RATIO, area_ratio: float = DEFAULT_AREA_RATIO,
+                 max_side: int = DEFAULT_MAX_SIDE, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.edge_ratio = edge_ratio
+        self.area_ratio = area_ratio
+        self.max_side = max_side
+        self.batch_size = max(batch_size, 1)
+        self.checked = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def filter(self, blobs: Sequence[bytes]) -> List[bool]:
+        """
+        批量预判一组图片。
+
+        Returns:
+            List[bool]: 与 blobs 对应，True 表示可能含文本、需要 OCR。
+        """
+        keep = [True] * len(blobs)
+        for start in range(0, len(blobs), self.batch_size):
+            thumbnails = []
+            positions = []
+            for i in range(start, min(start + self.batch_size, len(blobs))):
+                thumbnail = load_gray_thumbnail(blobs[i], self.max_side)
+                if thumbnail is not None and thumbnail.size > 0:
+                    thumbnails.append(thumbnail)
+                    positions.append(i)
+            if not thumbnails:
+                continue
+            edge_ratio, area_ratio = text_scores(thumbnails)
+            passed = (edge_ratio > self.edge_ratio) & (area_ratio > self.area_ratio)
+            for i, value in zip(positions, passed):
+                keep[i] = bool(value)
+
+        skipped = keep.count(False)
+        with self._lock:
+            self.checked += len(blobs)
+            self.skipped += skipped
+        if skipped:
+            logger.info(f"Prefilter skipped {skipped}/{len(blobs)} images without visible text")
+        return keep
+
+    def contains_text(self, image_bytes: bytes) -> bool:
+        """判断单张图片是否可能含有文本"""
+        return self.filter([image_bytes])[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"checked": self.checked, "skipped": self.skipped}
+
+
+# 默认阈值的共享实例
+default_prefilter = TextPrefilter()
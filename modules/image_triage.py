@@ -0,0 +1,144 @@
+# image_triage.py
+# OCR 前的图片分诊：只读文件头获取格式和尺寸，跳过小图标和矢量图元文件，超大图限定长边后再解码
+import io
+import logging
+import struct
+import threading
+from typing import List, Optional, Sequence
+
+from PIL import Image
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 长边和短边都小于 DEFAULT_MIN_SIDE 像素的图片视为图标，不做 OCR；
+# 只有一边很窄的横幅、标题条可能含有文字，照常识别
+DEFAULT_MIN_SIDE = 32
+# 长边超过 DEFAULT_MAX_SIDE 像素的图片先缩小再 OCR
+DEFAULT_MAX_SIDE = 2048
+
+# OCR 解码器无法正确处理的矢量格式
+VECTOR_CONTENT_TYPES = ("image/x-emf", "image/x-wmf", "image/emf", "image/wmf", "image/svg+xml")
+VECTOR_FORMATS = ("emf", "wmf", "svg")
+
+
+class ImageInfo:
+    """从文件头读取的图片信息，尺寸未知时为 None。"""
+    __slots__ = ("format", "width", "height")
+
+    def __init__(self, fmt: str, width: Optional[int] = None, height: Optional[int] = None):
+        self.format = fmt
+        self.width = width
+        self.height = height
+
+
+class TriageDecision:
+    """分诊结果：skip 为跳过原因（None 表示需要 OCR），max_side 为解码时的长边上限。"""
+    __slots__ = ("info", "skip", "max_side")
+
+    def __init__(self, info: ImageInfo, skip: Optional[str] = None, max_side: Optional[int] = None):
+        self.info = info
+        self.skip = skip
+        self.max_side = max_side
+
+
+def _jpeg_size(data: bytes):
+    """扫描 JPEG 段，读取 SOFn 中的尺寸"""
+    offset = 2
+    length = len(data)
+    while offset + 9 < length:
+        if data[offset] != 0xFF:
+            offset += 1
+            continue
+        marker = data[offset + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        segment_length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        if marker in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + segment_length
+    return None, None
+
+
+def probe_image(data: bytes, content_type: Optional[str] = None) -> ImageInfo:
+    """
+    只解析文件头，获取图片格式和像素尺寸，不做完整解码。
+
+    Args:
+        data (bytes): 图片原始字节。
+        content_type (str, optional): PPTX 部件声明的内容类型，用于识别矢量格式。
+
+    Returns:
+        ImageInfo: 格式及尺寸。
+    """
+    head = data[:64]
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(head) >= 24:
+        width, height = struct.unpack(">II", head[16:24])
+        return ImageInfo("png", width, height)
+    if head.startswith(b"\xff\xd8"):
+        width, height = _jpeg_size(data)
+        return ImageInfo("jpeg", width, height)
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        width, height = struct.unpack("<HH", head[6:10])
+        return ImageInfo("gif", width, height)
+    if head.startswith(b"BM") and len(head) >= 26:
+        width, height = struct.unpack("<ii", head[18:26])
+        return ImageInfo("bmp", width, abs(height))
+    if len(head) >= 44 and head[:4] == b"\x01\x00\x00\x00" and head[40:44] == b" EMF":
+        return ImageInfo("emf")
+    if head[:4] == b"\xd7\xcd\xc6\x9a" or head[:4] in (b"\x01\x00\x09\x00", b"\x02\x00\x09\x00"):
+        return ImageInfo("wmf")
+    if content_type in VECTOR_CONTENT_TYPES:
+        return ImageInfo(content_type.split("/")[-1].replace("x-", "").replace("+xml", ""))
+
+    # 其他格式（如 TIFF）交给 PIL：Image.open 只读取文件头，不解码像素
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return ImageInfo(img.format.lower() if img.format else "unknown", img.width, img.height)
+    except Exception:
+        return ImageInfo("unknown")
+
+
+class ImageTriage:
+    """
+    OCR 前的分诊阶段。
+
+    - 矢量图元文件（EMF/WMF/SVG）直接跳过；
+    - 长边小于 min_side（两边都是图标尺寸）的小图标跳过，宽而矮的文字横幅照常识别；
+    - 长边超过 max_side 的图片在解码时缩小到 max_side，OCR 耗时和内存不再随像素数增长。
+    """
+
+    def __init__(self, min_side: int = DEFAULT_MIN_SIDE, max_side: int = DEFAULT_MAX_SIDE):
+        self.min_side = min_side
+        self.max_side = max_side
+        self.counts = {"checked": 0, "vector": 0, "too_small": 0, "downscaled": 0}
+        self._lock = threading.Lock()
+
+    def decide(self, data: bytes, content_type: Optional[str] = None) -> TriageDecision:
+        info = probe_image(data, content_type)
+        if info.format in VECTOR_FORMATS:
+            return TriageDecision(info, skip="vector")
+        if info.width is not None and info.height is not None:
+            if max(info.width, info.height) < self.min_side:
+                return TriageDecision(info, skip="too_small")
+        return TriageDecision(info, max_side=self.max_side)
+
+    def triage(self, blobs: Sequence[bytes], content_types: Optional[Sequence[Optional[str]]] = None) -> List[TriageDecision]:
+        """对一组图片分诊并更新统计"""
+        content_types = content_types or [None] * len(blobs)
+        decisions = [self.decide(blob, content_type) for blob, content_type in zip(blobs, content_types)]
+        with self._lock:
+            self.counts["checked"] += len(decisions)
+            for decision in decisions:
+                if decision.skip:
+                    self.counts[decision.skip] += 1
+                elif decision.info.width and decision.info.height and \
+                        max(decision.info.width, decision.info.height) > self.max_side:
+                    self.counts["downscaled"] += 1
+        return decisions
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counts)
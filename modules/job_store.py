@@ -0,0 +1,149 @@
+# job_store.py
+# 基于 SQLite 的任务状态存储，服务重启后仍可查询和恢复任务
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+UNFINISHED = (QUEUED, RUNNING)
+FINISHED = (DONE, FAILED)
+
+
+class JobStore:
+    """
+    任务表。
+
+    每个任务保存上传文件路径、请求参数、进度、结果和错误信息；
+    进度和结果以 JSON 存储。同一文件可被多个线程共享（WAL 模式）。
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork 之后不能沿用父进程的连接
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT NOT NULL, file_path TEXT NOT NULL, "
+                "params TEXT NOT NULL, progress TEXT NOT NULL, result TEXT, error TEXT, "
+                "created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated)")
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def _execute(self, sql: str, args: tuple = ()):
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute(sql, args)
+            conn.commit()
+            return cursor
+
+    def create(self, filename: str, file_path: str, params: Optional[dict] = None) -> str:
+        """新建排队中的任务，返回任务 id"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, status, filename, file_path, params, progress, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, filename, file_path, json.dumps(params or {}), json.dumps({}), now, now)
+        )
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id, status, filename, file_path, params, progress, result, error, created, updated "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "filename": row[2],
+            "file_path": row[3],
+            "params": json.loads(row[4]),
+            "progress": json.loads(row[5]),
+            "result": json.loads(row[6]) if row[6] is not None else None,
+            "error": row[7],
+            "created": row[8],
+            "updated": row[9],
+        }
+
+    def set_status(self, job_id: str, status: str):
+        self._execute("UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (status, time.time(), job_id))
+
+    def update_progress(self, job_id: str, **fields):
+        """合并更新进度字段，如 slides_done、images_done"""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return
+            progress = json.loads(row[0])
+            progress.update(fields)
+            conn.execute("UPDATE jobs SET progress = ?, updated = ? WHERE id = ?",
+                         (json.dumps(progress), time.time(), job_id))
+            conn.commit()
+
+    def complete(self, job_id: str, result: dict):
+        self._execute("UPDATE jobs SET status = ?, result = ?, error = NULL, updated = ? WHERE id = ?",
+                      (DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id))
+
+    def fail(self, job_id: str, error: str):
+        self._execute("UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                      (FAILED, error, time.time(), job_id))
+
+    def unfinished(self) -> List[dict]:
+        """排队中或运行中的任务，按创建时间排序，用于重启后恢复"""
+        with self._lock:
+            ids = [row[0] for row in self._connect().execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created", UNFINISHED
+            ).fetchall()]
+        return [job for job in (self.get(job_id) for job_id in ids) if job is not None]
+
+    def purge(self, older_than: float, now: Optional[float] = None) -> int:
+        """
+        删除结束（done/failed）超过 older_than 秒的任务及其结果，排队中和运行中的任务不受影响。
+
+        Returns:
+            int: 删除的任务数。
+        """
+        cutoff = (time.time() if now is None else now) - older_than
+        deleted = self._execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?", (*FINISHED, cutoff)
+        ).rowcount
+        if deleted:
+            logger.info(f"Purged {deleted} finished jobs older than {older_than:.0f}s from {self.path}")
+        return deleted
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
@@ -0,0 +1,157 @@
+# jobs.py
+# 异步任务执行：提交后立即返回任务 id，由工作线程池处理，状态和进度写入 JobStore
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from modules.job_store import FAILED, QUEUED, RUNNING, JobStore
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 结束的任务默认保留 7 天
+DEFAULT_RETENTION = 7 * 24 * 3600
+# 提交任务时最多每隔这么多秒清理一次过期任务
+PURGE_INTERVAL = 3600
+
+
+class JobRunner:
+    """
+    任务执行器。
+
+    handler(file_path, params, progress) 完成实际处理并返回可 JSON 序列化的结果字典，
+    progress(**fields) 用于上报进度。任务结束后删除上传文件。
+    结束超过 retention 秒的任务连同结果一起从任务表删除：恢复时清理一次，之后提交任务时最多每小时清理一次；
+    retention <= 0 表示永久保留。
+    """
+
+    def __init__(self, store: JobStore, handler: Callable, workers: int = 2, retention: float = DEFAULT_RETENTION):
+        self.store = store
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.retention = retention
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 保护线程池的创建、提交和关闭，接口线程可能同时提交任务
+        self._executor_lock = threading.Lock()
+        self._on_done: Dict[str, Callable] = {}
+        self._purge_lock = threading.Lock()
+        self._last_purge = None
+
+    def _enqueue(self, job_id: str):
+        # 首次提交时才创建线程池（serve.py 的主进程 fork 前不启动线程）
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._executor.submit(self._run, job_id)
+
+    def submit(self, filename: str, file_path: str, params: Optional[dict] = None,
+               on_done: Optional[Callable] = None) -> str:
+        """登记任务并放入线程池，立即返回任务 id；on_done(succeeded) 在任务结束后调用"""
+        self.purge_expired(force=False)
+        job_id = self.store.create(filename, file_path, params)
+        if on_done is not None:
+            self._on_done[job_id] = on_done
+        self._enqueue(job_id)
+        logger.info(f"Queued job {job_id} for {filename}")
+        return job_id
+
+    def recover(self) -> int:
+        """
+        重启后恢复未完成的任务：上传文件仍在的重新排队，否则标记为失败。
+
+        Returns:
+            int: 重新排队的任务数。
+        """
+        self.purge_expired()
+        requeued = 0
+        for job in self.store.unfinished():
+            if os.path.exists(job["file_path"]):
+                self.store.set_status(job["id"], QUEUED)
+                self._enqueue(job["id"])
+                requeued += 1
+            else:
+                self.store.fail(job["id"], "Interrupted by server restart and upload is no longer available")
+        if requeued:
+            logger.info(f"Requeued {requeued} unfinished jobs")
+        return requeued
+
+    def purge_expired(self, force: bool = True, now: Optional[float] = None) -> int:
+        """
+        删除结束超过保留期的任务。
+
+        Args:
+            force (bool): 为 False 时距上次清理不足 PURGE_INTERVAL 秒则跳过。
+            now (float, optional): 当前时间戳，默认 time.time()。
+
+        Returns:
+            int: 删除的任务数。
+        """
+        if self.retention is None or self.retention <= 0:
+            return 0
+        now = time.time() if now is None else now
+        with self._purge_lock:
+            if not force and self._last_purge is not None and now - self._last_purge < PURGE_INTERVAL:
+                return 0
+            self._last_purge = now
+        try:
+            return self.store.purge(self.retention, now)
+        except Exception as e:
+            logger.error(f"Failed to purge expired jobs: {e}")
+            return 0
+
+    def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in (QUEUED, RUNNING):
+            on_done = self._on_done.pop(job_id, None)
+            if on_done is not None:
+                on_done(False)
+            return
+        self.store.set_status(job_id, RUNNING)
+        logger.info(f"Running job {job_id} ({job['filename']})")
+
+        def progress(**fields):
+            self.store.update_progress(job_id, **fields)
+
+        succeeded = False
+        try:
+            result = self.handler(job["file_path"], job["params"], progress)
+            self.store.complete(job_id, result)
+            succeeded = True
+            logger.info(f"Job {job_id} completed")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}", exc_info=True)
+            self.store.fail(job_id, str(e))
+        finally:
+            on_done = self._on_done.pop(job_id, None)
+            if on_done is not None:
+                on_done(succeeded)
+            try:
+                if os.path.exists(job["file_path"]):
+                    os.remove(job["file_path"])
+            except OSError as e:
+                logger.warning(f"Failed to remove upload for job {job_id}: {e}")
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """供接口返回的任务状态，不含结果正文"""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "filename": job["filename"],
+            "progress": job["progress"],
+            "error": job["error"] if job["status"] == FAILED else None,
+            "created": job["created"],
+            "updated": job["updated"],
+        }
+
+    def shutdown(self, wait: bool = True):
+        # 在锁外等待已提交的任务，之后的提交会创建新的线程池
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
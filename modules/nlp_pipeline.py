@@ -0,0 +1,66 @@
+# nlp_pipeline.py
+# 文本优化用到的 spaCy 分句管线：完整模型、只保留分句所需组件的精简模型，或基于规则的分句器
+import logging
+import time
+from typing import List, Sequence
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+SPACY_MODEL = "zh_core_web_sm"
+SPACY_MODES = ("full", "lean", "sentencizer")
+# 分句只依赖 tok2vec 和 parser，其余组件在精简模式下不加载
+LEAN_EXCLUDE = ["tagger", "attribute_ruler", "ner", "lemmatizer"]
+# 规则分句器的句末标点
+SENTENCE_PUNCT = ["。", "！", "？", "；", "!", "?", ";", ".", "…"]
+
+
+def load_nlp(mode: str = "full", model: str = SPACY_MODEL):
+    """
+    按模式加载 spaCy 管线。
+
+    Args:
+        mode (str): "full"（完整模型，默认）、"lean"（只保留 tok2vec 和 parser）
+            或 "sentencizer"（空白中文管线加规则分句器，不加载统计模型）。
+        model (str): 统计模型名称。
+
+    Returns:
+        spacy.Language: 可产生 doc.sents 的管线。
+    """
+    import spacy
+
+    if mode not in SPACY_MODES:
+        logger.warning(f"Unknown spaCy mode '{mode}', using 'full'")
+        mode = "full"
+
+    start = time.perf_counter()
+    if mode == "sentencizer":
+        nlp = spacy.blank("zh")
+        nlp.add_pipe("sentencizer", config={"punct_chars": SENTENCE_PUNCT})
+    elif mode == "lean":
+        nlp = spacy.load(model, exclude=LEAN_EXCLUDE)
+    else:
+        nlp = spacy.load(model)
+    logger.info(f"Loaded spaCy pipeline ({mode}: {', '.join(nlp.pipe_names)}) in {time.perf_counter() - start:.2f}s")
+    return nlp
+
+
+def split_sentences(nlp, texts: Sequence[str], batch_size: int = 64, n_process: int = 1) -> List[List[str]]:
+    """
+    一次 nlp.pipe 调用完成多段文本的分句。
+
+    Args:
+        nlp: spaCy 管线。
+        texts (Sequence[str]): 每张幻灯片拼接后的文本。
+        batch_size (int): nlp.pipe 的批大小。
+        n_process (int): nlp.pipe 的工作进程数。
+
+    Returns:
+        List[List[str]]: 与 texts 一一对应的句子列表。
+    """
+    if not texts:
+        return []
+    return [
+        [sent.text.strip() for sent in doc.sents]
+        for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+    ]
@@ -0,0 +1,108 @@
+# ocr_batch.py
+# 跨图片批量 OCR：逐张检测文本框，再将整份演示文稿的文本行按宽高比分组批量分类、识别
+import copy
+import logging
+from typing import List, Sequence
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 默认每批识别的文本行数
+DEFAULT_BATCH_SIZE = 16
+
+
+def supports_batching(ocr) -> bool:
+    """判断 PaddleOCR 实例是否暴露了可单独调用的检测、识别子模型"""
+    return hasattr(ocr, "text_detector") and hasattr(ocr, "text_recognizer")
+
+
+def _sorted_boxes(dt_boxes):
+    """按从上到下、从左到右排序文本框（与 PaddleOCR 的 sorted_boxes 一致）"""
+    boxes = sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+
+def _crop_box(image, points):
+    """按四边形文本框透视裁剪文本行，竖排文本旋转为横排"""
+    points = np.asarray(points, dtype=np.float32)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE,
+                               flags=cv2.INTER_CUBIC)
+    if crop.shape[0] * 1.0 / max(crop.shape[1], 1) >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+
+def _chunks(items: Sequence, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def batch_ocr(images: List[np.ndarray], ocr, batch_size: int = DEFAULT_BATCH_SIZE, use_angle_cls: bool = True):
+    """
+    对多张图片批量执行 det+cls+rec，返回与逐张调用 ocr.ocr(image, cls=True) 相同结构的结果。
+
+    检测模型按图片逐张运行；所有图片的文本行汇总后按宽高比排序，
+    再以 batch_size 为单位送入方向分类和识别模型，使同一批内填充尽量少。
+
+    Args:
+        images (List[np.ndarray]): BGR 图片数组列表。
+        ocr: PaddleOCR 实例。
+        batch_size (int): 每批文本行数。
+        use_angle_cls (bool): 是否运行方向分类。
+
+    Returns:
+        list: 每张图片一项，格式同 ocr.ocr() 的返回值。
+    """
+    if not supports_batching(ocr):
+        logger.warning("PaddleOCR instance does not expose sub-models, falling back to per-image OCR")
+        return [ocr.ocr(image, cls=use_angle_cls) for image in images]
+
+    # 第一步：逐张检测，收集所有文本行
+    boxes_per_image = []
+    crops = []
+    owners = []
+    for image_number, image in enumerate(images):
+        dt_boxes, _ = ocr.text_detector(image)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            boxes_per_image.append([])
+            continue
+        boxes = _sorted_boxes(dt_boxes)
+        boxes_per_image.append(boxes)
+        for box_number, box in enumerate(boxes):
+            crops.append(_crop_box(image, copy.deepcopy(box)))
+            owners.append((image_number, box_number))
+
+    # 第二步：按宽高比排序后分批分类、识别，减少同批次的填充浪费
+    order = sorted(range(len(crops)), key=lambda k: crops[k].shape[1] / float(max(crops[k].shape[0], 1)))
+    recognized = [None] * len(crops)
+    classifier = getattr(ocr, "text_classifier", None) if use_angle_cls else None
+    for batch in _chunks(order, max(batch_size, 1)):
+        batch_crops = [crops[k] for k in batch]
+        if classifier is not None:
+            batch_crops, _, _ = classifier(batch_crops)
+        rec_res, _ = ocr.text_recognizer(batch_crops)
+        for k, res in zip(batch, rec_res):
+            recognized[k] = res
+
+    # 第三步：按原图片和文本框顺序还原结果
+    drop_score = getattr(ocr, "drop_score", 0.5)
+    lines_per_image = [[] for _ in images]
+    for (image_number, box_number), (text, score) in zip(owners, recognized):
+        if score >= drop_score:
+            box = boxes_per_image[image_number][box_number]
+            lines_per_image[image_number].append([np.asarray(box).tolist(), (text, score)])
+
+    return [[lines] if lines else [None] for lines in lines_per_image]
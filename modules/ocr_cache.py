@@ -0,0 +1,51 @@
+# ocr_cache.py
+# 以图片内容哈希为键的 OCR 结果缓存，同一张图片在任何演示文稿中只需识别一次
+import hashlib
+import logging
+from typing import Optional
+
+from modules.cache import DEFAULT_MAX_BYTES, PersistentCache
+from modules.ocr_engine import MIN_CONFIDENCE, MIN_TEXT_LENGTH, OCRResult
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def _engine_version() -> str:
+    try:
+        from importlib.metadata import version
+        return version("paddleocr")
+    except Exception:
+        return "unknown"
+
+
+class OCRResultCache:
+    """
+    OCR 结果缓存。
+
+    键由图片字节的 SHA-256、OCR 引擎配置（版本、语言、方向分类器、解码长边上限）和过滤阈值组成，
+    任何一项变化都会得到不同的键，不会读到过期结果。过滤阈值取 ocr_engine 中各识别路径实际使用的
+    MIN_CONFIDENCE 和 MIN_TEXT_LENGTH，不单独配置。
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, lang: str = 'ch',
+                 use_angle_cls: bool = True, max_side: Optional[int] = None):
+        self.store = PersistentCache(path, max_bytes)
+        self.config = (
+            f"paddleocr={_engine_version()};lang={lang};cls={int(use_angle_cls)};"
+            f"conf={MIN_CONFIDENCE};len={MIN_TEXT_LENGTH};max_side={max_side or 0}"
+        )
+        logger.info(f"OCR result cache at {self.store.path} ({self.config})")
+
+    def key(self, image_bytes: bytes) -> str:
+        return f"ocr:{hashlib.sha256(image_bytes).hexdigest()}:{self.config}"
+
+    def get(self, image_bytes: bytes) -> Optional[OCRResult]:
+        data = self.store.get_json(self.key(image_bytes))
+        return None if data is None else OCRResult.from_dict(data)
+
+    def put(self, image_bytes: bytes, result: OCRResult):
+        self.store.set_json(self.key(image_bytes), result.to_dict())
+
+    def stats(self) -> dict:
+        return self.store.stats()
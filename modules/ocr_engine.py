@@ -0,0 +1,159 @@
+# ocr_engine.py
+# 单次 OCR 推理及其结果：是否含文本与提取文本都由同一次识别结果得出
+import io
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 识别结果过滤阈值：置信度需大于 MIN_CONFIDENCE，文本长度不小于 MIN_TEXT_LENGTH
+MIN_CONFIDENCE = 0.5
+MIN_TEXT_LENGTH = 2
+
+
+class OCRResult:
+    """单张图片的 OCR 结果，lines 为通过过滤的 (文本, 置信度) 列表。"""
+    __slots__ = ("lines",)
+
+    def __init__(self, lines: Optional[List[Tuple[str, float]]] = None):
+        self.lines = lines or []
+
+    @property
+    def has_text(self) -> bool:
+        return len(self.lines) > 0
+
+    @property
+    def text(self) -> str:
+        return '\n'.join(text for text, _ in self.lines).strip()
+
+    def to_dict(self) -> dict:
+        return {"lines": [[text, confidence] for text, confidence in self.lines]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "OCRResult":
+        return cls([(text, confidence) for text, confidence in data.get("lines", [])])
+
+
+class ImageCandidate:
+    """待识别的图片：所在幻灯片序号、幻灯片内图片序号、原始字节及 PPTX 部件声明的类型。"""
+    __slots__ = ("slide_number", "image_index", "blob", "content_type", "ext")
+
+    def __init__(self, slide_number: int, image_index: int, blob: bytes,
+                 content_type: Optional[str] = None, ext: str = "jpg"):
+        self.slide_number = slide_number
+        self.image_index = image_index
+        self.blob = blob
+        self.content_type = content_type
+        self.ext = ext
+
+    @property
+    def key(self) -> Tuple[int, int]:
+        return (self.slide_number, self.image_index)
+
+
+class OCRJobResult:
+    """
+    一次任务内所有图片的 OCR 结果，按 (幻灯片序号, 图片序号) 索引，供后续阶段复用。
+    """
+
+    def __init__(self):
+        self._results: Dict[Tuple[int, int], OCRResult] = {}
+
+    def add(self, slide_number: int, image_index: int, result: OCRResult):
+        self._results[(slide_number, image_index)] = result
+
+    def get(self, slide_number: int, image_index: int) -> Optional[OCRResult]:
+        return self._results.get((slide_number, image_index))
+
+    def items(self) -> Iterator[Tuple[Tuple[int, int], OCRResult]]:
+        """按幻灯片和图片顺序遍历结果"""
+        for key in sorted(self._results):
+            yield key, self._results[key]
+
+    def for_slide(self, slide_number: int) -> List[Tuple[int, OCRResult]]:
+        return [(image, result) for (slide, image), result in self.items() if slide == slide_number]
+
+    def __len__(self):
+        return len(self._results)
+
+
+# JPEG 解码时可直接缩小的倍数及对应的 OpenCV 标志
+_JPEG_REDUCTIONS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def _limit_side(image: np.ndarray, max_side: Optional[int]) -> np.ndarray:
+    if not max_side or max(image.shape[:2]) <= max_side:
+        return image
+    scale = max_side / float(max(image.shape[:2]))
+    size = (max(int(image.shape[1] * scale), 1), max(int(image.shape[0] * scale), 1))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def decode_image(image_bytes: bytes, max_side: Optional[int] = None) -> Optional[np.ndarray]:
+    """
+    将内存中的图片字节直接解码为 BGR 数组，不经过磁盘。
+
+    指定 max_side 时结果的长边不超过 max_side；JPEG 会根据文件头中的尺寸
+    在解码阶段直接按 2/4/8 倍缩小，避免先解码出完整的大图。
+    OpenCV 无法解码的格式（如 GIF）回退到 PIL；均失败时返回 None。
+    """
+    flags = cv2.IMREAD_COLOR
+    if max_side and image_bytes[:2] == b"\xff\xd8":
+        from modules.image_triage import probe_image
+        info = probe_image(image_bytes)
+        if info.width and info.height:
+            long_side = max(info.width, info.height)
+            for factor, reduced_flag in _JPEG_REDUCTIONS:
+                if long_side / factor >= max_side:
+                    flags = reduced_flag
+                    break
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), flags)
+    if image is not None:
+        return _limit_side(image, max_side)
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            if max_side:
+                img.draft('RGB', (max_side, max_side))
+            return _limit_side(cv2.cvtColor(np.asarray(img.convert('RGB')), cv2.COLOR_RGB2BGR), max_side)
+    except Exception as e:
+        logger.debug(f"Unable to decode in-memory image: {e}")
+        return None
+
+
+def filter_ocr_lines(raw_result, min_confidence: float = MIN_CONFIDENCE,
+                     min_length: int = MIN_TEXT_LENGTH) -> OCRResult:
+    """将 PaddleOCR 原始输出过滤为 OCRResult"""
+    if not raw_result or not raw_result[0]:
+        return OCRResult()
+    lines = [
+        (line[1][0], float(line[1][1])) for line in raw_result[0]
+        if line and len(line[1][0]) >= min_length and line[1][1] > min_confidence
+    ]
+    return OCRResult(lines)
+
+
+def run_ocr(image, ocr, min_confidence: float = MIN_CONFIDENCE,
+            min_length: int = MIN_TEXT_LENGTH) -> OCRResult:
+    """
+    对单张图片执行一次完整的 det+cls+rec 推理。
+
+    Args:
+        image: 图片路径或 NumPy 数组。
+        ocr: PaddleOCR 实例。
+        min_confidence (float): 最低置信度（不含）。
+        min_length (int): 最短文本长度。
+
+    Returns:
+        OCRResult: 过滤后的识别结果；识别失败时为空结果。
+    """
+    try:
+        return filter_ocr_lines(ocr.ocr(image, cls=True), min_confidence, min_length)
+    except Exception as e:
+        logger.error(f"OCR processing failed for {image if isinstance(image, str) else 'in-memory image'}: {e}")
+        return OCRResult()
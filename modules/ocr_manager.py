@@ -0,0 +1,177 @@
+# ocr_manager.py
+# 进程级 PaddleOCR 模型管理：每种配置只加载一次，空闲超时后自动卸载
+import gc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 默认空闲卸载时间（秒），<= 0 表示永不卸载
+DEFAULT_IDLE_TIMEOUT = 600
+
+OCRKey = Tuple[str, bool, bool]
+
+
+def _default_factory(lang: str, use_gpu: bool, use_angle_cls: bool):
+    """构造 PaddleOCR 实例（延迟导入，避免不做 OCR 的进程加载 paddle）"""
+    from paddleocr import PaddleOCR
+    return PaddleOCR(use_angle_cls=use_angle_cls, lang=lang, use_gpu=use_gpu)
+
+
+class _ModelSlot:
+    """单个配置对应的模型及其使用状态"""
+    __slots__ = ("model", "lock", "in_use", "last_used", "pinned")
+
+    def __init__(self, model):
+        self.model = model
+        # 常驻的模型不参与空闲卸载
+        self.pinned = False
+        # PaddleOCR 推理不是线程安全的，同一实例的调用需串行
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+
+class OCRModelManager:
+    """
+    按 (lang, use_gpu, use_angle_cls) 缓存 PaddleOCR 实例的管理器。
+
+    同一配置在进程内只加载一次；通过 acquire() 借出的实例在 with 块内独占使用，
+    后台线程会卸载超过 idle_timeout 秒未使用的模型。
+    """
+
+    def __init__(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 factory: Callable[[str, bool, bool], object] = _default_factory):
+        self.idle_timeout = idle_timeout
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._load_locks: Dict[OCRKey, threading.Lock] = {}
+        self._slots: Dict[OCRKey, _ModelSlot] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def configure(self, idle_timeout: Optional[float] = None):
+        """更新管理器配置"""
+        if idle_timeout is not None:
+            self.idle_timeout = idle_timeout
+            logger.info(f"OCR model idle timeout set to {idle_timeout}s")
+
+    def _slot(self, lang: str, use_gpu: bool, use_angle_cls: bool) -> _ModelSlot:
+        key = (lang, bool(use_gpu), bool(use_angle_cls))
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None:
+                return slot
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # 每个配置单独加锁加载，不同配置之间互不阻塞
+        with load_lock:
+            with self._lock:
+                slot = self._slots.get(key)
+            if slot is not None:
+                return slot
+            start = time.perf_counter()
+            model = self._factory(*key)
+            slot = _ModelSlot(model)
+            with self._lock:
+                self._slots[key] = slot
+            logger.info(f"Loaded PaddleOCR model {key} in {time.perf_counter() - start:.2f}s")
+        self._ensure_reaper()
+        return slot
+
+    @contextmanager
+    def acquire(self, lang: str = 'ch', use_gpu: bool = False, use_angle_cls: bool = True):
+        """
+        借出指定配置的 PaddleOCR 实例，with 块内独占使用。
+
+        Args:
+            lang (str): 识别语言，默认 'ch'。
+            use_gpu (bool): 是否使用 GPU。
+            use_angle_cls (bool): 是否启用方向分类器。
+
+        Yields:
+            PaddleOCR: 已加载的 OCR 实例。
+        """
+        while True:
+            slot = self._slot(lang, use_gpu, use_angle_cls)
+            with self._lock:
+                # 加载后到此处之间可能已被卸载，需重新获取
+                if self._slots.get((lang, bool(use_gpu), bool(use_angle_cls))) is slot:
+                    slot.in_use += 1
+                    break
+        try:
+            with slot.lock:
+                yield slot.model
+        finally:
+            with self._lock:
+                slot.in_use -= 1
+                slot.last_used = time.monotonic()
+
+    def warmup(self, lang: str = 'ch', use_gpu: bool = False, use_angle_cls: bool = True):
+        """预先加载指定配置的模型，通常在服务启动时调用"""
+        self._slot(lang, use_gpu, use_angle_cls)
+
+    def loaded(self):
+        """返回当前已加载的配置列表"""
+        with self._lock:
+            return list(self._slots)
+
+    def pin_loaded(self):
+        """
+        将当前已加载的模型标记为常驻，不再被空闲卸载。
+
+        prefork 服务的主进程在 fork 前加载并固定模型，工作进程恢复空闲超时后，
+        继承来的共享模型仍然保留，只有工作进程自己加载的其他配置会被卸载。
+        """
+        with self._lock:
+            for slot in self._slots.values():
+                slot.pinned = True
+
+    def unload_idle(self, now: Optional[float] = None) -> int:
+        """卸载空闲超时且未被占用的模型，返回卸载数量"""
+        if self.idle_timeout is None or self.idle_timeout <= 0:
+            return 0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [
+                key for key, slot in self._slots.items()
+                if slot.in_use == 0 and not slot.pinned and now - slot.last_used >= self.idle_timeout
+            ]
+            for key in expired:
+                del self._slots[key]
+        if expired:
+            gc.collect()
+            logger.info(f"Unloaded idle PaddleOCR models: {expired}")
+        return len(expired)
+
+    def unload_all(self):
+        """卸载所有未被占用的模型"""
+        with self._lock:
+            idle = [key for key, slot in self._slots.items() if slot.in_use == 0]
+            for key in idle:
+                del self._slots[key]
+        gc.collect()
+
+    def _ensure_reaper(self):
+        if self.idle_timeout is None or self.idle_timeout <= 0:
+            return
+        with self._lock:
+            if self._reaper is not None and self._reaper.is_alive():
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="ocr-model-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._stop.wait(max(min(self.idle_timeout / 2, 60), 1)):
+            try:
+                self.unload_idle()
+            except Exception as e:
+                logger.error(f"Failed to unload idle OCR models: {e}")
+
+
+# 进程级共享实例
+ocr_manager = OCRModelManager()
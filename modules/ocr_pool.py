@@ -0,0 +1,214 @@
+# ocr_pool.py
+# 多进程 OCR 后端：每个工作进程启动时加载一次 PaddleOCR，从任务队列领取图片批次；
+# 分块在工作进程中失败时回退到本进程识别
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from modules.deadline import expired
+from modules.ocr_engine import OCRResult
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 每个任务包含的图片数量
+DEFAULT_CHUNK_SIZE = 8
+# warmup 等待全部工作进程启动的默认秒数（含模型加载）
+DEFAULT_WARMUP_TIMEOUT = 300
+
+# 工作进程内的 OCR 配置，由 _init_worker 设置
+_worker_config = None
+# 工作进程共享的屏障，warmup 时每个工作进程各领取一个 _ping 并在此等待
+_ready = None
+
+
+def _start_worker(ready, initializer, initargs):
+    """工作进程入口：记录 warmup 屏障后执行实际的初始化函数"""
+    global _ready
+    _ready = ready
+    initializer(*initargs)
+
+
+def _init_worker(lang, use_gpu, use_angle_cls):
+    """工作进程初始化：加载并常驻本进程的 PaddleOCR 模型"""
+    global _worker_config
+    from modules.ocr_manager import ocr_manager
+    _worker_config = (lang, use_gpu, use_angle_cls)
+    ocr_manager.configure(idle_timeout=0)
+    ocr_manager.warmup(*_worker_config)
+    logger.info(f"OCR worker {multiprocessing.current_process().name} ready")
+
+
+def _ping(timeout: Optional[float] = None):
+    """
+    等到全部工作进程都领取了 _ping 再返回：等待期间本进程不会再领取任务，
+    因此 N 个 _ping 必然分别落在 N 个不同的工作进程上。
+    """
+    if _ready is not None:
+        _ready.wait(timeout)
+    return multiprocessing.current_process().name
+
+
+def _recognize_blobs(blobs: List[bytes], batch_size: Optional[int], max_side: Optional[int], config):
+    """
+    识别一批图片，在工作进程中执行，分块失败时也在主进程中执行。
+
+    Returns:
+        list: 与 blobs 对应的结果字典；识别失败的图片为 None。
+    """
+    from modules.ocr_batch import batch_ocr
+    from modules.ocr_engine import decode_image, filter_ocr_lines
+    from modules.ocr_manager import ocr_manager
+
+    lang, use_gpu, use_angle_cls = config
+    results = [None] * len(blobs)
+    decoded = []
+    for i, blob in enumerate(blobs):
+        image = decode_image(blob, max_side)
+        if image is None:
+            results[i] = OCRResult().to_dict()
+        else:
+            decoded.append((i, image))
+
+    with ocr_manager.acquire(lang, use_gpu, use_angle_cls) as ocr:
+        raw_results = None
+        if batch_size and batch_size > 0:
+            try:
+                raw_results = batch_ocr([image for _, image in decoded], ocr, batch_size, use_angle_cls)
+            except Exception as e:
+                logger.error(f"Batched OCR failed, falling back to per-image OCR: {e}")
+        for position, (i, image) in enumerate(decoded):
+            try:
+                raw = raw_results[position] if raw_results is not None else ocr.ocr(image, cls=use_angle_cls)
+                results[i] = filter_ocr_lines(raw).to_dict()
+            except Exception as e:
+                logger.error(f"OCR processing failed: {e}")
+    return results
+
+
+def _recognize_chunk(blobs: List[bytes], batch_size: Optional[int], max_side: Optional[int] = None):
+    """在工作进程中识别一批图片，使用 _init_worker 设置的配置"""
+    return _recognize_blobs(blobs, batch_size, max_side, _worker_config)
+
+
+class OCRProcessPool:
+    """
+    基于 ProcessPoolExecutor 的 OCR 进程池。
+
+    图片按 chunk_size 分块提交，空闲的工作进程从任务队列领取；结果按提交顺序
+    放回原位置，因此输出顺序与输入顺序一致，与工作进程完成的先后无关。
+    """
+
+    def __init__(self, workers: int, lang: str = 'ch', use_gpu: bool = False, use_angle_cls: bool = True,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, batch_size: Optional[int] = None,
+                 worker=_recognize_chunk, initializer=_init_worker, fallback=None):
+        """
+        Args:
+            workers (int): 工作进程数量。
+            lang, use_gpu, use_angle_cls: PaddleOCR 配置。
+            chunk_size (int): 每个任务包含的图片数量。
+            batch_size (int, optional): 工作进程内批量识别的批大小。
+            worker: 在工作进程中执行的识别函数 (blobs, batch_size, max_side) -> 结果字典列表，须可被 pickle。
+            initializer: 工作进程初始化函数，参数为 (lang, use_gpu, use_angle_cls)，须可被 pickle。
+            fallback: 分块在工作进程中失败时于本进程重试的函数 (blobs, max_side) -> 结果字典列表；
+                默认用本进程的 ocr_manager 识别。
+        """
+        self.workers = workers
+        self.config = (lang, use_gpu, use_angle_cls)
+        self.chunk_size = max(chunk_size, 1)
+        self.batch_size = batch_size
+        self.worker = worker
+        self.initializer = initializer
+        self.fallback = fallback or self._recognize_in_process
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._ready = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # 使用 spawn，避免在已加载 paddle 的进程中 fork
+                context = multiprocessing.get_context("spawn")
+                self._ready = context.Barrier(self.workers)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=context,
+                    initializer=_start_worker,
+                    initargs=(self._ready, self.initializer, self.config),
+                )
+                logger.info(f"Started OCR process pool with {self.workers} workers")
+            return self._executor
+
+    def _discard(self, pool: ProcessPoolExecutor):
+        """丢弃已损坏的进程池（如工作进程异常退出），下次调用时重新启动"""
+        with self._lock:
+            if self._executor is pool:
+                self._executor = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _recognize_in_process(self, blobs: List[bytes], max_side: Optional[int] = None):
+        return _recognize_blobs(blobs, self.batch_size, max_side, self.config)
+
+    def warmup(self, timeout: float = DEFAULT_WARMUP_TIMEOUT) -> List[str]:
+        """
+        启动全部工作进程并等待每个进程都完成模型加载。
+
+        Returns:
+            List[str]: 已就绪的工作进程名称。
+        """
+        pool = self._pool()
+        futures = [pool.submit(_ping, timeout) for _ in range(self.workers)]
+        try:
+            names = sorted({future.result() for future in futures})
+        except Exception:
+            # 屏障超时后处于损坏状态，复位后下次 warmup 可重新等待
+            self._ready.reset()
+            raise
+        logger.info(f"OCR workers warmed up: {names}")
+        return names
+
+    def recognize(self, blobs: List[bytes], max_side: Optional[int] = None, deadline=None) -> List[Optional[OCRResult]]:
+        """
+        识别一组图片字节，返回按输入顺序排列的结果；识别失败的位置为 None。
+        max_side 为解码后图片长边的上限；deadline 到期后取消尚未开始的分块，未返回的位置同样为 None。
+        分块在工作进程中失败（包括工作进程异常退出）时，在截止时间内改用 fallback 在本进程中识别该分块。
+        """
+        pool = self._pool()
+        futures = [
+            (start, pool.submit(self.worker, blobs[start:start + self.chunk_size], self.batch_size, max_side))
+            for start in range(0, len(blobs), self.chunk_size)
+        ]
+        results: List[Optional[OCRResult]] = [None] * len(blobs)
+        for index, (start, future) in enumerate(futures):
+            chunk_blobs = blobs[start:start + self.chunk_size]
+            try:
+                chunk = future.result(timeout=deadline.remaining() if deadline is not None else None)
+            except FutureTimeout:
+                for _, pending in futures[index:]:
+                    pending.cancel()
+                logger.warning(f"Deadline reached, cancelled OCR for images {start}-{len(blobs) - 1}")
+                break
+            except Exception as e:
+                logger.error(f"OCR worker failed on images {start}-{start + len(chunk_blobs) - 1}: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    self._discard(pool)
+                if expired(deadline):
+                    continue
+                try:
+                    chunk = self.fallback(chunk_blobs, max_side)
+                except Exception as e:
+                    logger.error(f"In-process OCR failed on images {start}-{start + len(chunk_blobs) - 1}: {e}")
+                    continue
+            for offset, data in enumerate(chunk):
+                results[start + offset] = None if data is None else OCRResult.from_dict(data)
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
@@ -0,0 +1,40 @@
+# optimizer_cache.py
+# 以合并文本哈希为键的优化结果缓存，重复上传的演示文稿无需再次运行 spaCy 和生成模型
+import hashlib
+import logging
+from typing import Optional
+
+from modules.cache import DEFAULT_MAX_BYTES, PersistentCache
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class OptimizedTextCache:
+    """
+    optimize_text_with_ai 输出的持久化缓存。
+
+    键由合并文本的 SHA-256（或 DeckRecord 的内容摘要）、生成模型、推理后端、分句管线、优化档位和随机种子组成，
+    值为优化后的文本及各档处理的幻灯片；未指定种子时输出带有随机措辞，命中的是该文本第一次优化的结果。
+    """
+
+    def __init__(self, path: str, model_id: str, backend: str, spacy_mode: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.store = PersistentCache(path, max_bytes)
+        # 不同的 SPACY_MODE 分句结果不同，生成的讲解也不同
+        self.config = f"model={model_id};backend={backend};spacy={spacy_mode}"
+        logger.info(f"Optimized text cache at {self.store.path} ({self.config})")
+
+    def key(self, source, seed: Optional[int] = None, tier: str = "model") -> str:
+        # source 为合并文本，或带 digest() 的 DeckRecord
+        digest = source.digest() if hasattr(source, "digest") else hashlib.sha256(source.encode("utf-8")).hexdigest()
+        return f"opt:{digest}:{self.config};tier={tier};seed={'none' if seed is None else seed}"
+
+    def get(self, source, seed: Optional[int] = None, tier: str = "model") -> Optional[dict]:
+        """命中时返回 {"text": 优化后的文本, "tiers": 各档处理的幻灯片}"""
+        return self.store.get_json(self.key(source, seed, tier))
+
+    def put(self, source, result: dict, seed: Optional[int] = None, tier: str = "model"):
+        self.store.set_json(self.key(source, seed, tier), result)
+
+    def stats(self) -> dict:
+        return self.store.stats()
@@ -0,0 +1,137 @@
+# pipeline.py
+# main.py 和 app.py 共用的提取流程：解析一次演示文稿，产出 DeckRecord 供后续阶段直接使用
+import logging
+import os
+
+from modules.deck import load_deck, media_references
+from modules.image_extraction_p import extract_images_from_ppt_legacy, extract_images_from_ppt_paddleocr
+from modules.ocr_engine import OCRJobResult
+from modules.ppt_text_extraction import extract_metadata, extract_metadata_from_ppt_legacy, extract_text_from_ppt_legacy
+from modules.records import DeckRecord, ocr_hits, slides_from_deck, slides_from_strings
+from modules.deadline import expired
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+def _reuse_slide_ocr(record, deck, slide_cache):
+    """
+    为幻灯片记录填入内容指纹，指纹命中单页缓存的幻灯片直接填入图片文本。
+
+    Returns:
+        set: 仍需 OCR 的幻灯片序号（含图片且未命中缓存）。
+    """
+    fresh = set()
+    with_pictures = 0
+    for slide_record, slide, fingerprint in zip(record.slides, deck.slides, deck.fingerprints):
+        slide_record.fingerprint = fingerprint
+        if not slide.pictures:
+            continue
+        with_pictures += 1
+        hits = slide_cache.get_ocr(fingerprint)
+        if hits is None:
+            fresh.add(slide.number)
+        else:
+            slide_record.ocr = hits
+    logger.info(f"Slide cache: reused image text for {with_pictures - len(fresh)} of {with_pictures} slides with images")
+    return fresh
+
+
+def _store_slide_ocr(record, deck, fresh, ocr_results, slide_cache):
+    """把本次识别完整（全部图片都有结果）的幻灯片写入单页缓存"""
+    for slide_record, slide in zip(record.slides, deck.slides):
+        if slide.number not in fresh:
+            continue
+        if all(ocr_results.get(slide.number, picture.index) is not None for picture in slide.pictures):
+            slide_cache.put_ocr(slide_record.fingerprint, slide_record.ocr)
+
+
+def extract_deck_record(file_path, output_dir, use_gpu=False, ocr_cache=None, export_artifacts=False,
+                        batch_size=None, ocr_pool=None, prefilter=None, triage=None, progress=None,
+                        on_text=None, deadline=None, slide_cache=None) -> DeckRecord:
+    """
+    提取演示文稿的元数据、幻灯片文本和图片文本，返回 DeckRecord。
+
+    .pptx 只解析一次，各阶段共享同一份 ParsedDeck，结果直接写入记录，不经过字符串；
+    旧版格式（.ppt 等）的文本由 win32com 提取器输出字符串，在这里解析一次后转为记录。
+
+    Args:
+        file_path (str): PPT 文件路径。
+        output_dir (str): 图片和识别文本的导出目录。
+        use_gpu (bool): 是否使用 GPU 运行 OCR。
+        ocr_cache (OCRResultCache, optional): OCR 结果缓存。
+        export_artifacts (bool): 是否导出图片和识别文本文件。
+        batch_size (int, optional): 跨图片批量 OCR 的批大小。
+        ocr_pool (OCRProcessPool, optional): 多进程 OCR 后端。
+        prefilter (TextPrefilter, optional): OCR 前的文本预判。
+        triage (ImageTriage, optional): OCR 前的图片分诊。
+        progress (callable, optional): progress(**fields)，上报 slides_total、images_done、images_total 等进度字段。
+        on_text (callable, optional): on_text(record)，元数据和正文提取完成、OCR 开始前调用，
+            供流式接口先行返回正文。
+        deadline (Deadline, optional): 截止时间；解析出幻灯片数和图片数后按其放宽，到期后停止处理剩余幻灯片和图片，
+            已完成的部分照常返回并把 record.partial 置为 True。
+        slide_cache (SlideCache, optional): 单页缓存（仅 PPTX）；内容指纹未变的幻灯片直接复用图片文本，
+            只有改动过的幻灯片交给 OCR，识别完整的幻灯片写回缓存。
+
+    Returns:
+        DeckRecord: 提取结果。
+    """
+    ext = os.path.splitext(file_path.lower())[1]
+    record = DeckRecord()
+
+    def report_images(done, total):
+        if progress is not None:
+            progress(images_done=done, images_total=total)
+
+    def set_metadata(metadata):
+        if "Error" in metadata:
+            logger.error(f"Metadata extraction failed: {metadata['Error']}")
+            record.metadata_error = str(metadata["Error"])
+        else:
+            record.metadata = {key: str(value) for key, value in metadata.items()}
+        if on_text is not None:
+            on_text(record)
+
+    ocr_results = OCRJobResult()
+    if ext == '.pptx':
+        # PPTX 只解析一次，元数据、文本和图片阶段共享同一份 deck
+        deck = load_deck(file_path)
+        # 同一媒体部件只识别一次，截止时间和进度按部件数计算
+        images_total = len(media_references(deck.slides))
+        if deadline is not None:
+            deadline.scale(len(deck.slides), images_total)
+        record.slides = slides_from_deck(deck, deadline)
+        set_metadata(extract_metadata(file_path, deck=deck))
+        fresh = None
+        if slide_cache is not None:
+            fresh = _reuse_slide_ocr(record, deck, slide_cache)
+            images_total = len(media_references(slide for slide in deck.slides if slide.number in fresh))
+        if progress is not None:
+            progress(slides_total=len(record.slides), images_total=images_total)
+        extract_images_from_ppt_paddleocr(
+            file_path, output_dir, use_gpu=use_gpu, deck=deck, ocr_results=ocr_results, cache=ocr_cache,
+            export_artifacts=export_artifacts, batch_size=batch_size, ocr_pool=ocr_pool,
+            prefilter=prefilter, triage=triage, progress=report_images, deadline=deadline, slides=fresh
+        )
+        # 截止时间导致部分幻灯片或图片未处理；OCR 出错、去重或分诊跳过造成的结果缺失不算作不完整
+        record.partial = len(record.slides) < len(deck.slides) or expired(deadline)
+    else:
+        metadata = extract_metadata_from_ppt_legacy(file_path)
+        record.slides = slides_from_strings(extract_text_from_ppt_legacy(file_path) or [])
+        if deadline is not None:
+            # 旧版格式无法预知图片数，只按幻灯片数放宽
+            deadline.scale(len(record.slides))
+        set_metadata(metadata)
+        if progress is not None:
+            progress(slides_total=len(record.slides))
+        extract_images_from_ppt_legacy(file_path, output_dir, use_gpu=use_gpu, ocr_results=ocr_results, cache=ocr_cache, progress=report_images, deadline=deadline)
+        record.partial = expired(deadline)
+
+    # OCR 结果直接按 (幻灯片, 图片) 归入对应的幻灯片记录
+    for slide_number, image_index, text in ocr_hits(ocr_results):
+        record.add_ocr(slide_number, image_index, text)
+    if ext == '.pptx' and slide_cache is not None:
+        _store_slide_ocr(record, deck, fresh, ocr_results, slide_cache)
+
+    logger.info(f"Extracted {len(record.content_slides)} slides with content and {record.ocr_count} image texts from {file_path}")
+    return record
@@ -1,6 +1,9 @@
 # ppt_text_extraction.py
 from pptx import Presentation 
 from modules.config import OUTPUT_DIR_2
+from modules.deck import load_deck
+from modules.xml_deck import load_xml_deck
+from modules.deadline import expired
 import os
 import logging
 import win32com.client
@@ -9,32 +12,36 @@ import pythoncom
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-def extract_text_from_ppt(file_path):
+def extract_text_from_ppt(file_path, deck=None, deadline=None, engine="pptx"):
     os.makedirs(OUTPUT_DIR_2, exist_ok=True)
     ext = os.path.splitext(file_path.lower())[1]
-    if ext != '.pptx':
+    if deck is None and ext != '.pptx':
         return extract_text_from_ppt_legacy(file_path)
     
     text_output = []
-    presentation = Presentation(file_path) 
+    if deck is None:
+        # engine="xml" 时不经过 python-pptx，直接从 zip 中流式解析幻灯片 XML
+        deck = load_xml_deck(file_path) if engine == "xml" else load_deck(file_path)
     logger.info(f"Processing PPTX file: {file_path}")
     
-    for slide_number, slide in enumerate(presentation.slides, start=1):
+    for slide in deck.slides:
+        # 截止时间已到时只返回已处理的幻灯片
+        if expired(deadline):
+            logger.warning(f"Deadline reached, stopped text extraction at slide {slide.number}")
+            break
         slide_text = []
-        for shape in slide.shapes:
-            if shape.has_text_frame:
-                for paragraph in shape.text_frame.paragraphs:
-                    for run in paragraph.runs:
-                        slide_text.append(run.text)
+        for block in slide.blocks:
+            if block.kind == "text":
+                for paragraph in block.paragraphs:
+                    slide_text.extend(paragraph.runs)
         if slide_text:
-            text_output.append(f"\n\n@@@Slide_{slide_number}@@@\n" + "\n".join(slide_text))
+            text_output.append(f"\n\n@@@Slide_{slide.number}@@@\n" + "\n".join(slide_text))
     logger.info(f"Completed processing {file_path}. Extracted text from {len(text_output)} slides.")
     return text_output
 
-def extract_metadata(file_path):
+def extract_metadata(file_path, deck=None):
     try:
-        presentation = Presentation(file_path)
-        props = presentation.core_properties
+        props = deck.core_properties if deck is not None else Presentation(file_path).core_properties
         logger.info(f"Extracting metadata from PPTX: {file_path}")
         metadata = {
             "Title": props.title or "N/A",
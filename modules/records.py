@@ -0,0 +1,203 @@
+# records.py
+# 各处理阶段之间传递的紧凑中间表示：按幻灯片保存文本、表格、注释和 OCR 结果，只在输出时生成字符串
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+
+from modules.deadline import expired
+
+# 常见水印
+WATERMARK = re.compile(r'stablediffusionweb\.com')
+
+_SLIDE_MARKER = re.compile(r'@@@Slide_(\d+)@@@')
+
+
+def clean_line(line: str) -> str:
+    """去除水印和首尾空白"""
+    return WATERMARK.sub('', line).strip()
+
+
+class OCRHit:
+    """一张图片的 OCR 识别文本，image 为该幻灯片内从 1 开始的图片序号。"""
+    __slots__ = ("image", "text")
+
+    def __init__(self, image: int, text: str):
+        self.image = image
+        self.text = text
+
+
+class SlideRecord:
+    """
+    一张幻灯片的提取结果。
+
+    lines 为正文文本行（已去除水印和空行），tables 为表格各行单元格，notes 为演讲者注释，
+    ocr 为按图片序号排列的 OCR 结果；fingerprint 为 PPTX 幻灯片的内容指纹，启用单页缓存时才计算。
+    """
+    __slots__ = ("number", "lines", "tables", "notes", "ocr", "fingerprint")
+
+    def __init__(self, number: int, lines: Optional[List[str]] = None):
+        self.number = number
+        self.lines: List[str] = lines if lines is not None else []
+        self.tables: List[List[List[str]]] = []
+        self.notes: Optional[str] = None
+        self.ocr: List[OCRHit] = []
+        self.fingerprint: Optional[str] = None
+
+    @property
+    def has_content(self) -> bool:
+        return bool(self.lines or self.ocr)
+
+    def narration_lines(self) -> List[str]:
+        """供文本优化使用的行：正文在前，图片文本按 "Slide N, Image M Text: 文本" 的形式附在后面"""
+        return self.lines + [f"Slide {self.number}, Image {hit.image} Text: {hit.text}" for hit in self.ocr]
+
+    def render(self) -> str:
+        parts = [f"@@@Slide_{self.number}@@@"] + self.lines
+        for hit in self.ocr:
+            parts.append(f"Slide {self.number}, Image {hit.image} Text:\n{hit.text}")
+        return "\n".join(parts)
+
+    def to_dict(self) -> dict:
+        return {
+            "slide": self.number,
+            "lines": self.lines,
+            "tables": self.tables,
+            "notes": self.notes,
+            "ocr": [{"image": hit.image, "text": hit.text} for hit in self.ocr],
+        }
+
+
+class DeckRecord:
+    """
+    一份演示文稿的提取结果：元数据和按序号排列的幻灯片。
+
+    partial 为 True 表示因截止时间未能提取全部幻灯片或图片文本。
+    """
+    __slots__ = ("metadata", "slides", "metadata_error", "partial")
+
+    def __init__(self, metadata: Optional[Dict[str, str]] = None, slides: Optional[List[SlideRecord]] = None,
+                 metadata_error: Optional[str] = None):
+        self.metadata: Dict[str, str] = metadata or {}
+        self.slides: List[SlideRecord] = slides or []
+        self.metadata_error = metadata_error
+        self.partial = False
+
+    def slide(self, number: int) -> SlideRecord:
+        """按序号取幻灯片记录，不存在时按顺序插入一条空记录"""
+        # 提取器按顺序产出幻灯片，绝大多数情况命中末尾
+        if not self.slides or self.slides[-1].number < number:
+            record = SlideRecord(number)
+            self.slides.append(record)
+            return record
+        if self.slides[-1].number == number:
+            return self.slides[-1]
+        for index, slide in enumerate(self.slides):
+            if slide.number == number:
+                return slide
+            if slide.number > number:
+                record = SlideRecord(number)
+                self.slides.insert(index, record)
+                return record
+        record = SlideRecord(number)
+        self.slides.append(record)
+        return record
+
+    def add_ocr(self, slide_number: int, image_index: int, text: str):
+        text = clean_line(text)
+        if text:
+            self.slide(slide_number).ocr.append(OCRHit(image_index, text))
+
+    @property
+    def content_slides(self) -> List[SlideRecord]:
+        return [slide for slide in self.slides if slide.has_content]
+
+    @property
+    def ocr_count(self) -> int:
+        return sum(len(slide.ocr) for slide in self.slides)
+
+    def metadata_lines(self) -> List[str]:
+        if self.metadata_error:
+            return ["Metadata extraction failed"]
+        return [f"{key}: {value}" for key, value in self.metadata.items()]
+
+    def render(self) -> str:
+        """生成与原先 "@@@Slide_N@@@" 合并文本相同结构的字符串，仅在输出或回退时调用"""
+        parts = self.metadata_lines() + [slide.render() for slide in self.content_slides]
+        text = "\n".join(parts)
+        return text if text.strip() else "No content extracted"
+
+    def digest(self) -> str:
+        """内容摘要，用作优化结果缓存的键"""
+        h = hashlib.sha256()
+        for line in self.metadata_lines():
+            h.update(line.encode("utf-8"))
+            h.update(b"\n")
+        for slide in self.content_slides:
+            h.update(f"\x00{slide.number}\x00".encode("utf-8"))
+            for line in slide.narration_lines():
+                h.update(line.encode("utf-8"))
+                h.update(b"\n")
+        return h.hexdigest()
+
+    def to_dict(self) -> dict:
+        return {
+            "metadata": self.metadata,
+            "slides": [slide.to_dict() for slide in self.slides],
+            "partial": self.partial,
+        }
+
+
+def slides_from_deck(deck, deadline=None) -> List[SlideRecord]:
+    """
+    由已解析的 ParsedDeck 直接生成幻灯片记录。
+
+    正文行与 ppt_text_extraction.extract_text_from_ppt 一致：每个文本框 run 一行。
+    deadline 到期后不再处理剩余幻灯片。
+    """
+    records = []
+    for slide in deck.slides:
+        if expired(deadline):
+            break
+        record = SlideRecord(slide.number)
+        for block in slide.blocks:
+            if block.kind == "text":
+                for paragraph in block.paragraphs:
+                    for run in paragraph.runs:
+                        line = clean_line(run)
+                        if line:
+                            record.lines.append(line)
+            elif block.kind == "table":
+                record.tables.append(block.rows)
+        if slide.notes and slide.notes.strip():
+            record.notes = slide.notes.strip()
+        records.append(record)
+    return records
+
+
+def slides_from_strings(text_output: List[str]) -> List[SlideRecord]:
+    """
+    把旧版格式（win32com）提取器输出的 "@@@Slide_N@@@" 字符串在边界处解析一次，转为幻灯片记录。
+
+    Args:
+        text_output (List[str]): 每张幻灯片一段、以 "@@@Slide_N@@@" 开头的文本。
+
+    Returns:
+        List[SlideRecord]: 按幻灯片序号排列的记录。
+    """
+    deck = DeckRecord()
+    for chunk in text_output:
+        record = None
+        for line in chunk.split("\n"):
+            match = _SLIDE_MARKER.match(line.strip())
+            if match:
+                record = deck.slide(int(match.group(1)))
+                continue
+            line = clean_line(line)
+            if line and record is not None:
+                record.lines.append(line)
+    return deck.slides
+
+
+def ocr_hits(ocr_results) -> List[Tuple[int, int, str]]:
+    """把 OCRJobResult 展开为 (幻灯片, 图片, 文本)，只保留有文本的结果"""
+    return [(slide, image, result.text) for (slide, image), result in ocr_results.items() if result.has_text and result.text]
@@ -0,0 +1,147 @@
+# result_cache.py
+# 以上传文件内容哈希为键的处理结果缓存：重复上传的演示文稿直接返回结果，并发的相同上传共用一次处理
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+
+from modules.cache import DEFAULT_MAX_BYTES, PersistentCache
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 上传文件分块写盘的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    """上传文件超过大小上限"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+def save_upload(stream, path: str, chunk_size: int = UPLOAD_CHUNK_SIZE, max_bytes: Optional[int] = None) -> str:
+    """
+    把上传文件流分块写入磁盘，同时计算 SHA-256，无需再读一遍文件。
+
+    Args:
+        stream: 可 read(n) 的文件流，如 FileStorage.stream。
+        path (str): 保存路径。
+        chunk_size (int): 每次读取的字节数。
+        max_bytes (int, optional): 大小上限；写入过程中一旦超出立即停止并删除已写入的部分。
+
+    Returns:
+        str: 文件内容的 SHA-256 十六进制摘要。
+
+    Raises:
+        UploadTooLarge: 文件超过 max_bytes。
+    """
+    h = hashlib.sha256()
+    written = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            written += len(chunk)
+            if max_bytes is not None and written > max_bytes:
+                break
+            h.update(chunk)
+            f.write(chunk)
+    if max_bytes is not None and written > max_bytes:
+        os.remove(path)
+        raise UploadTooLarge(max_bytes)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    整份演示文稿处理结果的持久化缓存。
+
+    键由上传文件的 SHA-256 和影响输出的处理配置组成，值为优化文本、各档处理的幻灯片和输出文件路径；
+    命中时若输出文件已被删除，则按缓存的文本重新写出。
+    """
+
+    def __init__(self, path: str, config: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.store = PersistentCache(path, max_bytes)
+        self.config = config
+        logger.info(f"Result cache at {self.store.path} ({self.config})")
+
+    def key(self, digest: str, tier: str = "model") -> str:
+        return f"result:{digest}:{self.config};tier={tier}"
+
+    def get(self, key: str) -> Optional[dict]:
+        """命中时返回 {"optimized_text", "tiers", "output_file"}"""
+        result = self.store.get_json(key)
+        if result is None:
+            return None
+        output_file = result.get("output_file")
+        if output_file and not os.path.exists(output_file):
+            try:
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                with open(output_file, "w", encoding="utf-8") as f:
+                    f.write(result["optimized_text"])
+            except OSError as e:
+                logger.warning(f"Failed to restore cached output {output_file}: {e}")
+        return result
+
+    def put(self, key: str, result: dict):
+        self.store.set_json(key, {
+            "optimized_text": result["optimized_text"],
+            "tiers": result["tiers"],
+            "output_file": result.get("output_file"),
+        })
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+class SingleFlight:
+    """
+    同一键的并发调用只执行一次：第一个调用者执行，其余调用者等待并共享结果或异常。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable) -> Tuple[object, bool]:
+        """
+        Args:
+            key (str): 去重键。
+            fn (callable): 无参函数，仅由第一个调用者执行。
+
+        Returns:
+            tuple: (结果, 是否共用了其他调用者的执行)。
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.shared += 1
+        if not leader:
+            logger.info(f"Waiting for in-flight job {key[:24]}")
+            return future.result(), True
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._inflight)
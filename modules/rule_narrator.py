@@ -0,0 +1,93 @@
+# rule_narrator.py
+# 基于规则的幻灯片讲解生成：不加载任何模型，每张幻灯片耗时在毫秒级，作为分级优化的快速档
+import random
+import re
+from typing import List
+
+# 多样化的引导语和连接词
+TITLE_OPENERS = ["首先是", "那么我们说说", "这里有个重点", "值得一提的是"]
+LIST_OPENERS = ["先来看看", "我们聊聊", "这里包括", "比如说"]
+LIST_CONNECTORS = ["然后是", "接着是", "还有呢", "另外一点"]
+FORMULA_OPENERS = ["这里有个公式", "看看这个计算", "简单解释一下"]
+IMAGE_OPENERS = ["这里有张图", "我们看个示例", "这有个图片说明"]
+LIST_END = "这些要点就先讲到这里。"
+
+_WATERMARK = re.compile(r'stablediffusionweb\.com|WHATEV-VEER\.')
+_LIST_PREFIX = ('▪', '-', '•')
+_FORMULA_SYMBOLS = ('=', '∑', 'σ')
+_LABELS = ("Title:", "Chart Title:", "Table:", "Notes:")
+
+
+def _strip_label(line: str) -> str:
+    for label in _LABELS:
+        if line.startswith(label):
+            return line[len(label):].strip()
+    return line
+
+
+def narrate_slide(lines: List[str], rng=random) -> str:
+    """
+    按规则把一张幻灯片的文本行改写为讲解段落。
+
+    Args:
+        lines (List[str]): 幻灯片的原始文本行（保留列表符号）。
+        rng: 选择措辞的随机数源。
+
+    Returns:
+        str: 讲解段落。
+    """
+    narrative = []
+    in_list = False
+    pending_image = False
+
+    for line in lines:
+        cleaned_line = _strip_label(_WATERMARK.sub('', line).strip())
+        if not cleaned_line:
+            continue
+
+        # 处理图片文本：识别结果在 "Image N Text:" 的下一行
+        if 'Image' in cleaned_line and cleaned_line.endswith('Text:'):
+            pending_image = True
+            continue
+        if 'Image' in cleaned_line and 'Text:' in cleaned_line:
+            content = cleaned_line.split('Text:')[-1].strip()
+            narrative.append(f"{rng.choice(IMAGE_OPENERS)}，上面写着：{content}。")
+            continue
+        if pending_image:
+            pending_image = False
+            narrative.append(f"{rng.choice(IMAGE_OPENERS)}，上面写着：{cleaned_line}。")
+            continue
+
+        # 检测公式
+        if any(symbol in cleaned_line for symbol in _FORMULA_SYMBOLS):
+            if in_list:
+                narrative.append(LIST_END)
+                in_list = False
+            formula_desc = "它描述了模型的计算过程" if "∑" in cleaned_line else "它让模型更有效"
+            narrative.append(f"{rng.choice(FORMULA_OPENERS)}：{cleaned_line}，{formula_desc}。")
+            continue
+
+        # 检测列表项
+        if cleaned_line.startswith(_LIST_PREFIX):
+            if not in_list:
+                narrative.append(f"{rng.choice(LIST_OPENERS)}：")
+                in_list = True
+                connector = ""
+            else:
+                connector = rng.choice(LIST_CONNECTORS)
+            content = cleaned_line[1:].strip()
+            narrative.append(f"{connector}{content}，挺关键的吧？")
+            continue
+
+        # 其余视为标题或正文
+        if in_list:
+            narrative.append(LIST_END)
+            in_list = False
+        narrative.append(f"{rng.choice(TITLE_OPENERS)}{cleaned_line}。")
+
+    if pending_image:
+        narrative.append(f"{rng.choice(IMAGE_OPENERS)}，具体内容可以参考幻灯片。")
+    if in_list:
+        narrative.append(LIST_END)
+
+    return " ".join(narrative)
@@ -0,0 +1,50 @@
+# slide_cache.py
+# 以幻灯片内容指纹为键的单页结果缓存：修改过的演示文稿再次上传时，未改动的幻灯片直接复用图片文本和讲解
+import logging
+from typing import List, Optional
+
+from modules.cache import DEFAULT_MAX_BYTES, PersistentCache
+from modules.records import OCRHit
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+
+class SlideCache:
+    """
+    单张幻灯片的处理结果缓存。
+
+    指纹由 deck.slide_fingerprint 计算，覆盖幻灯片 XML 及其引用的图片等部件；
+    键还包含影响输出的处理配置（OCR 分诊和预判、生成模型、分句模式等）。缓存两类结果：
+    - OCR：该幻灯片全部图片的识别文本，命中时不再把这些图片交给 OCR；
+    - 讲解：模型档生成的讲解文本（过渡语已替换），命中时不再分句和生成。
+    """
+
+    def __init__(self, path: str, config: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.store = PersistentCache(path, max_bytes)
+        self.config = config
+        logger.info(f"Slide cache at {self.store.path} ({self.config})")
+
+    def ocr_key(self, fingerprint: str) -> str:
+        return f"slide-ocr:{fingerprint}:{self.config}"
+
+    def narration_key(self, fingerprint: str, seed: Optional[int] = None, final_number: Optional[int] = None) -> str:
+        # 最后一张幻灯片的讲解包含幻灯片序号，且句式与其他幻灯片不同
+        final = "no" if final_number is None else final_number
+        return f"slide-narration:{fingerprint}:{self.config};seed={'none' if seed is None else seed};final={final}"
+
+    def get_ocr(self, fingerprint: str) -> Optional[List[OCRHit]]:
+        data = self.store.get_json(self.ocr_key(fingerprint))
+        return None if data is None else [OCRHit(hit["image"], hit["text"]) for hit in data]
+
+    def put_ocr(self, fingerprint: str, hits: List[OCRHit]):
+        self.store.set_json(self.ocr_key(fingerprint), [{"image": hit.image, "text": hit.text} for hit in hits])
+
+    def get_narration(self, fingerprint: str, seed: Optional[int] = None, final_number: Optional[int] = None) -> Optional[str]:
+        return self.store.get_json(self.narration_key(fingerprint, seed, final_number))
+
+    def put_narration(self, fingerprint: str, text: str, seed: Optional[int] = None, final_number: Optional[int] = None):
+        self.store.set_json(self.narration_key(fingerprint, seed, final_number), text)
+
+    def stats(self) -> dict:
+        return self.store.stats()
@@ -1,74 +1,78 @@
 from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
 import logging
 from datetime import datetime
+from modules.deck import load_deck
+from modules.xml_deck import load_xml_deck
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-def extract_text_from_ppt(file_path):
+def extract_text_from_ppt(file_path, deck=None, engine="pptx"):
     """
     从 PPT 文件中提取文本，保留层次结构并支持多种形状类型。
 
     Args:
         file_path (str): PPT 文件路径。
+        deck (ParsedDeck, optional): 已解析的演示文稿，提供时不再重复解析文件。
+        engine (str): 未提供 deck 时的解析引擎，"pptx" 使用 python-pptx，"xml" 直接从 zip 中流式解析 XML。
 
     Returns:
         list: 包含每张幻灯片文本的列表，格式为分隔符标记的字符串。
     """
     try:
         text_output = []
-        presentation = Presentation(file_path)
+        if deck is None:
+            deck = load_xml_deck(file_path) if engine == "xml" else load_deck(file_path)
         logger.info(f"Extracting text from PPT: {file_path}")
 
-        for slide_number, slide in enumerate(presentation.slides, start=1):
+        for slide in deck.slides:
             slide_text = []
-            logger.debug(f"Processing Slide {slide_number}")
+            logger.debug(f"Processing Slide {slide.number}")
 
             # 提取标题（如果有）
-            if slide.shapes.title:
-                slide_text.append(f"Title: {slide.shapes.title.text.strip()}")
+            if slide.title is not None:
+                slide_text.append(f"Title: {slide.title.strip()}")
 
             # 遍历所有形状
-            for shape in slide.shapes:
-                if shape.has_text_frame:
+            for block in slide.blocks:
+                if block.kind == "text":
                     # 处理文本框
-                    for paragraph in shape.text_frame.paragraphs:
-                        paragraph_text = "".join(run.text for run in paragraph.runs if run.text.strip())
+                    for paragraph in block.paragraphs:
+                        paragraph_text = "".join(run for run in paragraph.runs if run.strip())
                         if paragraph_text:
                             # 根据层级添加前缀（粗略判断）
-                            level = paragraph.level if hasattr(paragraph, 'level') else 0
+                            level = paragraph.level
                             prefix = "  " * level + ("▪ " if level > 0 else "")
                             slide_text.append(f"{prefix}{paragraph_text}")
                 
-                elif shape.shape_type == MSO_SHAPE_TYPE.TABLE:
+                elif block.kind == "table":
                     # 处理表格
                     table_text = []
-                    for row in shape.table.rows:
-                        row_text = [cell.text.strip() for cell in row.cells if cell.text.strip()]
+                    for row in block.rows:
+                        row_text = [cell.strip() for cell in row if cell.strip()]
                         if row_text:
                             table_text.append(" | ".join(row_text))
                     if table_text:
                         slide_text.append("Table:\n" + "\n".join(table_text))
                 
-                elif shape.has_chart:
+                elif block.kind == "chart":
                     # 处理图表（简单提取标题）
-                    if shape.chart.chart_title.has_text_frame:
-                        slide_text.append(f"Chart Title: {shape.chart.chart_title.text_frame.text.strip()}")
+                    if block.title is not None:
+                        slide_text.append(f"Chart Title: {block.title.strip()}")
 
             # 处理注释（如果有）
-            if slide.has_notes_slide and slide.notes_slide.notes_text_frame:
-                notes_text = slide.notes_slide.notes_text_frame.text.strip()
+            if slide.notes:
+                notes_text = slide.notes.strip()
                 if notes_text:
                     slide_text.append(f"Notes:\n{notes_text}")
 
             # 清理并格式化输出
             if slide_text:
                 cleaned_text = "\n".join(line for line in slide_text if line.strip())
-                text_output.append(f"@@@Slide_{slide_number}@@@\n{cleaned_text}")
+                text_output.append(f"@@@Slide_{slide.number}@@@\n{cleaned_text}")
             else:
-                text_output.append(f"@@@Slide_{slide_number}@@@\n[No text content]")
+                text_output.append(f"@@@Slide_{slide.number}@@@\n[No text content]")
 
         logger.info(f"Extracted text from {len(text_output)} slides.")
         return text_output
@@ -77,19 +81,19 @@ def extract_text_from_ppt(file_path):
         logger.error(f"Failed to extract text from {file_path}: {e}")
         return [f"Error: Unable to process {file_path}"]
 
-def extract_metadata(file_path):
+def extract_metadata(file_path, deck=None):
     """
     从 PPT 文件中提取元数据，包含更多核心属性。
 
     Args:
         file_path (str): PPT 文件路径。
+        deck (ParsedDeck, optional): 已解析的演示文稿，提供时不再重复解析文件。
 
     Returns:
         dict: 包含元数据的字典。
     """
     try:
-        presentation = Presentation(file_path)
-        props = presentation.core_properties
+        props = deck.core_properties if deck is not None else Presentation(file_path).core_properties
         logger.info(f"Extracting metadata from PPT: {file_path}")
 
         metadata = {
@@ -0,0 +1,279 @@
+# transition_backends.py
+# 过渡语生成模型的推理后端：原始 transformers pipeline、动态 int8 量化或导出的 ONNX 图
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from modules.deadline import expired
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+MODEL_ID = "uer/gpt2-chinese-cluecorpussmall"
+BACKENDS = ("pipeline", "quantized", "onnx")
+# ONNX 导出结果的默认保存位置，导出一次后直接加载
+DEFAULT_ONNX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ppt_text_extractor", "onnx")
+
+
+def _conv1d_to_linear(model):
+    """
+    GPT-2 的注意力和 MLP 层使用 transformers 的 Conv1D（权重形状为 in x out），
+    动态量化只作用于 nn.Linear，因此先把 Conv1D 等价替换为 nn.Linear。
+    """
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for name, module in list(model.named_modules()):
+        for child_name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                in_features, out_features = child.weight.shape
+                linear = torch.nn.Linear(in_features, out_features)
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, child_name, linear)
+    return model
+
+
+def _load_pipeline(model_id, max_length):
+    from transformers import pipeline
+    return pipeline("text-generation", model=model_id, max_length=max_length)
+
+
+def _load_quantized(model_id, max_length):
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForCausalLM.from_pretrained(model_id)
+    model.eval()
+    model = torch.quantization.quantize_dynamic(_conv1d_to_linear(model), {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("text-generation", model=model, tokenizer=tokenizer, max_length=max_length)
+
+
+def _load_onnx(model_id, max_length, onnx_dir=None):
+    from optimum.onnxruntime import ORTModelForCausalLM
+    from transformers import AutoTokenizer, pipeline
+
+    export_dir = os.path.join(onnx_dir or DEFAULT_ONNX_DIR, model_id.replace("/", "__"))
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    if os.path.isdir(export_dir) and any(name.endswith(".onnx") for name in os.listdir(export_dir)):
+        model = ORTModelForCausalLM.from_pretrained(export_dir)
+    else:
+        logger.info(f"Exporting {model_id} to ONNX at {export_dir}")
+        model = ORTModelForCausalLM.from_pretrained(model_id, export=True)
+        model.save_pretrained(export_dir)
+    return pipeline("text-generation", model=model, tokenizer=tokenizer, max_length=max_length)
+
+
+def load_generator(backend: str = "pipeline", model_id: str = MODEL_ID, max_length: int = 50, onnx_dir: str = None):
+    """
+    按后端名称加载文本生成器，返回值与 transformers.pipeline("text-generation") 的调用方式相同。
+
+    Args:
+        backend (str): "pipeline"（全精度，默认）、"quantized"（动态 int8 量化）或 "onnx"（ONNX Runtime）。
+        model_id (str): 模型名称。
+        max_length (int): 生成的最大长度。
+        onnx_dir (str, optional): ONNX 导出目录。
+
+    Returns:
+        可调用的文本生成 pipeline；指定后端加载失败时回退到全精度 pipeline。
+    """
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown transition backend '{backend}', using 'pipeline'")
+        backend = "pipeline"
+
+    start = time.perf_counter()
+    try:
+        if backend == "quantized":
+            generator = _load_quantized(model_id, max_length)
+        elif backend == "onnx":
+            generator = _load_onnx(model_id, max_length, onnx_dir)
+        else:
+            generator = _load_pipeline(model_id, max_length)
+    except Exception as e:
+        if backend == "pipeline":
+            raise
+        logger.error(f"Failed to load '{backend}' transition backend, falling back to 'pipeline': {e}")
+        backend = "pipeline"
+        generator = _load_pipeline(model_id, max_length)
+
+    logger.info(f"Loaded transition generator ({backend}) in {time.perf_counter() - start:.2f}s")
+    return generator
+
+
+# 生成失败时使用的过渡语
+FALLBACK_TRANSITIONS = ["顺着这个思路，", "再来看看，", "基于此，"]
+
+# 生成器的采样依赖 Python、NumPy 和 PyTorch 的全局随机数源，所有生成调用在此锁内串行，
+# 固定种子的生成在设定种子和生成之间不会被其他线程的采样打乱
+_GENERATION_LOCK = threading.Lock()
+
+
+def prompt_seed(seed: int, prompt: str) -> int:
+    """由请求种子和 prompt 派生的采样种子，与同批其他 prompt 无关"""
+    return int.from_bytes(hashlib.sha256(f"{seed}:{prompt}".encode("utf-8")).digest()[:4], "big")
+
+
+def _seed_sampling(seed: int):
+    """固定全局随机数源（与 transformers.set_seed 相同的范围：Python、NumPy、PyTorch）"""
+    import numpy as np
+
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.manual_seed(seed)
+
+
+def extract_transition(generated: str) -> str:
+    """从生成文本中截取过渡语：取最后一个中文逗号前的一段"""
+    parts = generated.split('，')
+    return parts[-2] + "，" if len(parts) > 1 else "接着是，"
+
+
+def _prepare_batching(generator):
+    """批量生成需要 pad token，且仅解码器模型应在左侧补齐"""
+    tokenizer = getattr(generator, "tokenizer", None)
+    if tokenizer is None:
+        return
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+
+
+def generate_transitions(generator, prompts: List[str], batch_size: int = 16,
+                         max_new_tokens: int = 10, rng=random, memo: Optional["TransitionMemo"] = None,
+                         deadline=None, seed: Optional[int] = None) -> List[str]:
+    """
+    按批生成一组过渡语，结果与 prompts 顺序一一对应。
+
+    相同的 prompt 只生成一次，memo 中已有的 prompt 不再生成；整批失败时逐条重试，
+    单条仍失败则使用 FALLBACK_TRANSITIONS 中的过渡语（回退结果不写入 memo）。
+    deadline 到期后不再生成剩余批次，这些 prompt 同样使用回退过渡语。
+
+    指定 seed 时逐条生成：每条 prompt 在生成锁内以 prompt_seed(seed, prompt) 重设采样种子，
+    结果只取决于种子和 prompt 本身，与批次组成、memo 命中情况和并发请求无关；
+    这样会放弃批量生成，只在需要可复现结果时使用。memo 按 (seed, prompt) 区分。
+
+    Args:
+        generator: transformers 文本生成 pipeline。
+        prompts (List[str]): 待生成的 prompt 列表。
+        batch_size (int): 每批的 prompt 数量。
+        max_new_tokens (int): 每条最多生成的 token 数。
+        rng: 选择回退过渡语的随机数源。
+        memo (TransitionMemo, optional): 过渡语记忆表。
+        deadline (Deadline, optional): 截止时间，在批次之间检查。
+        seed (int, optional): 采样种子。
+
+    Returns:
+        List[str]: 过渡语列表。
+    """
+    generated = {}
+    unique = []
+    for prompt in dict.fromkeys(prompts):
+        cached = memo.get(prompt, seed) if memo is not None else None
+        if cached is not None:
+            generated[prompt] = cached
+        else:
+            unique.append(prompt)
+    if not unique:
+        return [generated[prompt] for prompt in prompts]
+    batch_size = 1 if seed is not None else max(1, batch_size)
+    _prepare_batching(generator)
+
+    def generate(batch):
+        with _GENERATION_LOCK:
+            if seed is not None:
+                _seed_sampling(prompt_seed(seed, batch[0]))
+            if len(batch) == 1:
+                return [generator(batch[0], num_return_sequences=1, max_new_tokens=max_new_tokens)]
+            return generator(batch, num_return_sequences=1, max_new_tokens=max_new_tokens, batch_size=len(batch))
+
+    start = time.perf_counter()
+    for offset in range(0, len(unique), batch_size):
+        if expired(deadline):
+            logger.warning(f"Deadline reached, using fallback phrases for {len(unique) - offset} transitions")
+            for prompt in unique[offset:]:
+                generated[prompt] = rng.choice(FALLBACK_TRANSITIONS)
+            break
+        batch = unique[offset:offset + batch_size]
+        try:
+            outputs = generate(batch)
+            for prompt, output in zip(batch, outputs):
+                generated[prompt] = extract_transition(output[0]['generated_text'])
+                if memo is not None:
+                    memo.put(prompt, generated[prompt], seed)
+        except Exception as e:
+            if len(batch) > 1:
+                logger.warning(f"Batched transition generation failed, retrying {len(batch)} prompts one by one: {e}")
+            for prompt in batch:
+                try:
+                    generated[prompt] = extract_transition(generate([prompt])[0][0]['generated_text'])
+                    if memo is not None:
+                        memo.put(prompt, generated[prompt], seed)
+                except Exception:
+                    generated[prompt] = rng.choice(FALLBACK_TRANSITIONS)
+
+    logger.info(f"Generated {len(unique)} transitions in {time.perf_counter() - start:.2f}s (batch size {batch_size})")
+    return [generated[prompt] for prompt in prompts]
+
+
+class TransitionMemo:
+    """
+    进程内的过渡语记忆表，以 (种子, prompt) 为键；未指定种子的采样结果与各种子的结果互不复用。
+
+    最多保留 max_entries 条，超出后淘汰最久未使用的条目；条目写入超过 ttl 秒后失效（ttl <= 0 表示不过期）。
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: float = 3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str, seed: Optional[int] = None) -> Optional[str]:
+        key = (seed, prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and self.clock() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, prompt: str, transition: str, seed: Optional[int] = None):
+        key = (seed, prompt)
+        with self._lock:
+            self._entries[key] = (transition, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,229 @@
+# xml_deck.py
+# 不经过 python-pptx 对象模型的 PPTX 文本引擎：直接从 zip 包中增量解析幻灯片、注释和图表 XML，
+# 产出与 deck.ParsedDeck 相同结构的 SlideContent，供文本提取使用
+import logging
+import posixpath
+import zipfile
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from modules.deck import ChartBlock, Paragraph, SlideContent, TableBlock, TextBlock
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_C = "{http://schemas.openxmlformats.org/drawingml/2006/chart}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_RT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+RT_SLIDE = _RT + "slide"
+RT_NOTES_SLIDE = _RT + "notesSlide"
+
+_TABLE_URI = "http://schemas.openxmlformats.org/drawingml/2006/table"
+_CHART_URI = "http://schemas.openxmlformats.org/drawingml/2006/chart"
+
+# spTree 和 grpSp 中可作为形状出现的元素
+_SHAPE_TAGS = (_P + "sp", _P + "grpSp", _P + "graphicFrame", _P + "cxnSp", _P + "pic", _P + "contentPart")
+
+
+def _rels_name(part_name: str) -> str:
+    directory, name = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def _read_rels(zf: zipfile.ZipFile, part_name: str) -> Dict[str, Tuple[str, str]]:
+    """读取部件的关系，返回 {rId: (关系类型, 目标部件名)}，外部链接不包含在内"""
+    try:
+        data = zf.read(_rels_name(part_name))
+    except KeyError:
+        return {}
+    rels = {}
+    base = posixpath.dirname(part_name)
+    for rel in etree.fromstring(data).iter(_PKG_REL + "Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target")
+        target = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+        rels[rel.get("Id")] = (rel.get("Type"), target)
+    return rels
+
+
+def _paragraph_text(p) -> str:
+    """与 python-pptx 的 _Paragraph.text 一致：run 和域文本依次拼接，软回车记为 "\\v" """
+    parts = []
+    for child in p:
+        if child.tag == _A + "r" or child.tag == _A + "fld":
+            parts.append(child.findtext(_A + "t") or "")
+        elif child.tag == _A + "br":
+            parts.append("\v")
+    return "".join(parts)
+
+
+def _text_frame_text(txBody) -> str:
+    """与 TextFrame.text 一致：段落之间以换行分隔"""
+    if txBody is None:
+        return ""
+    return "\n".join(_paragraph_text(p) for p in txBody.iterfind(_A + "p"))
+
+
+def _text_block(txBody) -> TextBlock:
+    if txBody is None:
+        # python-pptx 为没有文本体的形状补一个空段落
+        return TextBlock([Paragraph(0, [])])
+    paragraphs = []
+    for p in txBody.iterfind(_A + "p"):
+        pPr = p.find(_A + "pPr")
+        level = int(pPr.get("lvl", 0)) if pPr is not None else 0
+        paragraphs.append(Paragraph(level, [r.findtext(_A + "t") or "" for r in p.iterfind(_A + "r")]))
+    return TextBlock(paragraphs)
+
+
+def _placeholder(shape):
+    """形状的占位符元素 p:ph，非占位符返回 None"""
+    for nv in shape:
+        if nv.tag.startswith(_P + "nv"):
+            return nv.find(_P + "nvPr/" + _P + "ph")
+    return None
+
+
+def _chart_title(zf: zipfile.ZipFile, part_name: Optional[str]) -> Optional[str]:
+    """图表标题文本；没有标题或标题不是富文本时返回 None"""
+    if part_name is None:
+        return None
+    try:
+        root = etree.fromstring(zf.read(part_name))
+    except KeyError:
+        return None
+    rich = root.find(f"{_C}chart/{_C}title/{_C}tx/{_C}rich")
+    return None if rich is None else _text_frame_text(rich)
+
+
+def _iter_top_shapes(source) -> Iterator:
+    """
+    增量解析幻灯片 XML，按文档顺序逐个产出 spTree 下的顶层形状元素。
+
+    组合形状作为一个整体产出；产出后即清空该元素及之前的兄弟元素，内存中只保留当前形状。
+    """
+    for _, elem in etree.iterparse(source, events=("end",), tag=_SHAPE_TAGS, remove_blank_text=True):
+        parent = elem.getparent()
+        if parent is None or parent.tag != _P + "spTree":
+            continue
+        yield elem
+        elem.clear(keep_tail=True)
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def _read_shape(zf, shape, rels, blocks: list):
+    """把一个形状转为 TextBlock / TableBlock / ChartBlock，组合形状按顺序递归展开"""
+    tag = shape.tag
+    if tag == _P + "sp":
+        blocks.append(_text_block(shape.find(_P + "txBody")))
+    elif tag == _P + "grpSp":
+        for child in shape:
+            if child.tag in _SHAPE_TAGS:
+                _read_shape(zf, child, rels, blocks)
+    elif tag == _P + "graphicFrame":
+        graphic_data = shape.find(f"{_A}graphic/{_A}graphicData")
+        if graphic_data is None:
+            return
+        uri = graphic_data.get("uri")
+        if uri == _TABLE_URI:
+            rows = [
+                [_text_frame_text(tc.find(_A + "txBody")) for tc in tr.iterfind(_A + "tc")]
+                for tr in graphic_data.iterfind(f"{_A}tbl/{_A}tr")
+            ]
+            blocks.append(TableBlock(rows))
+        elif uri == _CHART_URI:
+            chart = graphic_data.find(_C + "chart")
+            target = rels.get(chart.get(_R + "id")) if chart is not None else None
+            blocks.append(ChartBlock(_chart_title(zf, target[1] if target else None)))
+
+
+def _read_notes(zf: zipfile.ZipFile, part_name: str) -> Optional[str]:
+    """注释页中正文占位符（type="body"）的文本；没有该占位符时返回 None"""
+    with zf.open(part_name) as f:
+        for shape in _iter_top_shapes(f):
+            ph = _placeholder(shape)
+            if ph is not None and ph.get("type") == "body":
+                return _text_frame_text(shape.find(_P + "txBody")) if shape.tag == _P + "sp" else ""
+    return None
+
+
+def _read_slide(zf: zipfile.ZipFile, number: int, part_name: str) -> SlideContent:
+    content = SlideContent(number)
+    rels = _read_rels(zf, part_name)
+    title_found = False
+    with zf.open(part_name) as f:
+        for shape in _iter_top_shapes(f):
+            # 与 slide.shapes.title 一致：第一个 idx 为 0 的顶层占位符
+            if not title_found:
+                ph = _placeholder(shape)
+                if ph is not None and ph.get("idx", "0") == "0":
+                    title_found = True
+                    if shape.tag == _P + "sp":
+                        content.title = _text_frame_text(shape.find(_P + "txBody"))
+            _read_shape(zf, shape, rels, content.blocks)
+
+    notes = [target for rel_type, target in rels.values() if rel_type == RT_NOTES_SLIDE]
+    if notes:
+        content.notes = _read_notes(zf, notes[0])
+    return content
+
+
+def slide_parts(zf: zipfile.ZipFile) -> List[str]:
+    """按 presentation.xml 中 sldIdLst 的顺序返回幻灯片部件名"""
+    presentation = "ppt/presentation.xml"
+    rels = _read_rels(zf, presentation)
+    parts = []
+    with zf.open(presentation) as f:
+        for _, elem in etree.iterparse(f, events=("end",), tag=_P + "sldId"):
+            rel = rels.get(elem.get(_R + "id"))
+            if rel is not None and rel[0] == RT_SLIDE:
+                parts.append(rel[1])
+            elem.clear()
+    return parts
+
+
+def iter_slides(file_path: str) -> Iterator[SlideContent]:
+    """
+    逐张解析幻灯片，按顺序产出 SlideContent（不含图片引用）。
+
+    正文、表格、图表标题、标题和注释的取值与 python-pptx 的 ParsedDeck 一致，另外会展开组合形状中的内容。
+    """
+    with zipfile.ZipFile(file_path) as zf:
+        for number, part_name in enumerate(slide_parts(zf), start=1):
+            yield _read_slide(zf, number, part_name)
+
+
+class XMLDeck:
+    """
+    文本视图的演示文稿，slides 接口与 ParsedDeck 相同，可直接传给 extract_text_from_ppt。
+
+    不预先解析整个包：每次遍历 slides 时从 zip 中逐张增量解析，同一时间只保留一张幻灯片；
+    不提供图片引用和核心属性，图片 OCR 和元数据仍使用 ParsedDeck。
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    @property
+    def slides(self) -> Iterator[SlideContent]:
+        return iter_slides(self.file_path)
+
+
+def load_xml_deck(file_path: str) -> XMLDeck:
+    """
+    返回 PPTX 文件的流式文本视图。
+
+    Args:
+        file_path (str): PPTX 文件路径。
+
+    Returns:
+        XMLDeck: slides 按需逐张解析。
+    """
+    return XMLDeck(file_path)
@@ -0,0 +1,240 @@
+# serve.py
+# 生产环境的预派生（prefork）多进程服务：主进程先加载 spaCy、生成模型和 OCR 模型，
+# 再 fork 出多个工作进程，模型内存按写时复制在进程间共享，每个工作进程不再单独加载模型。
+#
+# 用法：
+#   python serve.py [--workers 4] [--max-requests 500] [--host 0.0.0.0] [--port 5000]
+#
+# 信号（发给主进程）：
+#   SIGHUP            平滑替换工作进程：先启动新一批，旧进程处理完当前请求和已提交的异步任务后退出
+#   SIGTERM / SIGINT  平滑停止
+#   SIGTTIN / SIGTTOU 增加 / 减少一个工作进程
+#
+# 模型在主进程中加载，SIGHUP 不会重新加载代码和模型；更新代码后需要重启主进程。
+# 仅支持提供 os.fork 的平台，Windows 下退回单进程多线程的开发服务器。
+import argparse
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# 主进程检查工作进程状态的间隔（秒）
+MASTER_TICK = 0.5
+# 工作进程等待新连接的间隔（秒），到期后检查是否需要退出
+WORKER_POLL = 1.0
+
+
+def run_worker(web, listener, max_requests, recover_jobs):
+    """
+    工作进程主循环：逐个处理请求，收到 SIGTERM 或处理满 max_requests 个请求后退出。
+
+    Args:
+        web: 已导入的 app 模块。
+        listener (socket.socket): 主进程创建的监听套接字。
+        max_requests (int): 处理多少个请求后退出并由主进程替换，<= 0 表示不限。
+        recover_jobs (bool): 是否恢复重启前未完成的异步任务，只由第一个工作进程执行。
+    """
+    from werkzeug.serving import make_server
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    handled = 0
+
+    def counted(environ, start_response):
+        nonlocal handled
+        handled += 1
+        return web.app(environ, start_response)
+
+    host, port = listener.getsockname()[:2]
+    server = make_server(host, port, counted, threaded=False, fd=listener.fileno())
+    server.timeout = WORKER_POLL
+    if recover_jobs:
+        web.job_runner.recover()
+
+    logger.info(f"Worker {os.getpid()} serving on {host}:{port}")
+    while not stopping and (max_requests <= 0 or handled < max_requests):
+        # 没有新连接时最多等待 WORKER_POLL 秒后返回
+        server.handle_request()
+
+    reason = "shutdown" if stopping else f"request cap ({handled} requests)"
+    logger.info(f"Worker {os.getpid()} exiting: {reason}")
+    # 等待本进程已提交的异步任务完成
+    web.job_runner.shutdown(wait=True)
+    server.server_close()
+
+
+class Master:
+    """
+    主进程：持有监听套接字，维护指定数量的工作进程，退出的工作进程会被替换。
+    """
+
+    def __init__(self, web, listener, workers, max_requests=0, max_requests_jitter=0, graceful_timeout=120):
+        self.web = web
+        self.listener = listener
+        self.workers = max(1, workers)
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.children = {}  # pid -> 代次
+        self.generation = 0
+        self.spawned = 0
+        self._signals = []
+
+    def spawn(self):
+        # 各进程的请求上限错开，避免同时退出
+        max_requests = self.max_requests
+        if max_requests > 0 and self.max_requests_jitter > 0:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        recover_jobs = self.spawned == 0
+        self.spawned += 1
+
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                random.seed()
+                # 主进程加载模型时关闭了空闲卸载，fork 后恢复配置；继承的模型已固定，不会被卸载
+                self.web.ocr_manager.configure(idle_timeout=self.web.OCR_IDLE_TIMEOUT)
+                run_worker(self.web, self.listener, max_requests, recover_jobs)
+            except Exception as e:
+                logger.error(f"Worker {os.getpid()} crashed: {e}", exc_info=True)
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = self.generation
+        logger.info(f"Started worker {pid} (generation {self.generation})")
+
+    def reap(self):
+        """回收已退出的工作进程"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.children.pop(pid, None)
+            if generation is not None:
+                logger.info(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}")
+
+    def current(self):
+        return [pid for pid, generation in self.children.items() if generation == self.generation]
+
+    def replenish(self):
+        """补足因请求上限或异常退出的工作进程"""
+        for _ in range(self.workers - len(self.current())):
+            self.spawn()
+
+    def signal_workers(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def reload(self):
+        """启动新一批工作进程后让旧进程平滑退出"""
+        old = list(self.children)
+        self.generation += 1
+        logger.info(f"Reloading workers (generation {self.generation})")
+        for _ in range(self.workers):
+            self.spawn()
+        self.signal_workers(old, signal.SIGTERM)
+
+    def stop(self):
+        logger.info("Stopping workers")
+        self.signal_workers(list(self.children), signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(MASTER_TICK)
+        if self.children:
+            logger.warning(f"Killing {len(self.children)} workers after {self.graceful_timeout}s")
+            self.signal_workers(list(self.children), signal.SIGKILL)
+            while self.children:
+                self.reap()
+                time.sleep(0.1)
+
+    def run(self):
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, lambda signum, frame: self._signals.append(signum))
+
+        for _ in range(self.workers):
+            self.spawn()
+        while True:
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum in (signal.SIGTERM, signal.SIGINT):
+                    self.stop()
+                    return
+                if signum == signal.SIGHUP:
+                    self.reload()
+                elif signum == signal.SIGTTIN:
+                    self.workers += 1
+                elif signum == signal.SIGTTOU and self.workers > 1:
+                    self.workers -= 1
+                    self.signal_workers(self.current()[:1], signal.SIGTERM)
+            self.reap()
+            self.replenish()
+            time.sleep(MASTER_TICK)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefork server for the PPT processor")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 5000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("SERVER_WORKERS", 2)))
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("SERVER_MAX_REQUESTS", 0)),
+                        help="requests per worker before it is replaced, 0 for no limit")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(os.getenv("SERVER_MAX_REQUESTS_JITTER", 0)))
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("SERVER_GRACEFUL_TIMEOUT", 120)))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    import app as web
+
+    if not hasattr(os, "fork"):
+        logger.warning("os.fork is not available on this platform, falling back to the threaded development server")
+        web.warmup_models()
+        web.job_runner.recover()
+        web.app.run(host=args.host, port=args.port, debug=False, threaded=True)
+        return
+
+    # 在 fork 前加载 spaCy 和生成模型供工作进程共享；多进程 OCR（OCR_WORKERS > 0）由各工作进程自行启动，
+    # 否则 OCR 模型同样在 fork 前加载。主进程只加载模型、不做推理，避免 fork 时继承已启动的推理线程池。
+    # 加载期间关闭空闲卸载：主进程不启动卸载线程，预加载的模型固定为常驻，工作进程 fork 后再恢复 OCR_IDLE_TIMEOUT
+    web.ocr_manager.configure(idle_timeout=0)
+    web.warmup_models(ocr=web.ocr_pool is None)
+    web.ocr_manager.pin_loaded()
+    # 准入计数改存 SQLite，MAX_PENDING / MAX_PER_CLIENT 对全部工作进程整体生效
+    web.share_admission()
+    logger.info(f"Models loaded in {time.perf_counter() - start:.1f}s")
+
+    listener = socket.create_server((args.host, args.port), backlog=128)
+    # 非阻塞监听：空闲的工作进程在 accept 时不会阻塞，能及时响应退出信号
+    listener.setblocking(False)
+    listener.set_inheritable(True)
+    logger.info(f"Listening on {args.host}:{args.port} with {args.workers} workers")
+
+    master = Master(web, listener, args.workers, args.max_requests, args.max_requests_jitter, args.graceful_timeout)
+    try:
+        master.run()
+    finally:
+        listener.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+# helpers.py
+# 测试共用的辅助对象
+
+
+class FakeClock:
+    """可手动推进的时钟，代替 time.monotonic 注入被测对象"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,115 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from modules.admission import AdmissionController, Overloaded, SharedAdmissionController
+from tests.helpers import FakeClock
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_bounded_queue_rejects_with_retry_after(self):
+        controller = AdmissionController(max_pending=2, clock=self.clock)
+        first = controller.admit("a")
+        controller.admit("b")
+        with self.assertRaises(Overloaded) as ctx:
+            controller.admit("c")
+        # 尚无完成记录时按默认处理耗时估算：2 个积压 × 30 秒
+        self.assertEqual(ctx.exception.retry_after, 60)
+
+        self.clock.now = 10.0
+        first.release()
+        first.release()
+        self.assertEqual(controller.stats()["pending"], 1)
+        controller.admit("c")
+
+    def test_retry_after_uses_observed_throughput(self):
+        controller = AdmissionController(max_pending=4, clock=self.clock)
+        for second in range(4):
+            self.clock.now = float(second)
+            controller.admit("a").release()
+        # 每秒完成 1 个请求，4 个积压约需 4 秒
+        for _ in range(4):
+            controller.admit("a")
+        with self.assertRaises(Overloaded) as ctx:
+            controller.admit("b")
+        self.assertEqual(ctx.exception.retry_after, 4)
+        self.assertEqual(controller.stats()["rejected"], 1)
+
+    def test_per_client_limit(self):
+        controller = AdmissionController(max_pending=10, max_per_client=1, clock=self.clock)
+        ticket = controller.admit("a")
+        with self.assertRaises(Overloaded):
+            controller.admit("a")
+        controller.admit("b")
+        with ticket:
+            pass
+        controller.admit("a")
+
+    def test_failed_requests_do_not_count_as_throughput(self):
+        controller = AdmissionController(max_pending=1, clock=self.clock)
+        controller.admit("a").release(completed=False)
+        self.assertEqual(controller.throughput(), 1 / 30.0)
+
+class TestSharedAdmissionController(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "admission.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def controller(self, **kwargs):
+        return SharedAdmissionController(self.path, clock=self.clock, **kwargs)
+
+    def test_limits_are_shared_between_controllers(self):
+        # 两个实例相当于两个工作进程
+        first, second = self.controller(max_pending=2, max_per_client=1), self.controller(max_pending=2, max_per_client=1)
+        ticket = first.admit("a")
+        with self.assertRaises(Overloaded):
+            second.admit("a")
+        second.admit("b")
+        with self.assertRaises(Overloaded) as ctx:
+            first.admit("c")
+        self.assertEqual(ctx.exception.retry_after, 60)
+        self.assertEqual(second.stats()["pending"], 2)
+
+        ticket.release()
+        ticket.release()
+        second.admit("a")
+        self.assertEqual((first.stats()["rejected"], second.stats()["rejected"]), (1, 1))
+
+    def test_retry_after_uses_throughput_from_all_processes(self):
+        first, second = self.controller(max_pending=4), self.controller(max_pending=4)
+        for now in range(4):
+            self.clock.now = float(now)
+            first.admit("a").release()
+        for _ in range(4):
+            second.admit("a")
+        with self.assertRaises(Overloaded) as ctx:
+            second.admit("b")
+        self.assertEqual(ctx.exception.retry_after, 4)
+        self.assertEqual(second.throughput(), 1.0)
+
+    def test_slots_of_exited_processes_are_released(self):
+        controller = self.controller(max_pending=1)
+        child = subprocess.run([sys.executable, "-c", (
+            "import sys; from modules.admission import SharedAdmissionController; "
+            "SharedAdmissionController(sys.argv[1], 1).admit('a')"
+        ), self.path], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(child.returncode, 0)
+        self.assertEqual(controller.stats()["pending"], 1)
+        controller.admit("b")
+        self.assertEqual(controller.stats()["pending"], 1)
+
+    def test_reset_clears_leftover_slots(self):
+        self.controller(max_pending=1).admit("a")
+        controller = self.controller(max_pending=1)
+        controller.reset()
+        controller.admit("a")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from modules.batch import DONE, FAILED, PARTIAL, Manifest, discover_decks, output_path, run_batch
+
+def write_output(path, output_file):
+    """批处理函数：输入内容为 "bad" 时失败，为 "slow" 时返回不完整结果"""
+    with open(path, "rb") as f:
+        content = f.read()
+    if content == b"bad":
+        raise ValueError("broken deck")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(content.decode())
+    return {"partial": content == b"slow", "slides": 1}
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.out = os.path.join(self.root, "out")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _deck(self, relative, content=b"deck"):
+        path = os.path.join(self.root, "in", relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def _jobs(self):
+        taken = set()
+        decks = discover_decks([os.path.join(self.root, "in")], [".pptx"])
+        return [(path, output_path(self.out, relative, taken)) for path, relative in decks]
+
+    def test_discover_directories_and_globs(self):
+        a = self._deck("a.pptx")
+        b = self._deck(os.path.join("course", "b.pptx"))
+        self._deck(os.path.join("course", "~$b.pptx"))
+        self._deck("notes.txt")
+        decks = discover_decks([os.path.join(self.root, "in"), os.path.join(self.root, "in", "**", "*.pptx")], [".pptx"])
+        self.assertEqual(decks, [(a, "a.pptx"), (b, os.path.join("course", "b.pptx"))])
+
+    def test_output_path_avoids_collisions(self):
+        taken = set()
+        first = output_path(self.out, "a.pptx", taken)
+        self.assertEqual(first, os.path.join(os.path.abspath(self.out), "a.pptx.txt"))
+        self.assertTrue(output_path(self.out, "a.pptx", taken).endswith("a.pptx_2.txt"))
+
+    def test_resume_skips_finished_decks(self):
+        self._deck("a.pptx")
+        self._deck("b.pptx", b"bad")
+        self._deck("c.pptx", b"slow")
+        manifest_path = os.path.join(self.out, "manifest.jsonl")
+        counts = run_batch(self._jobs(), write_output, Manifest(manifest_path))
+        self.assertEqual(counts, {DONE: 1, PARTIAL: 1, FAILED: 1, "skipped": 0})
+
+        # 中断时写了一半的行不影响恢复
+        with open(manifest_path, "a", encoding="utf-8") as f:
+            f.write('{"path": ')
+        manifest = Manifest(manifest_path)
+        entry = manifest.entries[os.path.join(self.root, "in", "a.pptx")]
+        self.assertEqual(entry["status"], DONE)
+        self.assertEqual(entry["slides"], 1)
+        self.assertEqual(len(entry["sha256"]), 64)
+
+        counts = run_batch(self._jobs(), write_output, manifest)
+        self.assertEqual(counts, {DONE: 0, PARTIAL: 1, FAILED: 1, "skipped": 1})
+
+    def test_changed_deck_is_reprocessed(self):
+        path = self._deck("a.pptx")
+        manifest = Manifest(os.path.join(self.out, "manifest.jsonl"))
+        run_batch(self._jobs(), write_output, manifest)
+        self.assertTrue(manifest.is_done(path))
+        with open(path, "wb") as f:
+            f.write(b"new deck")
+        self.assertFalse(manifest.is_done(path))
+
+    def test_process_pool(self):
+        for name in ("a.pptx", "b.pptx", "c.pptx"):
+            self._deck(name, name.encode())
+        manifest = Manifest(os.path.join(self.out, "manifest.jsonl"))
+        counts = run_batch(self._jobs(), write_output, manifest, workers=2)
+        self.assertEqual(counts[DONE], 3)
+        with open(os.path.join(self.out, "b.pptx.txt"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "b.pptx")
+
+if __name__ == "__main__":
+    unittest.main()
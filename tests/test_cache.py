@@ -0,0 +1,159 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from modules.cache import PersistentCache
+from modules.ocr_cache import OCRResultCache
+from modules.ocr_engine import MIN_CONFIDENCE, MIN_TEXT_LENGTH, OCRResult
+from modules.optimizer_cache import OptimizedTextCache
+from modules.records import OCRHit
+from modules.result_cache import ResultCache, SingleFlight, UploadTooLarge, save_upload
+from modules.slide_cache import SlideCache
+
+class TestPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hits_misses_and_persistence(self):
+        cache = PersistentCache(self.path)
+        self.assertIsNone(cache.get("a"))
+        cache.set_json("a", {"x": 1})
+        self.assertEqual(cache.get_json("a"), {"x": 1})
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 1))
+        cache.close()
+        self.assertEqual(PersistentCache(self.path).get_json("a"), {"x": 1})
+
+    def test_lru_eviction_by_size(self):
+        cache = PersistentCache(self.path, max_bytes=25)
+        cache.set("a", b"0" * 10)
+        cache.set("b", b"1" * 10)
+        cache.get("a")
+        cache.set("c", b"2" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_byte_total_tracks_writes_across_instances(self):
+        cache, other = PersistentCache(self.path), PersistentCache(self.path)
+        cache.set("a", b"0" * 10)
+        other.set("a", b"0" * 4)
+        other.set("b", b"1" * 6)
+        cache.delete("b")
+        self.assertEqual(cache.stats()["bytes"], 4)
+        other.clear()
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_eviction_removes_only_enough_oldest_entries(self):
+        cache = PersistentCache(self.path, max_bytes=1000)
+        for i in range(600):
+            cache.set(f"k{i:03d}", b"0" * 2)
+        cache.set("big", b"1" * 500)
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["bytes"]), (251, 1000))
+        self.assertIsNone(cache.get("k349"))
+        self.assertIsNotNone(cache.get("k350"))
+
+    def test_byte_total_initialized_for_existing_files(self):
+        import sqlite3
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+        conn.execute("INSERT INTO entries VALUES ('old', x'00', 7, 0)")
+        conn.commit()
+        conn.close()
+        self.assertEqual(PersistentCache(self.path).stats()["bytes"], 7)
+
+    def test_ocr_cache_key_includes_engine_config(self):
+        bounded = OCRResultCache(self.path, max_side=2048)
+        full = OCRResultCache(self.path)
+        bounded.put(b"logo", OCRResult([("大学", 0.95)]))
+        self.assertEqual(bounded.get(b"logo").text, "大学")
+        self.assertIsNone(full.get(b"logo"))
+        self.assertIn(f"conf={MIN_CONFIDENCE};len={MIN_TEXT_LENGTH}", full.config)
+
+    def test_optimizer_cache_key_includes_model_spacy_tier_and_seed(self):
+        cache = OptimizedTextCache(self.path, "gpt2", "pipeline", "full")
+        result = {"text": "优化结果", "tiers": {"model": [1, 2], "fast": []}}
+        cache.put("幻灯片文本", result, seed=1)
+        self.assertEqual(cache.get("幻灯片文本", seed=1), result)
+        self.assertIsNone(cache.get("幻灯片文本", seed=2))
+        self.assertIsNone(cache.get("幻灯片文本", seed=1, tier="fast"))
+        self.assertIsNone(OptimizedTextCache(self.path, "gpt2", "onnx", "full").get("幻灯片文本", seed=1))
+        self.assertIsNone(OptimizedTextCache(self.path, "gpt2", "pipeline", "sentencizer").get("幻灯片文本", seed=1))
+
+    def test_save_upload_hashes_while_writing(self):
+        data = os.urandom(3000)
+        target = os.path.join(self.tmp.name, "deck.pptx")
+        digest = save_upload(io.BytesIO(data), target, chunk_size=1024)
+        self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+        with open(target, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_save_upload_enforces_max_bytes(self):
+        target = os.path.join(self.tmp.name, "big.pptx")
+        with self.assertRaises(UploadTooLarge):
+            save_upload(io.BytesIO(b"0" * 3000), target, chunk_size=1024, max_bytes=2048)
+        self.assertFalse(os.path.exists(target))
+        save_upload(io.BytesIO(b"0" * 2048), target, chunk_size=1024, max_bytes=2048)
+
+    def test_result_cache_restores_missing_output(self):
+        cache = ResultCache(self.path, "model=gpt2")
+        output_file = os.path.join(self.tmp.name, "out", "optimized_output_a.pptx.txt")
+        key = cache.key("abc")
+        cache.put(key, {"optimized_text": "讲解", "tiers": {"model": [1], "fast": []}, "output_file": output_file})
+        self.assertIsNone(cache.get(cache.key("abc", tier="fast")))
+        self.assertNotEqual(key, ResultCache(self.path, "model=other").key("abc"))
+        self.assertEqual(cache.get(key)["optimized_text"], "讲解")
+        with open(output_file, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "讲解")
+
+    def test_slide_cache_separates_ocr_and_narration(self):
+        cache = SlideCache(self.path, "model=a")
+        self.assertIsNone(cache.get_ocr("fp"))
+        cache.put_ocr("fp", [OCRHit(2, "图中文字")])
+        hits = cache.get_ocr("fp")
+        self.assertEqual([(hit.image, hit.text) for hit in hits], [(2, "图中文字")])
+        cache.put_ocr("empty", [])
+        self.assertEqual(cache.get_ocr("empty"), [])
+
+        cache.put_narration("fp", "讲解", seed=1)
+        self.assertEqual(cache.get_narration("fp", seed=1), "讲解")
+        self.assertIsNone(cache.get_narration("fp", seed=2))
+        self.assertIsNone(cache.get_narration("fp", seed=1, final_number=5))
+        self.assertIsNone(SlideCache(self.path, "model=b").get_narration("fp", seed=1))
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+        results = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "done"
+
+        leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+        follower.start()
+        leader.join()
+        follower.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [("done", False), ("done", True)])
+        self.assertEqual(len(flight), 0)
+
+    def test_errors_propagate_and_key_is_released(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do("k", lambda: (_ for _ in ()).throw(ValueError("bad")))
+        self.assertEqual(flight.do("k", lambda: 1), (1, False))
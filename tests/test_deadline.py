@@ -0,0 +1,56 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from modules.deadline import Deadline, expired, wait_for
+from tests.helpers import FakeClock
+
+class TestDeadline(unittest.TestCase):
+    def test_scale_and_expire(self):
+        clock = FakeClock()
+        deadline = Deadline(10, per_slide=2, per_image=1, max_timeout=30, clock=clock)
+        self.assertEqual(deadline.scale(slides=3, images=4), 20)
+        clock.now = 15
+        self.assertEqual(deadline.remaining(), 5)
+        self.assertFalse(deadline.expired)
+        clock.now = 20
+        self.assertTrue(expired(deadline))
+        self.assertEqual(deadline.scale(slides=100), 30)
+
+    def test_unlimited_and_cancel(self):
+        deadline = Deadline()
+        self.assertIsNone(deadline.remaining())
+        self.assertFalse(expired(deadline))
+        self.assertFalse(expired(None))
+        deadline.cancel()
+        self.assertTrue(deadline.cancelled)
+        self.assertEqual(deadline.remaining(), 0)
+
+    def test_wait_for_cancels_overrunning_worker(self):
+        deadline = Deadline(0.05)
+        stopped = []
+
+        def work():
+            # 模拟到期后才检查截止时间的工作线程
+            while not deadline.cancelled:
+                time.sleep(0.01)
+            stopped.append(True)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(work)
+            with self.assertRaises(TimeoutError):
+                wait_for(future, deadline, grace=0.05)
+        self.assertEqual(stopped, [True])
+
+    def test_wait_for_returns_partial_result(self):
+        deadline = Deadline(0.05)
+
+        def work():
+            while not deadline.expired:
+                time.sleep(0.01)
+            return "partial"
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(wait_for(executor.submit(work), deadline, grace=1), "partial")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.enum.chart import XL_CHART_TYPE
+from pptx.util import Inches
+from PIL import Image
+from modules.deck import load_deck, media_references
+from modules.xml_deck import load_xml_deck
+from modules.text_extraction import extract_text_from_ppt, extract_metadata
+
+# 基线提取器（改为共享 ParsedDeck 之前）对 DeepLearning.pptx 的输出
+BASELINE_TEXT = os.path.join(os.path.dirname(__file__), "data", "DeepLearning.text.json")
+
+class TestParsedDeck(unittest.TestCase):
+    def test_text_matches_baseline_extractor(self):
+        file_path = "DeepLearning.pptx"
+        with open(BASELINE_TEXT, encoding="utf-8") as f:
+            expected = json.load(f)
+        deck = load_deck(file_path)
+        self.assertEqual(extract_text_from_ppt(file_path, deck=deck), expected)
+        self.assertEqual(extract_text_from_ppt(file_path), expected)
+        self.assertEqual(extract_text_from_ppt(file_path, engine="xml"), expected)
+
+    def test_group_shape_text_is_extracted(self):
+        # 与基线不同：组合形状（含嵌套组合）中的文本框也会输出
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "deck.pptx")
+            build_deck(path)
+            lines = extract_text_from_ppt(path)[0].split("\n")
+        self.assertIn("grouped", lines)
+        self.assertIn("nested", lines)
+
+    def test_shared_deck_matches_file_path(self):
+        file_path = "DeepLearning.pptx"
+        deck = load_deck(file_path)
+        self.assertEqual(extract_metadata(file_path, deck=deck), extract_metadata(file_path))
+
+    def test_slides_traversed_once(self):
+        deck = load_deck("DeepLearning.pptx")
+        self.assertIs(deck.slides, deck.slides)
+        for slide in deck.slides:
+            self.assertEqual([p.index for p in slide.pictures], list(range(1, len(slide.pictures) + 1)))
+
+    def test_fingerprints_change_only_for_edited_slide(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            copy = os.path.join(tmp, "copy.pptx")
+            edited = os.path.join(tmp, "edited.pptx")
+            shutil.copy("DeepLearning.pptx", copy)
+            presentation = Presentation(copy)
+            presentation.save(copy)
+            shape = next(shape for shape in presentation.slides[1].shapes if shape.has_text_frame)
+            shape.text_frame.text = shape.text_frame.text + "（已修订）"
+            presentation.save(edited)
+
+            original = load_deck("DeepLearning.pptx").fingerprints
+            self.assertEqual(load_deck(copy).fingerprints, original)
+            changed = load_deck(edited).fingerprints
+            self.assertEqual([a == b for a, b in zip(original, changed)],
+                             [index != 1 for index in range(len(original))])
+
+def build_deck(path):
+    """含多级段落、软回车、表格、嵌套组合形状、图表和注释的小型演示文稿"""
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[1])
+    slide.shapes.title.text = "First\nTitle"
+    body = slide.placeholders[1].text_frame
+    body.text = "Level zero"
+    paragraph = body.add_paragraph()
+    paragraph.text = "Level one\vsoft break"
+    paragraph.level = 1
+    slide.shapes.add_table(2, 2, Inches(1), Inches(4), Inches(4), Inches(1)).table.cell(1, 0).text = "cell\ntwo lines"
+    group = slide.shapes.add_group_shape()
+    group.shapes.add_textbox(Inches(6), Inches(1), Inches(2), Inches(1)).text_frame.text = "grouped"
+    inner = group.shapes.add_group_shape()
+    inner.shapes.add_textbox(Inches(6), Inches(2), Inches(2), Inches(1)).text_frame.text = "nested"
+    slide.notes_slide.notes_text_frame.text = "notes"
+
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    chart_data = CategoryChartData()
+    chart_data.categories = ["a", "b"]
+    chart_data.add_series("s", (1, 2))
+    chart = slide.shapes.add_chart(XL_CHART_TYPE.COLUMN_CLUSTERED, 0, 0, Inches(4), Inches(3), chart_data).chart
+    chart.chart_title.text_frame.text = "Chart title"
+    slide.shapes.add_chart(XL_CHART_TYPE.PIE, 0, 0, Inches(4), Inches(3), chart_data)
+    prs.save(path)
+
+def describe(slide):
+    blocks = []
+    for block in slide.blocks:
+        if block.kind == "text":
+            blocks.append(("text", [(p.level, p.runs) for p in block.paragraphs]))
+        elif block.kind == "table":
+            blocks.append(("table", block.rows))
+        else:
+            blocks.append(("chart", block.title))
+    return slide.number, slide.title, slide.notes, blocks
+
+def png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (20, 20), color).save(buffer, "PNG")
+    buffer.seek(0)
+    return buffer
+
+class TestMediaReferences(unittest.TestCase):
+    def test_shared_parts_groups_and_placeholders(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "deck.pptx")
+            prs = Presentation()
+            for _ in range(3):
+                prs.slides.add_slide(prs.slide_layouts[6]).shapes.add_picture(png("red"), 0, 0)
+            slide = prs.slides[1]
+            group = slide.shapes.add_group_shape()
+            group.shapes.add_picture(png("blue"), 0, 0)
+            slide = prs.slides.add_slide(prs.slide_layouts[8])
+            slide.placeholders[1].insert_picture(png("red"))
+            prs.save(path)
+
+            deck = load_deck(path)
+            self.assertEqual([len(slide.pictures) for slide in deck.slides], [1, 2, 1, 1])
+            references = media_references(deck.slides)
+            self.assertEqual(len(references), 2)
+            logo, grouped = references.values()
+            self.assertEqual([(number, picture.index) for number, picture in logo], [(1, 1), (2, 1), (3, 1), (4, 1)])
+            self.assertEqual([(number, picture.index) for number, picture in grouped], [(2, 2)])
+            self.assertEqual(logo[0][1].content_type, "image/png")
+            self.assertEqual(logo[0][1].blob, deck.slides[3].pictures[0].blob)
+
+class TestXMLDeck(unittest.TestCase):
+    def test_matches_parsed_deck(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "deck.pptx")
+            build_deck(path)
+            expected = [describe(slide) for slide in load_deck(path).slides]
+            self.assertEqual([describe(slide) for slide in load_xml_deck(path).slides], expected)
+        self.assertIn(("text", [(0, ["grouped"])]), expected[0][3])
+        self.assertIn(("text", [(0, ["nested"])]), expected[0][3])
+        self.assertEqual(expected[1][3], [("chart", "Chart title"), ("chart", None)])
+
+    def test_text_output_matches_pptx_engine(self):
+        file_path = "DeepLearning.pptx"
+        self.assertEqual(extract_text_from_ppt(file_path, engine="xml"), extract_text_from_ppt(file_path))
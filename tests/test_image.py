@@ -0,0 +1,219 @@
+import copy
+import unittest
+import cv2
+import numpy as np
+from modules.ocr_batch import batch_ocr
+from modules.ocr_engine import decode_image, filter_ocr_lines
+
+def box(x, y, w, h):
+    return np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h]], dtype=np.float32)
+
+class FakeBatchOCR:
+    """检测结果由图片第一个像素值决定，识别结果为文本行宽度，便于核对映射顺序"""
+    drop_score = 0.5
+
+    def __init__(self):
+        self.rec_batches = []
+
+    def text_detector(self, image):
+        layouts = {
+            1: [box(0, 40, 60, 10), box(0, 0, 30, 10)],
+            2: [],
+            3: [box(0, 0, 90, 10)],
+        }
+        boxes = layouts[int(image[0, 0, 0])]
+        return (np.array(boxes) if boxes else None), 0.0
+
+    def text_classifier(self, crops):
+        return crops, [("0", 1.0)] * len(crops), 0.0
+
+    def text_recognizer(self, crops):
+        self.rec_batches.append([crop.shape[1] for crop in crops])
+        return [(f"w{crop.shape[1]}", 0.9) for crop in crops], 0.0
+
+    def ocr(self, image, cls=True):
+        raise AssertionError("batched path should not call ocr()")
+
+class PaddleLikeOCR:
+    """
+    子模型为确定性函数的假引擎，ocr() 按 PaddleOCR TextSystem 的流程逐张执行 det+cls+rec 和 drop_score 过滤。
+
+    检测结果由图片左上角像素决定；区域左上像素为 30 的文本行得分低于 drop_score，为 40 的识别失败（空文本、得分 0），
+    亮度超过 150 的文本行被方向分类器判为 180 度并旋转。
+    """
+    drop_score = 0.5
+
+    layouts = {
+        # 同一行内左右颠倒、上下两行、竖排文本行和倒置文本行
+        1: [box(60, 22, 40, 10), box(4, 40, 60, 12), box(8, 20, 40, 10), box(100, 40, 10, 30)],
+        2: [],
+        3: [box(4, 4, 30, 10)],
+        4: [box(4, 4, 30, 10), box(4, 30, 50, 10)],
+        5: [box(4, 4, 30, 10)],
+    }
+
+    @staticmethod
+    def image(marker):
+        image = np.full((80, 120, 3), 10, dtype=np.uint8)
+        image[40:52, 4:64] = np.linspace(160, 250, 60, dtype=np.uint8)[None, :, None]
+        if marker == 3:
+            image[4:14, 4:34] = 30
+        if marker == 4:
+            image[30:40, 4:54] = 40
+        image[0, 0] = marker
+        return image
+
+    def text_detector(self, image):
+        marker = int(image[0, 0, 0])
+        if marker == 5:
+            raise RuntimeError("detector failed")
+        boxes = self.layouts[marker]
+        return (np.array(boxes) if boxes else None), 0.0
+
+    def text_classifier(self, crops):
+        crops = list(crops)
+        labels = []
+        for i, crop in enumerate(crops):
+            if crop.mean() > 150:
+                crops[i] = cv2.rotate(crop, 1)
+                labels.append(["180", 0.99])
+            else:
+                labels.append(["0", 0.99])
+        return crops, labels, 0.0
+
+    def text_recognizer(self, crops):
+        results = []
+        for crop in crops:
+            first = int(crop[0, 0, 0])
+            if first == 40:
+                results.append(("", 0.0))
+            else:
+                results.append((f"w{crop.shape[1]}h{crop.shape[0]}p{first}", 0.3 if first == 30 else 0.9))
+        return results, 0.0
+
+    @staticmethod
+    def _sorted_boxes(dt_boxes):
+        boxes = sorted(dt_boxes, key=lambda x: (x[0][1], x[0][0]))
+        for i in range(len(boxes) - 1):
+            for j in range(i, -1, -1):
+                if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                    boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+                else:
+                    break
+        return boxes
+
+    @staticmethod
+    def _crop(image, points):
+        width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+        height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+        target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+        crop = cv2.warpPerspective(image, cv2.getPerspectiveTransform(points, target), (width, height),
+                                   borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+        return np.rot90(crop) if crop.shape[0] * 1.0 / crop.shape[1] >= 1.5 else crop
+
+    def ocr(self, image, cls=True):
+        dt_boxes, _ = self.text_detector(image)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            return [None]
+        boxes = self._sorted_boxes(dt_boxes)
+        crops = [self._crop(image, copy.deepcopy(b)) for b in boxes]
+        if cls:
+            crops, _, _ = self.text_classifier(crops)
+        rec_res, _ = self.text_recognizer(crops)
+        lines = [[b.tolist(), res] for b, res in zip(boxes, rec_res) if res[1] >= self.drop_score]
+        return [lines] if lines else [None]
+
+class TestBatchOCR(unittest.TestCase):
+    def test_results_map_back_in_image_and_box_order(self):
+        images = [np.full((60, 100, 3), value, dtype=np.uint8) for value in (1, 2, 3)]
+        ocr = FakeBatchOCR()
+        results = batch_ocr(images, ocr, batch_size=2)
+        texts = [filter_ocr_lines(result).text for result in results]
+        self.assertEqual(texts, ["w30\nw60", "", "w90"])
+        # 文本行按宽高比排序后分批
+        self.assertEqual(ocr.rec_batches, [[30, 60], [90]])
+        self.assertEqual(results[1], [None])
+
+    def test_matches_per_image_ocr(self):
+        ocr = PaddleLikeOCR()
+        images = [PaddleLikeOCR.image(marker) for marker in (1, 2, 3, 4, 1)]
+        for batch_size in (1, 2, 16):
+            for cls in (True, False):
+                batched = batch_ocr(images, ocr, batch_size=batch_size, use_angle_cls=cls)
+                self.assertEqual(batched, [ocr.ocr(image, cls=cls) for image in images])
+                self.assertEqual([filter_ocr_lines(r).to_dict() for r in batched],
+                                 [filter_ocr_lines(ocr.ocr(image, cls=cls)).to_dict() for image in images])
+
+        results = batch_ocr(images, ocr, batch_size=2)
+        # 同一行按从左到右排序，倒置行经方向分类后识别，低分行和识别失败的行被丢弃
+        self.assertEqual([line[1][0] for line in results[0][0]], ["w40h10p10", "w40h10p10", "w60h12p250", "w30h10p10"])
+        self.assertEqual(results[1:4], [[None], [None], [[[[[4.0, 4.0], [34.0, 4.0], [34.0, 14.0], [4.0, 14.0]], ("w30h10p10", 0.9)]]]])
+
+    def test_failed_images_match_per_image_ocr(self):
+        ocr = PaddleLikeOCR()
+        # 无法解码的图片在两种路径中都不进入推理
+        self.assertIsNone(decode_image(b"not an image"))
+        # 推理出错时两种路径都抛出异常，由调用方按逐张识别回退并记为空结果
+        failing = [PaddleLikeOCR.image(1), PaddleLikeOCR.image(5)]
+        with self.assertRaises(RuntimeError):
+            batch_ocr(failing, ocr)
+        with self.assertRaises(RuntimeError):
+            ocr.ocr(failing[1])
+
+class TestTextPrefilter(unittest.TestCase):
+    @staticmethod
+    def encode(image, fmt="PNG"):
+        import io
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt)
+        return buffer.getvalue()
+
+    def test_skips_blank_and_gradient_keeps_text(self):
+        from PIL import Image, ImageDraw
+        from modules.image_prefilter import TextPrefilter
+        text = Image.new("RGB", (600, 200), "white")
+        draw = ImageDraw.Draw(text)
+        for y in range(10, 190, 20):
+            draw.text((10, y), "Deep learning basics " * 3, fill="black")
+        blank = Image.new("RGB", (600, 200), "white")
+        gradient = Image.fromarray(np.tile(np.linspace(0, 255, 600).astype(np.uint8), (200, 1)))
+        prefilter = TextPrefilter(batch_size=2)
+        keep = prefilter.filter([self.encode(text), self.encode(blank), self.encode(gradient, "JPEG"), b"broken"])
+        self.assertEqual(keep, [True, False, False, True])
+        self.assertEqual(prefilter.stats(), {"checked": 4, "skipped": 2})
+
+class TestImageTriage(unittest.TestCase):
+    @staticmethod
+    def encode(size, fmt):
+        import io
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "white").save(buffer, format=fmt)
+        return buffer.getvalue()
+
+    def test_header_probe_and_decisions(self):
+        from modules.image_triage import ImageTriage, probe_image
+        photo = self.encode((6000, 4000), "JPEG")
+        info = probe_image(photo)
+        self.assertEqual((info.format, info.width, info.height), ("jpeg", 6000, 4000))
+        for fmt in ("PNG", "GIF", "BMP", "TIFF"):
+            info = probe_image(self.encode((300, 200), fmt))
+            self.assertEqual((info.width, info.height), (300, 200), fmt)
+
+        triage = ImageTriage(min_side=32, max_side=2048)
+        emf = b"\x01\x00\x00\x00" + b"\x00" * 36 + b" EMF" + b"\x00" * 20
+        decisions = triage.triage([self.encode((16, 16), "PNG"), emf, photo], [None, "image/x-emf", "image/jpeg"])
+        self.assertEqual([d.skip for d in decisions], ["too_small", "vector", None])
+        self.assertEqual(triage.stats(), {"checked": 3, "vector": 1, "too_small": 1, "downscaled": 1})
+
+    def test_wide_short_banner_is_not_an_icon(self):
+        from modules.image_triage import ImageTriage
+        triage = ImageTriage(min_side=32, max_side=2048)
+        decisions = triage.triage([self.encode((1200, 28), "PNG"), self.encode((28, 900), "PNG"), self.encode((31, 20), "PNG")])
+        self.assertEqual([d.skip for d in decisions], [None, None, "too_small"])
+        self.assertEqual(decisions[0].max_side, 2048)
+
+    def test_decode_bounds_long_side(self):
+        from modules.ocr_engine import decode_image
+        self.assertEqual(max(decode_image(self.encode((6000, 4000), "JPEG"), max_side=2048).shape[:2]), 2048)
+        self.assertEqual(max(decode_image(self.encode((3000, 1000), "PNG"), max_side=1000).shape[:2]), 1000)
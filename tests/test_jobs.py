@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from modules.job_store import DONE, FAILED, QUEUED, RUNNING, JobStore
+from modules.jobs import JobRunner
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lifecycle_and_persistence(self):
+        store = JobStore(self.path)
+        job_id = store.create("a.pptx", "/tmp/a.pptx", {"tier": "fast"})
+        self.assertEqual(store.get(job_id)["status"], QUEUED)
+        store.update_progress(job_id, slides_total=3)
+        store.update_progress(job_id, slides_done=1)
+        self.assertEqual(store.get(job_id)["progress"], {"slides_total": 3, "slides_done": 1})
+        store.complete(job_id, {"optimized_text": "文本"})
+        store.close()
+
+        job = JobStore(self.path).get(job_id)
+        self.assertEqual(job["status"], DONE)
+        self.assertEqual(job["params"], {"tier": "fast"})
+        self.assertEqual(job["result"], {"optimized_text": "文本"})
+
+    def test_unfinished(self):
+        store = JobStore(self.path)
+        queued = store.create("a.pptx", "/tmp/a.pptx")
+        running = store.create("b.pptx", "/tmp/b.pptx")
+        store.set_status(running, RUNNING)
+        store.fail(store.create("c.pptx", "/tmp/c.pptx"), "boom")
+        self.assertEqual([job["id"] for job in store.unfinished()], [queued, running])
+        self.assertIsNone(store.get("missing"))
+
+    def test_purge_removes_expired_finished_jobs(self):
+        store = JobStore(self.path)
+        done = store.create("a.pptx", "/tmp/a.pptx")
+        store.complete(done, {"optimized_text": "文本"})
+        failed = store.create("b.pptx", "/tmp/b.pptx")
+        store.fail(failed, "boom")
+        queued = store.create("c.pptx", "/tmp/c.pptx")
+        now = store.get(done)["updated"]
+        self.assertEqual(store.purge(3600, now=now + 60), 0)
+        self.assertEqual(store.purge(3600, now=now + 7200), 2)
+        self.assertIsNone(store.get(done))
+        self.assertIsNone(store.get(failed))
+        self.assertEqual(store.get(queued)["status"], QUEUED)
+
+class TestJobRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.sqlite3"))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _upload(self, name):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(b"deck")
+        return path
+
+    def test_concurrent_submits_share_one_pool(self):
+        created = []
+
+        class SlowExecutor(ThreadPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                created.append(self)
+                # 放大创建线程池的时间窗口
+                time.sleep(0.05)
+                super().__init__(*args, **kwargs)
+
+        runner = JobRunner(self.store, lambda file_path, params, progress: {}, workers=2)
+        paths = [self._upload(f"{i}.pptx") for i in range(8)]
+        with mock.patch("modules.jobs.ThreadPoolExecutor", SlowExecutor):
+            threads = [threading.Thread(target=runner.submit, args=(os.path.basename(path), path)) for path in paths]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        runner.shutdown()
+        self.assertEqual(len(created), 1)
+        self.assertEqual(self.store.unfinished(), [])
+
+    def test_submit_reports_progress_and_result(self):
+        def handler(file_path, params, progress):
+            progress(slides_total=2, slides_done=2)
+            return {"optimized_text": params["tier"]}
+
+        runner = JobRunner(self.store, handler, workers=1)
+        path = self._upload("a.pptx")
+        job_id = runner.submit("a.pptx", path, {"tier": "fast"})
+        runner.shutdown()
+
+        status = runner.status(job_id)
+        self.assertEqual(status["status"], DONE)
+        self.assertEqual(status["progress"], {"slides_total": 2, "slides_done": 2})
+        self.assertEqual(self.store.get(job_id)["result"], {"optimized_text": "fast"})
+        self.assertFalse(os.path.exists(path))
+
+    def test_failure_is_recorded(self):
+        def handler(file_path, params, progress):
+            raise ValueError("bad deck")
+
+        runner = JobRunner(self.store, handler, workers=1)
+        done = []
+        job_id = runner.submit("a.pptx", self._upload("a.pptx"), on_done=done.append)
+        runner.shutdown()
+        status = runner.status(job_id)
+        self.assertEqual(status["status"], FAILED)
+        self.assertEqual(status["error"], "bad deck")
+        self.assertEqual(done, [False])
+
+    def test_recover_requeues_jobs_with_uploads(self):
+        kept = self.store.create("a.pptx", self._upload("a.pptx"))
+        self.store.set_status(kept, RUNNING)
+        lost = self.store.create("b.pptx", os.path.join(self.tmp.name, "missing.pptx"))
+        seen = []
+        lock = threading.Lock()
+
+        def handler(file_path, params, progress):
+            with lock:
+                seen.append(file_path)
+            return {}
+
+        runner = JobRunner(self.store, handler, workers=1)
+        self.assertEqual(runner.recover(), 1)
+        runner.shutdown()
+        self.assertEqual(self.store.get(kept)["status"], DONE)
+        self.assertEqual(self.store.get(lost)["status"], FAILED)
+        self.assertEqual(len(seen), 1)
+
+    def test_recover_and_submit_purge_expired_jobs(self):
+        old = self.store.create("a.pptx", "/tmp/a.pptx")
+        self.store.complete(old, {})
+        self.store._execute("UPDATE jobs SET updated = updated - 7200 WHERE id = ?", (old,))
+        runner = JobRunner(self.store, lambda file_path, params, progress: {}, workers=1, retention=3600)
+        runner.recover()
+        self.assertIsNone(self.store.get(old))
+
+        recent = runner.submit("b.pptx", self._upload("b.pptx"))
+        runner.shutdown()
+        self.store._execute("UPDATE jobs SET updated = updated - 7200 WHERE id = ?", (recent,))
+        # 距上次清理不足一小时，提交时不再清理
+        runner.submit("c.pptx", self._upload("c.pptx"))
+        runner.shutdown()
+        self.assertIsNotNone(self.store.get(recent))
+        self.assertEqual(runner.purge_expired(), 1)
+        self.assertIsNone(self.store.get(recent))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import random
+import unittest
+from modules.rule_narrator import IMAGE_OPENERS, LIST_END, narrate_slide
+
+class TestRuleNarrator(unittest.TestCase):
+    def test_lists_formulas_and_images(self):
+        lines = [
+            "Title: 神经网络的基本概念",
+            "▪ 输入层",
+            "▪ 输出层",
+            "y = σ(∑wx + b)",
+            "Slide 2, Image 1 Text:",
+            "stablediffusionweb.com 激活函数",
+        ]
+        text = narrate_slide(lines, random.Random(0))
+        self.assertIn("神经网络的基本概念。", text)
+        self.assertIn("输入层，挺关键的吧？", text)
+        self.assertIn(LIST_END, text)
+        self.assertIn("y = σ(∑wx + b)，它描述了模型的计算过程。", text)
+        self.assertIn("上面写着：激活函数。", text)
+        self.assertNotIn("stablediffusionweb", text)
+        self.assertLess(text.index(LIST_END), text.index("y = σ"))
+
+    def test_seeded_output_is_reproducible(self):
+        lines = ["深度学习基础", "▪ 卷积", "▪ 池化", "Image 1 Text:"]
+        self.assertEqual(narrate_slide(lines, random.Random(3)), narrate_slide(lines, random.Random(3)))
+        text = narrate_slide(lines)
+        self.assertTrue(any(opener in text for opener in IMAGE_OPENERS))
+
+if __name__ == "__main__":
+    unittest.main()
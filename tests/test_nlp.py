@@ -0,0 +1,36 @@
+import unittest
+from modules.nlp_pipeline import split_sentences
+
+class FakeSpan:
+    def __init__(self, text):
+        self.text = text
+
+class FakeDoc:
+    def __init__(self, text):
+        self.sents = [FakeSpan(part + " ") for part in text.split("。") if part]
+
+class FakeNLP:
+    """按句号分句，并记录 pipe 的调用参数"""
+
+    def __init__(self):
+        self.pipe_calls = []
+
+    def pipe(self, texts, batch_size=1000, n_process=1):
+        texts = list(texts)
+        self.pipe_calls.append((len(texts), batch_size, n_process))
+        return (FakeDoc(text) for text in texts)
+
+class TestSplitSentences(unittest.TestCase):
+    def test_all_slides_in_one_pipe_call(self):
+        nlp = FakeNLP()
+        sentences = split_sentences(nlp, ["甲。乙。", "丙"], batch_size=8, n_process=2)
+        self.assertEqual(sentences, [["甲", "乙"], ["丙"]])
+        self.assertEqual(nlp.pipe_calls, [(2, 8, 2)])
+
+    def test_empty(self):
+        nlp = FakeNLP()
+        self.assertEqual(split_sentences(nlp, []), [])
+        self.assertEqual(nlp.pipe_calls, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from modules.ocr_engine import OCRJobResult, OCRResult, run_ocr
+
+class FakeOCR:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def ocr(self, image, cls=True):
+        self.calls += 1
+        return self.result
+
+class TestRunOCR(unittest.TestCase):
+    def test_single_pass_filters_lines(self):
+        ocr = FakeOCR([[
+            [[[0, 0]], ("深度学习", 0.98)],
+            [[[0, 0]], ("x", 0.99)],
+            [[[0, 0]], ("噪声", 0.3)],
+            [[[0, 0]], ("ReLU", 0.8)],
+        ]])
+        result = run_ocr("image.jpg", ocr)
+        self.assertEqual(ocr.calls, 1)
+        self.assertTrue(result.has_text)
+        self.assertEqual(result.text, "深度学习\nReLU")
+
+    def test_empty_and_failing_ocr(self):
+        self.assertFalse(run_ocr("image.jpg", FakeOCR([None])).has_text)
+
+        class Broken:
+            def ocr(self, image, cls=True):
+                raise RuntimeError("boom")
+        self.assertEqual(run_ocr("image.jpg", Broken()).text, "")
+
+    def test_job_result_is_ordered(self):
+        job = OCRJobResult()
+        job.add(2, 1, OCRResult([("b", 0.9)]))
+        job.add(1, 2, OCRResult([("a", 0.9)]))
+        self.assertEqual([key for key, _ in job.items()], [(1, 2), (2, 1)])
+        self.assertEqual(job.get(1, 2).text, "a")
+
+class TestDecodeImage(unittest.TestCase):
+    def test_decodes_png_and_gif_in_memory(self):
+        import io
+        from PIL import Image
+        from modules.ocr_engine import decode_image
+        for fmt in ("PNG", "GIF"):
+            buffer = io.BytesIO()
+            Image.new("RGB", (40, 20), "white").save(buffer, format=fmt)
+            image = decode_image(buffer.getvalue())
+            self.assertEqual(image.shape, (20, 40, 3))
+        self.assertIsNone(decode_image(b"not an image"))
@@ -0,0 +1,39 @@
+import threading
+import time
+import unittest
+from modules.ocr_manager import OCRModelManager
+
+class TestOCRModelManager(unittest.TestCase):
+    def setUp(self):
+        self.loads = []
+        def factory(lang, use_gpu, use_angle_cls):
+            self.loads.append((lang, use_gpu, use_angle_cls))
+            return object()
+        self.manager = OCRModelManager(idle_timeout=0, factory=factory)
+
+    def test_each_config_loaded_once(self):
+        threads = [threading.Thread(target=self.manager.warmup) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        with self.manager.acquire() as first, self.manager.acquire(lang='en') as second:
+            self.assertIsNot(first, second)
+        with self.manager.acquire() as again:
+            self.assertIs(again, first)
+        self.assertEqual(sorted(self.loads), [('ch', False, True), ('en', False, True)])
+
+    def test_unload_idle_skips_models_in_use(self):
+        self.manager.idle_timeout = 1
+        with self.manager.acquire():
+            self.assertEqual(self.manager.unload_idle(now=time.monotonic() + 10), 0)
+        self.assertEqual(self.manager.unload_idle(now=time.monotonic() + 10), 1)
+        self.assertEqual(self.manager.loaded(), [])
+
+    def test_pinned_models_survive_idle_unload(self):
+        self.manager.warmup()
+        self.manager.pin_loaded()
+        self.manager.warmup(lang='en')
+        self.manager.idle_timeout = 1
+        self.assertEqual(self.manager.unload_idle(now=time.monotonic() + 10), 1)
+        self.assertEqual(self.manager.loaded(), [('ch', False, True)])
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+import unittest
+from modules.ocr_engine import OCRResult
+from modules.ocr_pool import OCRProcessPool
+
+# 工作进程按名称导入以下函数，因此定义在模块顶层
+
+def fake_init(lang, use_gpu, use_angle_cls):
+    pass
+
+def fake_worker(blobs, batch_size, max_side):
+    """b"bad" 抛出异常，b"crash" 让工作进程直接退出；先提交的分块睡得更久，完成顺序与提交顺序相反"""
+    if b"crash" in blobs:
+        os._exit(1)
+    if b"bad" in blobs:
+        raise RuntimeError("worker failed")
+    time.sleep(0.05 * (len(blobs[0]) % 4))
+    return [OCRResult([(blob.decode(), 0.9)]).to_dict() for blob in blobs]
+
+class TestOCRProcessPool(unittest.TestCase):
+    def setUp(self):
+        self.fallback_calls = []
+        def fallback(blobs, max_side):
+            self.fallback_calls.append(list(blobs))
+            return [OCRResult([("local:" + blob.decode(), 0.9)]).to_dict() for blob in blobs]
+        self.pool = OCRProcessPool(2, chunk_size=2, worker=fake_worker, initializer=fake_init, fallback=fallback)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def texts(self, results):
+        return [None if result is None else result.text for result in results]
+
+    def test_results_keep_input_order_across_chunks(self):
+        blobs = [b"a" * n for n in (3, 3, 2, 2, 1, 1, 4)]
+        self.assertEqual(self.texts(self.pool.recognize(blobs)), [blob.decode() for blob in blobs])
+        self.assertEqual(self.fallback_calls, [])
+
+    def test_failed_chunk_falls_back_to_in_process_ocr(self):
+        results = self.pool.recognize([b"x", b"y", b"bad", b"z", b"w"])
+        self.assertEqual(self.texts(results), ["x", "y", "local:bad", "local:z", "w"])
+        self.assertEqual(self.fallback_calls, [[b"bad", b"z"]])
+
+    def test_crashed_worker_falls_back_and_pool_restarts(self):
+        results = self.pool.recognize([b"crash", b"x"])
+        self.assertEqual(self.texts(results), ["local:crash", "local:x"])
+        self.assertEqual(self.texts(self.pool.recognize([b"y"])), ["y"])
+
+    def test_fallback_errors_leave_none(self):
+        def failing(blobs, max_side):
+            raise RuntimeError("no local model")
+        self.pool.fallback = failing
+        self.assertEqual(self.texts(self.pool.recognize([b"x", b"y", b"bad"], max_side=64)), ["x", "y", None])
+
+    def test_warmup_waits_for_every_worker(self):
+        names = self.pool.warmup(timeout=30)
+        self.assertEqual(len(names), 2)
+        self.assertEqual(len(self.pool.warmup(timeout=30)), 2)
+
+    def test_shutdown_stops_workers_and_pool_restarts_lazily(self):
+        self.pool.warmup(timeout=30)
+        processes = list(self.pool._executor._processes.values())
+        self.pool.shutdown()
+        self.assertIsNone(self.pool._executor)
+        self.assertFalse(any(process.is_alive() for process in processes))
+        self.assertEqual(self.texts(self.pool.recognize([b"x"])), ["x"])
+        self.pool.shutdown()
+        self.pool.shutdown()
+
+    def test_concurrent_recognize_calls_share_the_pool(self):
+        outputs = {}
+        def run(tag):
+            outputs[tag] = self.texts(self.pool.recognize([f"{tag}{i}".encode() for i in range(5)]))
+        threads = [threading.Thread(target=run, args=(tag,)) for tag in "pq"]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(outputs, {tag: [f"{tag}{i}" for i in range(5)] for tag in "pq"})
+
+if __name__ == "__main__":
+    unittest.main()
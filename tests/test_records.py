@@ -0,0 +1,42 @@
+import unittest
+from modules.deck import load_deck
+from modules.ocr_engine import OCRJobResult, OCRResult
+from modules.records import DeckRecord, ocr_hits, slides_from_deck, slides_from_strings
+
+class TestRecords(unittest.TestCase):
+    def test_slides_from_deck_keep_every_run(self):
+        deck = load_deck("DeepLearning.pptx")
+        records = slides_from_deck(deck)
+        self.assertEqual([record.number for record in records], [slide.number for slide in deck.slides])
+        for slide, record in zip(deck.slides, records):
+            runs = [run.strip() for block in slide.blocks if block.kind == "text"
+                    for paragraph in block.paragraphs for run in paragraph.runs if run.strip()]
+            self.assertEqual(record.lines, runs)
+
+    def test_ocr_hits_attach_to_their_slide(self):
+        results = OCRJobResult()
+        results.add(3, 2, OCRResult([("第二张", 0.9)]))
+        results.add(3, 1, OCRResult([("stablediffusionweb.com 第一张", 0.9)]))
+        results.add(1, 1, OCRResult([]))
+        record = DeckRecord({"Title": "课程"}, slides_from_strings(["\n\n@@@Slide_1@@@\n标题\n\n", "@@@Slide_3@@@\n正文"]))
+        for slide, image, text in ocr_hits(results):
+            record.add_ocr(slide, image, text)
+        self.assertEqual([slide.number for slide in record.slides], [1, 3])
+        self.assertEqual([(hit.image, hit.text) for hit in record.slides[1].ocr], [(1, "第一张"), (2, "第二张")])
+        self.assertEqual(record.slides[1].narration_lines(),
+                         ["正文", "Slide 3, Image 1 Text: 第一张", "Slide 3, Image 2 Text: 第二张"])
+        self.assertEqual(record.render(), "Title: 课程\n@@@Slide_1@@@\n标题\n@@@Slide_3@@@\n正文\n"
+                                          "Slide 3, Image 1 Text:\n第一张\nSlide 3, Image 2 Text:\n第二张")
+
+    def test_slide_inserts_in_order_and_digest_tracks_content(self):
+        record = DeckRecord()
+        record.add_ocr(5, 1, "五")
+        record.add_ocr(2, 1, "二")
+        self.assertEqual([slide.number for slide in record.slides], [2, 5])
+        digest = record.digest()
+        record.slide(2).lines.append("新增")
+        self.assertNotEqual(record.digest(), digest)
+        self.assertEqual(DeckRecord().render(), "No content extracted")
+
+if __name__ == "__main__":
+    unittest.main()
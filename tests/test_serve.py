@@ -0,0 +1,101 @@
+import json
+import os
+import signal
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+import serve
+from modules.ocr_manager import OCRModelManager
+
+def fake_run_worker(web, listener, max_requests, recover_jobs):
+    """代替 werkzeug 服务循环：记录工作进程看到的状态，按 web.mode 立即退出、崩溃或等待 SIGTERM"""
+    with open(web.log_path, "a") as f:
+        f.write(json.dumps({
+            "pid": os.getpid(),
+            "recover_jobs": recover_jobs,
+            "idle_timeout": web.ocr_manager.idle_timeout,
+            "unloaded": web.ocr_manager.unload_idle(now=time.monotonic() + 3600),
+            "loaded": web.ocr_manager.loaded(),
+        }) + "\n")
+    if web.mode == "crash":
+        raise RuntimeError("worker crashed")
+    if web.mode == "serve":
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+        while not stopping:
+            time.sleep(0.05)
+
+@unittest.skipUnless(hasattr(os, "fork"), "prefork server requires os.fork")
+class TestMaster(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        manager = OCRModelManager(idle_timeout=0, factory=lambda lang, use_gpu, use_angle_cls: object())
+        manager.warmup()
+        manager.pin_loaded()
+        self.web = types.SimpleNamespace(ocr_manager=manager, OCR_IDLE_TIMEOUT=600, mode="exit",
+                                         log_path=os.path.join(self.tmp.name, "workers.jsonl"))
+        patcher = mock.patch.object(serve, "run_worker", fake_run_worker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.master = serve.Master(self.web, None, workers=2, graceful_timeout=5)
+
+    def tearDown(self):
+        self.master.signal_workers(list(self.master.children), signal.SIGKILL)
+        self.wait_reaped()
+        self.tmp.cleanup()
+
+    def wait_reaped(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while self.master.children and time.monotonic() < deadline:
+            self.master.reap()
+            time.sleep(0.05)
+
+    def records(self):
+        with open(self.web.log_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_spawn_reap_and_respawn(self):
+        self.master.replenish()
+        first = set(self.master.children)
+        self.assertEqual(len(first), 2)
+        self.wait_reaped()
+        self.assertEqual(self.master.current(), [])
+
+        self.master.replenish()
+        self.assertEqual(len(self.master.current()), 2)
+        self.assertFalse(first & set(self.master.children))
+        self.wait_reaped()
+
+        records = self.records()
+        self.assertEqual(len(records), 4)
+        self.assertEqual(sum(record["recover_jobs"] for record in records), 1)
+        for record in records:
+            # 工作进程恢复了空闲超时，但主进程预加载的模型不会被卸载
+            self.assertEqual(record["idle_timeout"], 600)
+            self.assertEqual(record["unloaded"], 0)
+            self.assertEqual(record["loaded"], [["ch", False, True]])
+        self.assertEqual(self.web.ocr_manager.idle_timeout, 0)
+
+    def test_crashed_worker_is_reaped_and_replaced(self):
+        self.web.mode = "crash"
+        self.master.spawn()
+        self.wait_reaped()
+        self.assertEqual(self.master.children, {})
+        self.web.mode = "serve"
+        self.master.replenish()
+        self.assertEqual(len(self.master.current()), 2)
+
+    def test_stop_terminates_serving_workers(self):
+        self.web.mode = "serve"
+        self.master.replenish()
+        deadline = time.monotonic() + 10
+        while (not os.path.exists(self.web.log_path) or len(self.records()) < 2) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.master.stop()
+        self.assertEqual(self.master.children, {})
+
+if __name__ == "__main__":
+    unittest.main()
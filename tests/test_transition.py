@@ -0,0 +1,131 @@
+import random
+import threading
+import unittest
+from modules.deadline import Deadline
+from modules.transition_backends import FALLBACK_TRANSITIONS, TransitionMemo, extract_transition, generate_transitions
+from tests.helpers import FakeClock
+
+class FakeGenerator:
+    """生成文本为 "prompt，过渡<序号>，尾"，便于核对结果顺序；包含 "坏" 的 prompt 会失败"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, prompts, num_return_sequences=1, max_new_tokens=10, batch_size=None):
+        single = isinstance(prompts, str)
+        batch = [prompts] if single else prompts
+        self.calls.append(len(batch))
+        if any("坏" in prompt for prompt in batch):
+            raise RuntimeError("generation failed")
+        outputs = [[{"generated_text": f"{prompt}，过渡{prompt[-1]}，尾"}] for prompt in batch]
+        return outputs[0] if single else outputs
+
+class SamplingGenerator(FakeGenerator):
+    """从全局 random 采样过渡语，模拟依赖全局随机数源的 transformers 采样"""
+
+    def __call__(self, prompts, num_return_sequences=1, max_new_tokens=10, batch_size=None):
+        single = isinstance(prompts, str)
+        batch = [prompts] if single else prompts
+        self.calls.append(len(batch))
+        outputs = [[{"generated_text": f"{prompt}，过渡{random.randrange(10 ** 6)}，尾"}] for prompt in batch]
+        return outputs[0] if single else outputs
+
+class TestGenerateTransitions(unittest.TestCase):
+    def test_extract_transition(self):
+        self.assertEqual(extract_transition("前文，过渡，尾"), "过渡，")
+        self.assertEqual(extract_transition("没有逗号"), "接着是，")
+
+    def test_batches_keep_order_and_dedupe(self):
+        generator = FakeGenerator()
+        prompts = ["a1", "a2", "a3", "a1", "a4"]
+        transitions = generate_transitions(generator, prompts, batch_size=2)
+        self.assertEqual(transitions, ["过渡1，", "过渡2，", "过渡3，", "过渡1，", "过渡4，"])
+        self.assertEqual(generator.calls, [2, 2])
+
+    def test_failed_prompt_falls_back(self):
+        generator = FakeGenerator()
+        transitions = generate_transitions(generator, ["a1", "坏2", "a3"], batch_size=3, rng=random.Random(0))
+        self.assertEqual(transitions[0], "过渡1，")
+        self.assertIn(transitions[1], FALLBACK_TRANSITIONS)
+        self.assertEqual(transitions[2], "过渡3，")
+
+    def test_empty(self):
+        self.assertEqual(generate_transitions(FakeGenerator(), []), [])
+
+    def test_deadline_stops_between_batches(self):
+        generator = FakeGenerator()
+        deadline = Deadline(timeout=10, clock=lambda: 0.0)
+
+        def expire_after_first(prompts, **kwargs):
+            deadline.cancel()
+            return generator(prompts, **kwargs)
+
+        transitions = generate_transitions(expire_after_first, ["a1", "a2", "a3"], batch_size=2, deadline=deadline)
+        self.assertEqual(transitions[:2], ["过渡1，", "过渡2，"])
+        self.assertIn(transitions[2], FALLBACK_TRANSITIONS)
+        self.assertEqual(generator.calls, [2])
+
+class TestSeededTransitions(unittest.TestCase):
+    def test_output_independent_of_batch_and_memo(self):
+        generator = SamplingGenerator()
+        alone = generate_transitions(generator, ["b"], seed=7)
+        batched = generate_transitions(generator, ["a", "b", "c"], batch_size=3, seed=7)
+        self.assertEqual(batched[1], alone[0])
+        self.assertEqual(generator.calls, [1, 1, 1, 1])
+
+        memo = TransitionMemo()
+        generate_transitions(generator, ["a"], seed=7, memo=memo)
+        self.assertEqual(generate_transitions(generator, ["a", "b", "c"], seed=7, memo=memo), batched)
+        self.assertIsNone(memo.get("a", seed=8))
+        self.assertIsNone(memo.get("a"))
+        self.assertNotEqual(generate_transitions(generator, ["a", "b", "c"], seed=8), batched)
+
+    def test_concurrent_requests_are_reproducible(self):
+        prompts = [f"p{i}" for i in range(20)]
+        expected = {seed: generate_transitions(SamplingGenerator(), prompts, seed=seed) for seed in (1, 2)}
+        results = {}
+
+        def run(seed, index):
+            results[(seed, index)] = generate_transitions(SamplingGenerator(), prompts, seed=seed)
+
+        threads = [threading.Thread(target=run, args=(seed, index)) for seed in (1, 2) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for (seed, _), transitions in results.items():
+            self.assertEqual(transitions, expected[seed])
+
+class TestTransitionMemo(unittest.TestCase):
+    def test_lru_eviction_and_stats(self):
+        memo = TransitionMemo(max_entries=2, ttl=0)
+        memo.put("a", "A")
+        memo.put("b", "B")
+        self.assertEqual(memo.get("a"), "A")
+        memo.put("c", "C")
+        self.assertIsNone(memo.get("b"))
+        self.assertEqual(memo.get("c"), "C")
+        stats = memo.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (2, 1, 2))
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        memo = TransitionMemo(max_entries=8, ttl=10, clock=clock)
+        memo.put("a", "A")
+        clock.now = 5
+        self.assertEqual(memo.get("a"), "A")
+        clock.now = 11
+        self.assertIsNone(memo.get("a"))
+
+    def test_generation_skips_memoized_prompts(self):
+        memo = TransitionMemo()
+        generator = FakeGenerator()
+        generate_transitions(generator, ["a1", "a2"], batch_size=4, memo=memo)
+        transitions = generate_transitions(generator, ["a2", "a3", "坏4"], batch_size=4, memo=memo,
+                                           rng=random.Random(0))
+        self.assertEqual(transitions[:2], ["过渡2，", "过渡3，"])
+        self.assertEqual(generator.calls, [2, 2, 1, 1])
+        self.assertIsNone(memo.get("坏4"))
+
+if __name__ == "__main__":
+    unittest.main()